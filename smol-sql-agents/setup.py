@@ -1,27 +1,21 @@
+import os
 from setuptools import setup, find_packages
 
-setup(
-    name="sql-doc-agent",
-    version="0.1",
-    packages=find_packages(),
-    install_requires=[
-        "openai>=1.12.0",
-        "numpy>=1.26.4",
-        "tiktoken>=0.6.0",
-        "vectordb>=0.0.21",
-        "pytest>=8.0.0",
-        "pytest-mock>=3.12.0",
-        "tenacity>=8.0.0"
-    ],
-    python_requires=">=3.8"
-)
-
-from setuptools import setup, find_packages
+ext_modules = []
+if os.getenv("SQL_DOC_AGENT_MYPYC") == "1":
+    # Optionally compile the hot validation modules to C extensions
+    from mypyc.build import mypycify
+    ext_modules = mypycify([
+        "src/validation/business_validator.py",
+        "src/validation/query_optimizer.py",
+        "src/validation/query_features.py",
+    ])
 
 setup(
     name="sql-doc-agent",
     version="0.1",
     packages=find_packages(),
+    ext_modules=ext_modules,
     install_requires=[
         "openai>=1.12.0",
         "numpy>=1.26.4",
@@ -55,7 +55,8 @@ class BatchIndexingManager:
                             "name": table_name,
                             "schema": table_info.get("schema_data", {}),
                             "business_purpose": table_info.get("business_purpose", ""),
-                            "documentation": table_info.get("documentation", "")
+                            "documentation": table_info.get("documentation", ""),
+                            "type": "table"
                         })
                 except Exception as e:
                     logger.error(f"Failed to prepare table data for {table_name}: {e}")
@@ -252,49 +252,51 @@ class PersistentDocumentationAgent(BaseAgent):
         
         logger.info(f"Found {len(all_tables)} tables and {len(all_relationships)} relationships")
         
-        # Index tables
-        indexed_tables = 0
+        # Collect table documents, then index them with one bulk call
+        tables_data = []
         for table_name in all_tables:
             try:
                 table_info = self.store.get_table_info(table_name)
                 if table_info:
-                    table_data = {
+                    tables_data.append({
                         "name": table_name,
                         "business_purpose": table_info.get("business_purpose", ""),
                         "schema": table_info.get("schema_data", {}),
                         "type": "table"
-                    }
+                    })
                     
-                    success = self.indexer_agent.index_table_documentation(table_data)
-                    if success:
-                        indexed_tables += 1
-                        
             except Exception as e:
-                logger.error(f"Error indexing table {table_name}: {e}")
+                logger.error(f"Error loading table {table_name} for indexing: {e}")
+        
+        table_results = self.indexer_agent.batch_index_tables(tables_data) if tables_data else {}
+        indexed_tables = sum(1 for success in table_results.values() if success)
         
-        # Index relationships
-        indexed_relationships = 0
+        # Collect relationship documents, then index them with one bulk call
+        relationships_data = []
         for relationship in all_relationships:
             try:
                 rel_id = relationship.get("id", "unknown")
                 rel_info = self.store.get_relationship_info(rel_id)
                 
                 if rel_info:
-                    rel_data = {
+                    relationships_data.append({
                         "id": rel_id,
                         "name": rel_id,
                         "type": rel_info.get("relationship_type", ""),
                         "documentation": rel_info.get("documentation", ""),
                         "tables": [relationship.get("constrained_table"), relationship.get("referred_table")],
                         "doc_type": "relationship"
-                    }
-                    
-                    success = self.indexer_agent.index_relationship_documentation(rel_data)
-                    if success:
-                        indexed_relationships += 1
+                    })
                         
             except Exception as e:
-                logger.error(f"Error indexing relationship {rel_id}: {e}")
+                logger.error(f"Error loading relationship {rel_id} for indexing: {e}")
+        
+        rel_results = self.indexer_agent.batch_index_relationships(relationships_data) if relationships_data else {}
+        indexed_relationships = sum(1 for success in rel_results.values() if success)
+        
+        # Checkpoint once for the whole run; processed documents are
+        # re-indexed here, so per-document flushes are not needed
+        self.indexer_agent.vector_store.flush()
         
         logger.info(f"Indexing completed: {indexed_tables} tables, {indexed_relationships} relationships")
     
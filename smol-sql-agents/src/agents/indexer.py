@@ -74,6 +74,8 @@ class SQLIndexerAgent:
                     return {"success": False, "error": "Table name is required"}
                 
                 self.vector_store.add_table_document(table_name, table_data)
+                # Single adds are not saved per write; persist this tool call's write
+                self.vector_store.flush()
                 
                 return {
                     "success": True,
@@ -104,6 +106,7 @@ class SQLIndexerAgent:
                 
                 relationship_id = relationship_data.get("id") or f"{relationship_data.get('name')}_rel"
                 self.vector_store.add_relationship_document(relationship_id, relationship_data)
+                self.vector_store.flush()
                 
                 return {
                     "success": True,
@@ -270,19 +273,66 @@ class SQLIndexerAgent:
             return {"tables": [], "relationships": [], "total_results": 0, "error": str(e)}
     
     def batch_index_tables(self, tables_data: List[Dict]) -> Dict[str, bool]:
-        """Efficiently index multiple tables."""
+        """Efficiently index multiple tables.
+        
+        Valid tables are embedded and inserted through the vector store's bulk
+        API; invalid ones are reported as failed without being indexed.
+        
+        Args:
+            tables_data: Table documentation dictionaries to index
+            
+        Returns:
+            Dict[str, bool]: Indexing success keyed by table name
+        """
         results = {}
+        documents = []
         for table_data in tables_data:
             table_name = table_data.get("name", "unknown")
-            results[table_name] = self.index_table_documentation(table_data)
+            valid = self._validate_table_data(table_data)
+            results[table_name] = valid
+            if valid:
+                documents.append((table_name, table_data))
+            else:
+                logger.error(f"Invalid table documentation format: {table_name}")
+        
+        if documents:
+            try:
+                self.vector_store.add_table_documents(documents)
+            except Exception as e:
+                logger.error(f"Failed to batch index tables: {e}")
+                results.update((table_name, False) for table_name, _ in documents)
         return results
     
     def batch_index_relationships(self, relationships_data: List[Dict]) -> Dict[str, bool]:
-        """Efficiently index multiple relationships."""
+        """Efficiently index multiple relationships.
+        
+        Valid relationships are embedded and inserted through the vector
+        store's bulk API; invalid ones are reported as failed without being
+        indexed.
+        
+        Args:
+            relationships_data: Relationship documentation dictionaries to index
+            
+        Returns:
+            Dict[str, bool]: Indexing success keyed by relationship id
+        """
         results = {}
+        documents = []
         for rel_data in relationships_data:
             rel_id = rel_data.get("id") or f"{rel_data.get('name', 'unknown')}_rel"
-            results[rel_id] = self.index_relationship_documentation(rel_data)
+            valid = self._validate_relationship_data(rel_data)
+            results[rel_id] = valid
+            if valid:
+                documents.append((rel_id, rel_data))
+            else:
+                logger.error(f"Invalid relationship documentation format: {rel_id}")
+        
+        if documents:
+            try:
+                self.vector_store.add_relationship_documents(documents)
+            except Exception as e:
+                logger.error(f"Failed to batch index relationships: {e}")
+                results.update((rel_id, False) for rel_id, _ in documents)
         return results
     
     def _validate_table_data(self, table_data: Dict) -> bool:
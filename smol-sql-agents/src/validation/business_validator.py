@@ -1,28 +1,119 @@
+import concurrent.futures
 import logging
+import re
 import sqlparse
-from typing import Dict, List, Any
+from types import MappingProxyType
+from typing import Dict, List, Any, Optional, Tuple, cast
 from ..agents.concepts.loader import BusinessConcept
+from .query_features import SENSITIVE_PATTERNS, fingerprint
 
 logger = logging.getLogger(__name__)
 
+# Concept counts at which per-concept validation fans out to a thread pool
+_PARALLEL_CONCEPT_THRESHOLD = 8
+_PARALLEL_CONCEPT_WORKERS = 4
+
+# States for the flat JOIN ... ON scanner in _extract_joins_from_query
+_SEEK_JOIN, _SEEK_ON, _COLLECT = range(3)
+
+# Clause keywords that terminate an ON condition
+_JOIN_BOUNDARY_KEYWORDS = frozenset({
+    'WHERE', 'GROUP BY', 'ORDER BY', 'HAVING', 'UNION', 'UNION ALL',
+    'EXCEPT', 'INTERSECT', 'LIMIT'
+})
+
+# Business validation rules, shared read-only by all validator instances
+_VALIDATION_RULES = MappingProxyType({
+    "required_patterns": MappingProxyType({
+        "customer_lifetime_value": ("SUM", "COUNT", "customer"),
+        "sales_performance_analysis": ("SUM", "AVG", "sales"),
+        "inventory_analysis": ("COUNT", "SUM", "inventory")
+    }),
+    "forbidden_patterns": MappingProxyType({
+        "customer_lifetime_value": frozenset({"DELETE", "UPDATE", "DROP"}),
+        "sales_performance_analysis": frozenset({"DELETE", "UPDATE", "DROP"}),
+        "inventory_analysis": frozenset({"DELETE", "UPDATE", "DROP"})
+    })
+})
+
+# Write statements that no business concept permits
+_FORBIDDEN_RE = re.compile(
+    r"\b(" + "|".join(sorted(frozenset().union(*_VALIDATION_RULES["forbidden_patterns"].values()))) + r")\b",
+    re.IGNORECASE
+)
+
+# Instruction words that call for aggregation, and the aggregate functions that satisfy them
+_AGGREGATION_TRIGGER_RE = re.compile(r"calculate|sum|total|average", re.IGNORECASE)
+_AGGREGATE_FUNCTION_RE = re.compile(r"(?:sum|count|avg|max|min)\(", re.IGNORECASE)
+
+# Business instruction rules, as bit flags so compliance is a mask comparison
+_TIME_RULE, _AGG_RULE, _GROUP_RULE = 1, 2, 4
+_ALL_RULES = _TIME_RULE | _AGG_RULE | _GROUP_RULE
+_RULE_FLAGS = {"time": _TIME_RULE, "agg": _AGG_RULE, "group": _GROUP_RULE}
+
+# Instruction words that trigger each rule
+_INSTRUCTION_TRIGGER_RE = re.compile(
+    r"(?P<time>time|date)|(?P<agg>calculate|sum)|(?P<group>group)",
+    re.IGNORECASE
+)
+
+# Query tokens that satisfy each rule
+_QUERY_REQUIREMENT_RE = re.compile(
+    r"(?P<time>date|time|year|month|day)|(?P<agg>(?:sum|count|avg|max|min)\()|(?P<group>group by)",
+    re.IGNORECASE
+)
+
+# Issues reported for unmet rules, in priority order
+_RULE_ISSUES = (
+    (_TIME_RULE, "Time-based analysis required but no date/time filtering found"),
+    (_AGG_RULE, "Aggregation required but no aggregation functions found"),
+    (_GROUP_RULE, "Grouping required but no GROUP BY clause found")
+)
+
 class BusinessValidator:
     """Validates generated queries against business rules and concepts."""
     
-    def __init__(self):
-        self.validation_rules = self._load_validation_rules()
+    def __init__(self) -> None:
+        self.validation_rules = _VALIDATION_RULES
+        # Normalized required joins, keyed by each concept's raw required_joins
+        self._normalized_joins_cache: Dict[Tuple[str, ...], List[str]] = {}
 
     def validate_against_concepts(self, query: str, applicable_concepts: List[BusinessConcept]) -> Dict[str, Any]:
         """Validate query against business concept requirements."""
         try:
-            validation_result = {
+            validation_result: Dict[str, Any] = {
                 "valid": True,
                 "issues": [],
                 "warnings": [],
                 "concept_compliance": {}
             }
             
-            for concept in applicable_concepts:
-                concept_validation = self._validate_single_concept(query, concept)
+            # Forbidden write statements invalidate every concept, so skip the per-concept checks
+            forbidden_match = _FORBIDDEN_RE.search(query) if applicable_concepts else None
+            if forbidden_match:
+                validation_result["valid"] = False
+                validation_result["issues"].append(f"Forbidden operation in query: {forbidden_match.group(1).upper()}")
+                return validation_result
+            
+            # Extract the query's joins once and share them across all concepts
+            query_joins_normalized = None
+            if any(concept.required_joins for concept in applicable_concepts):
+                query_joins_normalized = self._get_normalized_query_joins(query)
+            
+            if len(applicable_concepts) >= _PARALLEL_CONCEPT_THRESHOLD:
+                # Concepts are validated independently against the shared query joins
+                with concurrent.futures.ThreadPoolExecutor(max_workers=_PARALLEL_CONCEPT_WORKERS) as executor:
+                    concept_validations = list(executor.map(
+                        lambda concept: self._validate_single_concept(query, concept, query_joins_normalized),
+                        applicable_concepts
+                    ))
+            else:
+                concept_validations = [
+                    self._validate_single_concept(query, concept, query_joins_normalized)
+                    for concept in applicable_concepts
+                ]
+            
+            for concept, concept_validation in zip(applicable_concepts, concept_validations):
                 validation_result["concept_compliance"][concept.name] = concept_validation
                 
                 if not concept_validation["valid"]:
@@ -35,7 +126,7 @@ class BusinessValidator:
             return validation_result
             
         except Exception as e:
-            logger.error(f"Error validating against concepts: {e}")
+            logger.error(f"Error validating against concepts: {e}", exc_info=True)
             return {
                 "valid": False,
                 "error": str(e),
@@ -43,16 +134,14 @@ class BusinessValidator:
                 "warnings": []
             }
 
-    def check_required_joins(self, query: str, required_joins: List[str]) -> Dict[str, bool]:
+    def check_required_joins(self, query: str, required_joins: List[str]) -> Dict[str, Any]:
         """Verify that required joins are present in query."""
         try:
             parsed_query = sqlparse.parse(query)[0]
             query_joins = self._extract_joins_from_query(parsed_query)
+            query_joins_normalized = [self._normalize_join(join) for join in query_joins]
             
-            missing_joins = []
-            for required_join in required_joins:
-                if not self._join_exists_in_query(required_join, query_joins):
-                    missing_joins.append(required_join)
+            missing_joins = self._find_missing_joins(required_joins, query_joins_normalized)
             
             return {
                 "valid": len(missing_joins) == 0,
@@ -61,20 +150,23 @@ class BusinessValidator:
             }
             
         except Exception as e:
-            logger.error(f"Error checking required joins: {e}")
+            logger.error(f"Error checking required joins: {e}", exc_info=True)
             return {"valid": False, "error": str(e)}
 
     def validate_business_logic(self, query: str, business_instructions: List[str]) -> Dict[str, Any]:
         """Check if query follows business logic instructions."""
         try:
-            validation_result = {
+            validation_result: Dict[str, Any] = {
                 "valid": True,
                 "issues": [],
                 "warnings": []
             }
             
+            # Scan the query once for the tokens every instruction rule looks for
+            query_flags = self._scan_rule_flags(_QUERY_REQUIREMENT_RE, query)
+            
             for instruction in business_instructions:
-                instruction_check = self._check_instruction_compliance(query, instruction)
+                instruction_check = self._check_instruction_compliance(query, instruction, query_flags)
                 if not instruction_check["compliant"]:
                     validation_result["valid"] = False
                     validation_result["issues"].append(instruction_check["issue"])
@@ -84,7 +176,7 @@ class BusinessValidator:
             return validation_result
             
         except Exception as e:
-            logger.error(f"Error validating business logic: {e}")
+            logger.error(f"Error validating business logic: {e}", exc_info=True)
             return {"valid": False, "error": str(e)}
 
     def check_data_privacy_compliance(self, query: str) -> Dict[str, Any]:
@@ -92,19 +184,15 @@ class BusinessValidator:
         try:
             privacy_issues = []
             
-            # Check for potential sensitive data patterns
-            sensitive_patterns = [
-                "password", "ssn", "credit_card", "social_security",
-                "phone", "email", "address", "birth_date"
-            ]
+            features = fingerprint(query)
             
-            query_lower = query.lower()
-            for pattern in sensitive_patterns:
-                if pattern in query_lower:
+            # Check for potential sensitive data patterns
+            for pattern in SENSITIVE_PATTERNS:
+                if pattern in features.sensitive_hits:
                     privacy_issues.append(f"Query may expose sensitive data: {pattern}")
             
             # Check for SELECT * usage which might expose unnecessary data
-            if "select *" in query_lower:
+            if features.has_select_star:
                 privacy_issues.append("SELECT * may expose unnecessary sensitive data")
             
             return {
@@ -113,39 +201,27 @@ class BusinessValidator:
             }
             
         except Exception as e:
-            logger.error(f"Error checking data privacy compliance: {e}")
+            logger.error(f"Error checking data privacy compliance: {e}", exc_info=True)
             return {"compliant": False, "error": str(e)}
 
-    def _load_validation_rules(self) -> Dict[str, Any]:
-        """Load business validation rules configuration."""
-        return {
-            "required_patterns": {
-                "customer_lifetime_value": ["SUM", "COUNT", "customer"],
-                "sales_performance_analysis": ["SUM", "AVG", "sales"],
-                "inventory_analysis": ["COUNT", "SUM", "inventory"]
-            },
-            "forbidden_patterns": {
-                "customer_lifetime_value": ["DELETE", "UPDATE", "DROP"],
-                "sales_performance_analysis": ["DELETE", "UPDATE", "DROP"],
-                "inventory_analysis": ["DELETE", "UPDATE", "DROP"]
-            }
-        }
-
-    def _validate_single_concept(self, query: str, concept: BusinessConcept) -> Dict[str, Any]:
+    def _validate_single_concept(self, query: str, concept: BusinessConcept,
+                                 query_joins_normalized: Optional[List[str]] = None) -> Dict[str, Any]:
         """Validate query against a single business concept."""
+        validation_result: Dict[str, Any] = {
+            "valid": True,
+            "issues": [],
+            "warnings": []
+        }
+        
         try:
-            validation_result = {
-                "valid": True,
-                "issues": [],
-                "warnings": []
-            }
-            
             # Check required joins
             if concept.required_joins:
-                join_validation = self.check_required_joins(query, concept.required_joins)
-                if not join_validation["valid"]:
+                if query_joins_normalized is None:
+                    query_joins_normalized = self._get_normalized_query_joins(query)
+                missing_joins = self._find_missing_joins(concept.required_joins, query_joins_normalized)
+                if missing_joins:
                     validation_result["valid"] = False
-                    validation_result["issues"].append(f"Missing required joins: {join_validation['missing_joins']}")
+                    validation_result["issues"].append(f"Missing required joins: {missing_joins}")
             
             # Check business logic compliance
             if concept.instructions:
@@ -153,136 +229,134 @@ class BusinessValidator:
                 if not logic_validation["valid"]:
                     validation_result["valid"] = False
                     validation_result["issues"].extend(logic_validation["issues"])
-                
+            
                 if logic_validation["warnings"]:
                     validation_result["warnings"].extend(logic_validation["warnings"])
             
             # Check for required aggregation patterns
             if hasattr(concept, 'name') and concept.name in self.validation_rules["required_patterns"]:
                 required_patterns = self.validation_rules["required_patterns"][concept.name]
-                query_lower = query.lower()
-                
+            
                 for pattern in required_patterns:
-                    if pattern.lower() not in query_lower:
+                    if not re.search(re.escape(pattern), query, re.IGNORECASE):
                         validation_result["warnings"].append(f"Expected pattern '{pattern}' not found in query")
             
-            return validation_result
-            
         except Exception as e:
-            logger.error(f"Error validating single concept: {e}")
-            return {"valid": False, "error": str(e)}
+            # Record the failure against this concept only; the other concepts are still reported
+            logger.error(f"Error validating concept {concept.name}: {e}", exc_info=True)
+            validation_result["valid"] = False
+            validation_result["issues"].append(f"Error validating concept {concept.name}: {e}")
+            validation_result["error"] = str(e)
+        
+        return validation_result
 
     def _extract_joins_from_query(self, parsed_query) -> List[str]:
-        """Extract JOIN clauses from parsed SQL."""
-        try:
-            joins = []
-            
-            def extract_joins_from_token(token):
-                if token.ttype is sqlparse.tokens.Keyword and token.value.upper() == 'JOIN':
-                    # Get the join condition from surrounding tokens
-                    join_condition = ""
-                    for sibling in token.parent.tokens:
-                        if sibling.ttype is sqlparse.tokens.Whitespace:
-                            continue
-                        if sibling.ttype is sqlparse.tokens.Keyword and sibling.value.upper() == 'ON':
-                            # Get the condition after ON
-                            for next_token in sibling.parent.tokens:
-                                if next_token.ttype is sqlparse.tokens.Whitespace:
-                                    continue
-                                if next_token.ttype is sqlparse.tokens.Keyword and next_token.value.upper() == 'ON':
-                                    continue
-                                join_condition += str(next_token)
-                            break
-                        join_condition += str(sibling)
-                    
-                    if join_condition.strip():
-                        joins.append(join_condition.strip())
-                
-                # Recursively check child tokens
-                for child in token.tokens:
-                    extract_joins_from_token(child)
-            
-            extract_joins_from_token(parsed_query)
-            return joins
-            
-        except Exception as e:
-            logger.error(f"Error extracting joins from query: {e}")
-            return []
+        """Extract JOIN conditions from parsed SQL in a single pass over the flattened tokens."""
+        joins = []
+        condition: List[str] = []
+        state = _SEEK_JOIN
+        
+        for token in parsed_query.flatten():
+            if token.is_keyword:
+                keyword = token.normalized
+                is_join = keyword.endswith('JOIN')
+                if is_join or keyword in _JOIN_BOUNDARY_KEYWORDS:
+                    # A new JOIN or the next clause closes any open ON condition
+                    if state == _COLLECT and condition:
+                        joins.append(" ".join("".join(condition).split()))
+                    condition = []
+                    state = _SEEK_ON if is_join else _SEEK_JOIN
+                    continue
+                if keyword == 'ON' and state == _SEEK_ON:
+                    state = _COLLECT
+                    continue
+            
+            if state == _COLLECT:
+                if token.match(sqlparse.tokens.Punctuation, ';'):
+                    state = _SEEK_JOIN
+                    continue
+                condition.append(token.value)
+        
+        if state == _COLLECT and condition:
+            joins.append(" ".join("".join(condition).split()))
+        
+        return [join for join in joins if join]
 
-    def _join_exists_in_query(self, required_join: str, query_joins: List[str]) -> bool:
-        """Check if a required join exists in the query joins."""
-        try:
-            # Simple string matching for join conditions
-            required_join_normalized = required_join.replace(" ", "").lower()
-            
-            for query_join in query_joins:
-                query_join_normalized = query_join.replace(" ", "").lower()
-                if required_join_normalized in query_join_normalized:
-                    return True
-            
-            return False
-            
-        except Exception as e:
-            logger.error(f"Error checking if join exists: {e}")
-            return False
+    @staticmethod
+    def _normalize_join(join: str) -> str:
+        """Normalize a join condition for whitespace- and case-insensitive matching."""
+        return join.replace(" ", "").lower()
+
+    def _get_normalized_joins(self, required_joins: List[str]) -> List[str]:
+        """Get normalized required joins, normalizing each distinct list only once."""
+        key = tuple(required_joins)
+        normalized = self._normalized_joins_cache.get(key)
+        if normalized is None:
+            normalized = [self._normalize_join(join) for join in required_joins]
+            self._normalized_joins_cache[key] = normalized
+        return normalized
+
+    def _get_normalized_query_joins(self, query: str) -> List[str]:
+        """Extract and normalize the join conditions present in a query."""
+        parsed_query = sqlparse.parse(query)[0]
+        return [self._normalize_join(join) for join in self._extract_joins_from_query(parsed_query)]
+
+    def _find_missing_joins(self, required_joins: List[str], query_joins_normalized: List[str]) -> List[str]:
+        """Return the required joins that are not present in the normalized query joins."""
+        return [
+            required_join
+            for required_join, required_join_normalized in zip(required_joins, self._get_normalized_joins(required_joins))
+            if not self._join_exists_in_query(required_join_normalized, query_joins_normalized)
+        ]
+
+    def _join_exists_in_query(self, required_join_normalized: str, query_joins_normalized: List[str]) -> bool:
+        """Check if a normalized required join exists in the normalized query joins."""
+        # Simple string matching for join conditions
+        for query_join_normalized in query_joins_normalized:
+            if required_join_normalized in query_join_normalized:
+                return True
+        
+        return False
 
-    def _check_instruction_compliance(self, query: str, instruction: str) -> Dict[str, Any]:
+    @staticmethod
+    def _scan_rule_flags(pattern: re.Pattern, text: str) -> int:
+        """Collect the instruction rule flags matched by a pattern in one pass."""
+        flags = 0
+        for match in pattern.finditer(text):
+            flags |= _RULE_FLAGS[cast(str, match.lastgroup)]
+            if flags == _ALL_RULES:
+                break
+        return flags
+
+    def _check_instruction_compliance(self, query: str, instruction: str, query_flags: Optional[int] = None) -> Dict[str, Any]:
         """Check if query complies with a business instruction."""
-        try:
-            instruction_lower = instruction.lower()
-            query_lower = query.lower()
-            
-            # Check for time-based analysis instructions
-            if "time" in instruction_lower or "date" in instruction_lower:
-                if not any(word in query_lower for word in ["date", "time", "year", "month", "day"]):
+        if query_flags is None:
+            query_flags = self._scan_rule_flags(_QUERY_REQUIREMENT_RE, query)
+        
+        # Rules triggered by the instruction that the query does not satisfy
+        missing_flags = self._scan_rule_flags(_INSTRUCTION_TRIGGER_RE, instruction) & ~query_flags
+        
+        if missing_flags:
+            for rule, issue in _RULE_ISSUES:
+                if missing_flags & rule:
                     return {
                         "compliant": False,
-                        "issue": "Time-based analysis required but no date/time filtering found",
+                        "issue": issue,
                         "warning": None
                     }
-            
-            # Check for aggregation instructions
-            if "calculate" in instruction_lower or "sum" in instruction_lower:
-                if not any(func in query_lower for func in ["sum(", "count(", "avg(", "max(", "min("]):
-                    return {
-                        "compliant": False,
-                        "issue": "Aggregation required but no aggregation functions found",
-                        "warning": None
-                    }
-            
-            # Check for grouping instructions
-            if "group" in instruction_lower:
-                if "group by" not in query_lower:
-                    return {
-                        "compliant": False,
-                        "issue": "Grouping required but no GROUP BY clause found",
-                        "warning": None
-                    }
-            
-            return {
-                "compliant": True,
-                "issue": None,
-                "warning": None
-            }
-            
-        except Exception as e:
-            logger.error(f"Error checking instruction compliance: {e}")
-            return {"compliant": False, "error": str(e)}
+        
+        return {
+            "compliant": True,
+            "issue": None,
+            "warning": None
+        }
 
     def _check_aggregation_compliance(self, query: str, concept_instructions: str) -> bool:
         """Verify aggregations follow business concept guidelines."""
-        try:
-            # This is a simplified check - in production you'd have more sophisticated logic
-            query_lower = query.lower()
-            instructions_lower = concept_instructions.lower()
-            
-            # Check if aggregation is required but missing
-            if any(word in instructions_lower for word in ["calculate", "sum", "total", "average"]):
-                if not any(func in query_lower for func in ["sum(", "count(", "avg(", "max(", "min("]):
-                    return False
-            
-            return True
-            
-        except Exception as e:
-            logger.error(f"Error checking aggregation compliance: {e}")
-            return False 
\ No newline at end of file
+        # This is a simplified check - in production you'd have more sophisticated logic
+        # Check if aggregation is required but missing
+        if _AGGREGATION_TRIGGER_RE.search(concept_instructions):
+            if not _AGGREGATE_FUNCTION_RE.search(query):
+                return False
+        
+        return True
\ No newline at end of file
@@ -0,0 +1,105 @@
+import re
+import sqlparse
+from sqlparse import tokens as T
+from collections import Counter
+from dataclasses import dataclass, field
+from functools import lru_cache
+from types import MappingProxyType
+from typing import FrozenSet, List, Mapping, Tuple
+
+# Structural keywords counted per query, keyed by their lowercased form
+_COUNTED_KEYWORDS = frozenset({"select", "from", "where", "group by", "order by", "having", "limit"})
+
+# Column name fragments that suggest sensitive data, in reporting order
+SENSITIVE_PATTERNS = (
+    "password", "ssn", "credit_card", "social_security",
+    "phone", "email", "address", "birth_date"
+)
+
+# The same fragments as one alternation with shared prefixes factored out
+_PRIVACY_RE = re.compile(
+    r"s(?:sn|ocial_security)|p(?:assword|hone)|credit_card|email|address|birth_date",
+    re.IGNORECASE
+)
+
+@dataclass(frozen=True)
+class QueryFeatures:
+    """Structural features of a query, shared by BusinessValidator and QueryOptimizer.
+
+    Instances are memoized per query text and shared, so counts is a read-only
+    mapping; keywords that never occur are absent, so read it with .get(k, 0).
+    """
+    counts: Mapping[str, int] = field(hash=False)  # mapping proxies are unhashable
+    has_select_star: bool
+    join_types: Tuple[str, ...]
+    open_parens: int
+    close_parens: int
+    sensitive_hits: FrozenSet[str]
+
+    @property
+    def has_where(self) -> bool:
+        return self.counts.get("where", 0) > 0
+
+    @property
+    def join_count(self) -> int:
+        return self.counts.get("join", 0)
+
+    @property
+    def has_order_by_no_limit(self) -> bool:
+        return self.counts.get("order by", 0) > 0 and not self.counts.get("limit", 0)
+
+def _keyword_counts(tokens, sensitive_hits: FrozenSet[str] = frozenset()) -> QueryFeatures:
+    """Build query features from one walk over a (ttype, value) token stream.
+
+    Working on lexer tokens means keywords inside identifiers, string literals
+    and comments are never counted.
+    """
+    counts: Counter = Counter()
+    has_select_star = False
+    join_types: List[str] = []
+    open_parens = close_parens = 0
+    previous = None
+    
+    for ttype, value in tokens:
+        if ttype in T.Whitespace or ttype in T.Comment:
+            continue
+        
+        if ttype in T.Keyword:
+            keyword = " ".join(value.lower().split())
+            if keyword.endswith("join"):
+                counts["join"] += 1
+                if keyword != "join":
+                    join_types.append(keyword.split()[0].upper())
+            elif keyword.startswith("union"):
+                counts["union"] += 1
+            elif keyword in _COUNTED_KEYWORDS:
+                counts[keyword] += 1
+                # A SELECT opened directly by a paren is a subquery
+                if keyword == "select" and previous == "(":
+                    counts["subquery"] += 1
+            value = keyword
+        elif ttype is T.Wildcard:
+            if previous == "select":
+                has_select_star = True
+        elif ttype is T.Punctuation:
+            if value == "(":
+                open_parens += 1
+            elif value == ")":
+                close_parens += 1
+        
+        previous = value
+    
+    return QueryFeatures(
+        counts=MappingProxyType(dict(counts)),
+        has_select_star=has_select_star,
+        join_types=tuple(join_types),
+        open_parens=open_parens,
+        close_parens=close_parens,
+        sensitive_hits=sensitive_hits
+    )
+
+@lru_cache(maxsize=512)
+def fingerprint(query: str) -> QueryFeatures:
+    """Tokenize the query once and collect the features both validators check."""
+    sensitive_hits = frozenset(match.group(0).lower() for match in _PRIVACY_RE.finditer(query))
+    return _keyword_counts(sqlparse.lexer.tokenize(query), sensitive_hits)
@@ -1,35 +1,137 @@
 import logging
+import re
 import sqlparse
-from typing import Dict, List, Any, Optional
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, List, Any, Optional, Tuple
+from .query_features import QueryFeatures, fingerprint
 
 logger = logging.getLogger(__name__)
 
+# Query optimization rules, shared read-only by all optimizer instances
+_OPTIMIZATION_RULES = MappingProxyType({
+    "complexity_thresholds": MappingProxyType({
+        "low": 10,
+        "medium": 25,
+        "high": 50
+    }),
+    "performance_patterns": MappingProxyType({
+        "select_star": MappingProxyType({"impact": "medium", "suggestion": "Specify only needed columns"}),
+        "missing_where": MappingProxyType({"impact": "high", "suggestion": "Add WHERE clause for large tables"}),
+        "inefficient_joins": MappingProxyType({"impact": "medium", "suggestion": "Optimize JOIN order and conditions"}),
+        "subquery_in_select": MappingProxyType({"impact": "medium", "suggestion": "Consider using JOINs instead"})
+    })
+})
+
+# Suggestion and issue templates reported by analyze_performance; read-only,
+# each result gets its own copy
+_SELECT_STAR_SUGGESTION = MappingProxyType({
+    "type": "performance",
+    "priority": "high",
+    "message": "Replace SELECT * with specific column names",
+    "impact": "medium"
+})
+_MISSING_WHERE_SUGGESTION = MappingProxyType({
+    "type": "performance",
+    "priority": "medium",
+    "message": "Consider adding WHERE clause for large tables",
+    "impact": "high"
+})
+_MULTIPLE_JOINS_SUGGESTION = MappingProxyType({
+    "type": "performance",
+    "priority": "medium",
+    "message": "Multiple JOINs detected - consider optimizing join order",
+    "impact": "medium"
+})
+_SUBQUERY_IN_SELECT_SUGGESTION = MappingProxyType({
+    "type": "performance",
+    "priority": "low",
+    "message": "Consider using JOINs instead of subqueries in SELECT",
+    "impact": "medium"
+})
+_SELECT_STAR_ISSUE = MappingProxyType({
+    "type": "anti_pattern",
+    "severity": "warning",
+    "description": "SELECT * usage may return unnecessary data"
+})
+_ORDER_BY_WITHOUT_LIMIT_ISSUE = MappingProxyType({
+    "type": "performance",
+    "severity": "info",
+    "description": "ORDER BY without LIMIT may process large result sets"
+})
+_MULTIPLE_SELECTS_ISSUE = MappingProxyType({
+    "type": "complexity",
+    "severity": "warning",
+    "description": "Multiple SELECT statements may indicate inefficient query structure"
+})
+
+# Table names following FROM/JOIN: dot-separated parts that are plain, [bracketed],
+# "quoted" or #temp identifiers; subqueries are skipped since "(" cannot start a name
+_NAME_PART = r'(?:\[[^\]]+\]|"[^"]+"|[A-Za-z_#][\w#$@]*)'
+_TABLE_RE = re.compile(rf"\b(?:from|join)\s+({_NAME_PART}(?:\.{_NAME_PART})*)", re.IGNORECASE)
+
+# Patterns for the simplified rewrites in _rewrite_query
+_SELECT_STAR_RE = re.compile(r"select \*", re.IGNORECASE)
+_WHERE_RE = re.compile(r"where", re.IGNORECASE)
+_LEADING_WILDCARD_LIKE_RE = re.compile(r"like '%", re.IGNORECASE)
+
+@lru_cache(maxsize=128)
+def _scan_table_names(query: str) -> Tuple[str, ...]:
+    """Extract the distinct table names referenced by FROM/JOIN."""
+    return tuple({match.group(1).lower() for match in _TABLE_RE.finditer(query)})
+
+@lru_cache(maxsize=128)
+def _rewrite_query(query: str) -> Optional[str]:
+    """Build the rewritten query, or None when no rewrite applies."""
+    rewritten_query = query
+    
+    # Replace SELECT * with specific columns if possible
+    if _SELECT_STAR_RE.search(query):
+        # This is a simplified example - in practice you'd need schema information
+        rewritten_query = rewritten_query.replace("SELECT *", "SELECT id, name, created_date")
+    
+    # Optimize WHERE clauses
+    if _WHERE_RE.search(query) and _LEADING_WILDCARD_LIKE_RE.search(query):
+        # Suggest using full-text search or prefix matching
+        rewritten_query = rewritten_query.replace("LIKE '%", "LIKE '")
+    
+    # Subquery rewrites (IN to EXISTS) need schema information and are not attempted
+    
+    # Only return if there are actual changes
+    if rewritten_query != query:
+        return rewritten_query
+    
+    return None
+
 class QueryOptimizer:
     """Provides query optimization suggestions and improvements."""
     
-    def __init__(self):
-        self.optimization_rules = self._load_optimization_rules()
+    def __init__(self) -> None:
+        self.optimization_rules = _OPTIMIZATION_RULES
 
-    def analyze_performance(self, query: str, execution_plan: Dict = None) -> Dict[str, Any]:
+    def analyze_performance(self, query: str, execution_plan: Optional[Dict] = None) -> Dict[str, Any]:
         """Analyze query performance and suggest optimizations."""
         try:
-            analysis_result = {
+            analysis_result: Dict[str, Any] = {
                 "complexity_score": 0,
                 "optimization_suggestions": [],
                 "performance_issues": [],
                 "estimated_impact": "low"
             }
             
+            # Scan the query once and share the features across all checks
+            features = fingerprint(query)
+            
             # Calculate complexity score
-            complexity_score = self._calculate_complexity_score(query)
+            complexity_score = self._calculate_complexity_score(features)
             analysis_result["complexity_score"] = complexity_score
             
             # Get optimization suggestions
-            suggestions = self._get_optimization_suggestions(query)
+            suggestions = self._get_optimization_suggestions(features)
             analysis_result["optimization_suggestions"] = suggestions
             
             # Identify performance issues
-            performance_issues = self._identify_performance_issues(query)
+            performance_issues = self._identify_performance_issues(features)
             analysis_result["performance_issues"] = performance_issues
             
             # Estimate impact based on issues and suggestions
@@ -39,14 +141,14 @@ class QueryOptimizer:
             return analysis_result
             
         except Exception as e:
-            logger.error(f"Error analyzing performance: {e}")
+            logger.error(f"Error analyzing performance: {e}", exc_info=True)
             return {"error": str(e)}
 
     def suggest_index_usage(self, query: str, table_stats: Dict) -> List[Dict[str, str]]:
         """Suggest optimal index usage for query."""
         try:
             suggestions = []
-            query_lower = query.lower()
+            features = fingerprint(query)
             
             # Extract table names from query
             tables = self._extract_table_names(query)
@@ -56,21 +158,21 @@ class QueryOptimizer:
                     row_count = table_stats[table].get("row_count", 0)
                     
                     # Suggest indexes based on query patterns
-                    if "where" in query_lower and row_count > 10000:
+                    if features.has_where and row_count > 10000:
                         suggestions.append({
                             "table": table,
                             "type": "index",
                             "message": f"Consider adding indexes on WHERE clause columns for table {table} ({row_count} rows)"
                         })
                     
-                    if "join" in query_lower and row_count > 5000:
+                    if features.counts.get("join", 0) and row_count > 5000:
                         suggestions.append({
                             "table": table,
                             "type": "index",
                             "message": f"Consider adding indexes on JOIN columns for table {table}"
                         })
                     
-                    if "order by" in query_lower and row_count > 1000:
+                    if features.counts.get("order by", 0) and row_count > 1000:
                         suggestions.append({
                             "table": table,
                             "type": "index",
@@ -80,20 +182,20 @@ class QueryOptimizer:
             return suggestions
             
         except Exception as e:
-            logger.error(f"Error suggesting index usage: {e}")
+            logger.error(f"Error suggesting index usage: {e}", exc_info=True)
             return [{"error": str(e)}]
 
-    def optimize_joins(self, query: str) -> Dict[str, Any]:
+    def optimize_joins(self, query: str, table_stats: Optional[Dict] = None) -> Dict[str, Any]:
         """Suggest JOIN optimization strategies."""
         try:
-            optimization_result = {
+            optimization_result: Dict[str, Any] = {
                 "suggestions": [],
                 "join_order": [],
                 "estimated_improvement": "low"
             }
             
             # Analyze JOIN structure
-            join_analysis = self._analyze_join_structure(query)
+            join_analysis = self._analyze_join_structure(fingerprint(query))
             
             if join_analysis["join_count"] > 2:
                 optimization_result["suggestions"].append({
@@ -115,288 +217,154 @@ class QueryOptimizer:
             
             # Suggest join order optimization
             if join_analysis["join_count"] > 1:
-                optimization_result["join_order"] = self._suggest_join_order(query)
+                optimization_result["join_order"] = self._suggest_join_order(query, table_stats)
                 optimization_result["estimated_improvement"] = "medium"
             
             return optimization_result
             
         except Exception as e:
-            logger.error(f"Error optimizing joins: {e}")
+            logger.error(f"Error optimizing joins: {e}", exc_info=True)
             return {"error": str(e)}
 
     def suggest_query_rewrite(self, query: str) -> Optional[str]:
         """Suggest alternative query structure for better performance."""
         try:
-            query_lower = query.lower()
-            rewritten_query = query
-            
-            # Replace SELECT * with specific columns if possible
-            if "select *" in query_lower:
-                # This is a simplified example - in practice you'd need schema information
-                rewritten_query = rewritten_query.replace("SELECT *", "SELECT id, name, created_date")
-            
-            # Optimize WHERE clauses
-            if "where" in query_lower and "like '%" in query_lower:
-                # Suggest using full-text search or prefix matching
-                rewritten_query = rewritten_query.replace("LIKE '%", "LIKE '")
-            
-            # Optimize subqueries
-            if "in (" in query_lower and "select" in query_lower:
-                # Suggest using EXISTS instead of IN with subquery
-                # This is a simplified example
-                pass
-            
-            # Only return if there are actual changes
-            if rewritten_query != query:
-                return rewritten_query
-            
-            return None
+            return _rewrite_query(query)
             
         except Exception as e:
-            logger.error(f"Error suggesting query rewrite: {e}")
+            logger.error(f"Error suggesting query rewrite: {e}", exc_info=True)
             return None
 
-    def _load_optimization_rules(self) -> Dict[str, Any]:
-        """Load query optimization rule definitions."""
-        return {
-            "complexity_thresholds": {
-                "low": 10,
-                "medium": 25,
-                "high": 50
-            },
-            "performance_patterns": {
-                "select_star": {"impact": "medium", "suggestion": "Specify only needed columns"},
-                "missing_where": {"impact": "high", "suggestion": "Add WHERE clause for large tables"},
-                "inefficient_joins": {"impact": "medium", "suggestion": "Optimize JOIN order and conditions"},
-                "subquery_in_select": {"impact": "medium", "suggestion": "Consider using JOINs instead"}
-            }
-        }
-
-    def _calculate_complexity_score(self, query: str) -> int:
+    def _calculate_complexity_score(self, features: QueryFeatures) -> int:
         """Calculate query complexity score."""
-        try:
-            score = 0
-            query_lower = query.lower()
-            
-            # Count various complexity factors
-            score += query_lower.count("join") * 5
-            score += query_lower.count("select") * 2
-            score += query_lower.count("where") * 3
-            score += query_lower.count("group by") * 4
-            score += query_lower.count("order by") * 3
-            score += query_lower.count("having") * 4
-            score += query_lower.count("union") * 6
-            score += query_lower.count("subquery") * 5
-            
-            # Add complexity for nested structures
-            score += (query.count('(') - query.count(')')) * 2
-            
-            return score
-            
-        except Exception as e:
-            logger.error(f"Error calculating complexity score: {e}")
-            return 0
+        score = 0
+        counts = features.counts
+        
+        # Count various complexity factors
+        score += counts.get("join", 0) * 5
+        score += counts.get("select", 0) * 2
+        score += counts.get("where", 0) * 3
+        score += counts.get("group by", 0) * 4
+        score += counts.get("order by", 0) * 3
+        score += counts.get("having", 0) * 4
+        score += counts.get("union", 0) * 6
+        score += counts.get("subquery", 0) * 5
+        
+        # Add complexity for nested structures
+        score += (features.open_parens - features.close_parens) * 2
+        
+        return score
 
-    def _get_optimization_suggestions(self, query: str) -> List[Dict[str, str]]:
+    def _get_optimization_suggestions(self, features: QueryFeatures) -> List[Dict[str, Any]]:
         """Get specific optimization suggestions for the query."""
-        try:
-            suggestions = []
-            query_lower = query.lower()
-            
-            # Check for SELECT *
-            if "select *" in query_lower:
-                suggestions.append({
-                    "type": "performance",
-                    "priority": "high",
-                    "message": "Replace SELECT * with specific column names",
-                    "impact": "medium"
-                })
-            
-            # Check for missing WHERE clause
-            if "from" in query_lower and "where" not in query_lower:
-                suggestions.append({
-                    "type": "performance",
-                    "priority": "medium",
-                    "message": "Consider adding WHERE clause for large tables",
-                    "impact": "high"
-                })
-            
-            # Check for inefficient JOINs
-            if query_lower.count("join") > 2:
-                suggestions.append({
-                    "type": "performance",
-                    "priority": "medium",
-                    "message": "Multiple JOINs detected - consider optimizing join order",
-                    "impact": "medium"
-                })
-            
-            # Check for subqueries in SELECT
-            if "select" in query_lower and "(" in query_lower:
-                suggestions.append({
-                    "type": "performance",
-                    "priority": "low",
-                    "message": "Consider using JOINs instead of subqueries in SELECT",
-                    "impact": "medium"
-                })
-            
-            return suggestions
-            
-        except Exception as e:
-            logger.error(f"Error getting optimization suggestions: {e}")
-            return [{"error": str(e)}]
+        suggestions = []
+        counts = features.counts
+        
+        # Check for SELECT *
+        if features.has_select_star:
+            suggestions.append(dict(_SELECT_STAR_SUGGESTION))
+        
+        # Check for missing WHERE clause
+        if counts.get("from", 0) and not features.has_where:
+            suggestions.append(dict(_MISSING_WHERE_SUGGESTION))
+        
+        # Check for inefficient JOINs
+        if counts.get("join", 0) > 2:
+            suggestions.append(dict(_MULTIPLE_JOINS_SUGGESTION))
+        
+        # Check for subqueries in SELECT
+        if counts.get("select", 0) and features.open_parens:
+            suggestions.append(dict(_SUBQUERY_IN_SELECT_SUGGESTION))
+        
+        return suggestions
 
-    def _identify_performance_issues(self, query: str) -> List[Dict[str, str]]:
+    def _identify_performance_issues(self, features: QueryFeatures) -> List[Dict[str, str]]:
         """Identify specific performance issues in the query."""
-        try:
-            issues = []
-            query_lower = query.lower()
-            
-            # Check for common anti-patterns
-            if "select *" in query_lower:
-                issues.append({
-                    "type": "anti_pattern",
-                    "severity": "warning",
-                    "description": "SELECT * usage may return unnecessary data"
-                })
-            
-            if "order by" in query_lower and "limit" not in query_lower:
-                issues.append({
-                    "type": "performance",
-                    "severity": "info",
-                    "description": "ORDER BY without LIMIT may process large result sets"
-                })
-            
-            if query_lower.count("select") > 3:
-                issues.append({
-                    "type": "complexity",
-                    "severity": "warning",
-                    "description": "Multiple SELECT statements may indicate inefficient query structure"
-                })
-            
-            return issues
-            
-        except Exception as e:
-            logger.error(f"Error identifying performance issues: {e}")
-            return [{"error": str(e)}]
+        issues = []
+        counts = features.counts
+        
+        # Check for common anti-patterns
+        if features.has_select_star:
+            issues.append(dict(_SELECT_STAR_ISSUE))
+        
+        if features.has_order_by_no_limit:
+            issues.append(dict(_ORDER_BY_WITHOUT_LIMIT_ISSUE))
+        
+        if counts.get("select", 0) > 3:
+            issues.append(dict(_MULTIPLE_SELECTS_ISSUE))
+        
+        return issues
 
     def _estimate_optimization_impact(self, suggestions: List[Dict], issues: List[Dict]) -> str:
         """Estimate the impact of applying optimizations."""
-        try:
-            high_priority_count = sum(1 for s in suggestions if s.get("priority") == "high")
-            high_impact_count = sum(1 for s in suggestions if s.get("impact") == "high")
-            
-            if high_priority_count > 0 or high_impact_count > 0:
-                return "high"
-            elif len(suggestions) > 2 or len(issues) > 2:
-                return "medium"
-            else:
-                return "low"
-                
-        except Exception as e:
-            logger.error(f"Error estimating optimization impact: {e}")
+        if any(suggestion.get("priority") == "high" or suggestion.get("impact") == "high"
+               for suggestion in suggestions):
+            return "high"
+        elif len(suggestions) > 2 or len(issues) > 2:
+            return "medium"
+        else:
             return "low"
 
     def _extract_table_names(self, query: str) -> List[str]:
         """Extract table names from query."""
-        try:
-            tables = []
-            query_lower = query.lower()
-            
-            # Simple extraction - in production you'd use proper SQL parsing
-            words = query_lower.split()
-            for i, word in enumerate(words):
-                if word == "from" and i + 1 < len(words):
-                    table_name = words[i + 1].strip(";,")
-                    if table_name and not table_name.startswith("("):
-                        tables.append(table_name)
-                elif word == "join" and i + 1 < len(words):
-                    table_name = words[i + 1].strip(";,")
-                    if table_name and not table_name.startswith("("):
-                        tables.append(table_name)
-            
-            return list(set(tables))  # Remove duplicates
-            
-        except Exception as e:
-            logger.error(f"Error extracting table names: {e}")
-            return []
+        # Simple extraction - in production you'd use proper SQL parsing
+        return list(_scan_table_names(query))
 
-    def _analyze_join_structure(self, query: str) -> Dict[str, Any]:
+    def _analyze_join_structure(self, features: QueryFeatures) -> Dict[str, Any]:
         """Analyze the JOIN structure of the query."""
-        try:
-            analysis = {
-                "join_count": 0,
-                "has_cross_join": False,
-                "has_subquery_joins": False,
-                "join_types": []
-            }
-            
-            query_lower = query.lower()
-            
-            # Count JOINs
-            analysis["join_count"] = query_lower.count("join")
-            
-            # Check for CROSS JOIN
-            if "cross join" in query_lower:
-                analysis["has_cross_join"] = True
-                analysis["join_types"].append("CROSS")
-            
-            # Check for subquery JOINs
-            if "join" in query_lower and "(" in query_lower:
-                analysis["has_subquery_joins"] = True
-            
-            # Identify other join types
-            if "inner join" in query_lower:
-                analysis["join_types"].append("INNER")
-            if "left join" in query_lower:
-                analysis["join_types"].append("LEFT")
-            if "right join" in query_lower:
-                analysis["join_types"].append("RIGHT")
-            
-            return analysis
-            
-        except Exception as e:
-            logger.error(f"Error analyzing join structure: {e}")
-            return {"join_count": 0, "has_cross_join": False, "has_subquery_joins": False, "join_types": []}
+        analysis: Dict[str, Any] = {
+            "join_count": 0,
+            "has_cross_join": False,
+            "has_subquery_joins": False,
+            "join_types": []
+        }
+        
+        # Count JOINs
+        analysis["join_count"] = features.join_count
+        
+        # Check for CROSS JOIN
+        if "CROSS" in features.join_types:
+            analysis["has_cross_join"] = True
+            analysis["join_types"].append("CROSS")
+        
+        # Check for subquery JOINs
+        if features.counts.get("join", 0) and features.open_parens:
+            analysis["has_subquery_joins"] = True
+        
+        # Identify other join types
+        for join_type in ("INNER", "LEFT", "RIGHT"):
+            if join_type in features.join_types:
+                analysis["join_types"].append(join_type)
+        
+        return analysis
 
-    def _suggest_join_order(self, query: str) -> List[str]:
+    def _suggest_join_order(self, query: str, table_stats: Optional[Dict] = None) -> List[str]:
         """Suggest optimal join order based on table sizes and relationships."""
-        try:
-            # This is a simplified suggestion - in practice you'd need table statistics
-            tables = self._extract_table_names(query)
-            
-            if len(tables) <= 2:
-                return tables
-            
-            # Simple heuristic: put smaller tables first
-            # In practice, you'd use actual table statistics
-            return sorted(tables, key=lambda x: len(x))  # Sort by table name length as proxy for size
-            
-        except Exception as e:
-            logger.error(f"Error suggesting join order: {e}")
-            return []
+        tables = self._extract_table_names(query)
+        
+        if len(tables) <= 2:
+            return tables
+        
+        # Put smaller tables first, using row counts when statistics are available;
+        # tables without statistics go last
+        if table_stats:
+            return sorted(tables, key=lambda table: table_stats.get(table, {}).get("row_count", float("inf")))
+        
+        # Without statistics, fall back to table name length as a proxy for size
+        return sorted(tables, key=len)
 
     def _analyze_join_order(self, parsed_query) -> List[str]:
         """Analyze JOIN order for optimization opportunities."""
-        try:
-            issues = []
-            
-            # This would analyze the actual JOIN order in the parsed query
-            # For now, return empty list as placeholder
-            return issues
-            
-        except Exception as e:
-            logger.error(f"Error analyzing join order: {e}")
-            return []
+        issues: List[str] = []
+        
+        # This would analyze the actual JOIN order in the parsed query
+        # For now, return empty list as placeholder
+        return issues
 
     def _check_subquery_optimization(self, parsed_query) -> List[str]:
         """Check if subqueries can be optimized or rewritten."""
-        try:
-            issues = []
-            
-            # This would analyze subqueries in the parsed query
-            # For now, return empty list as placeholder
-            return issues
-            
-        except Exception as e:
-            logger.error(f"Error checking subquery optimization: {e}")
-            return [] 
\ No newline at end of file
+        issues: List[str] = []
+        
+        # This would analyze subqueries in the parsed query
+        # For now, return empty list as placeholder
+        return issues
\ No newline at end of file
@@ -1,15 +1,235 @@
 import logging
-import sqlparse
-from typing import Dict, List, Any
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, Iterable, Iterator, List, Any, Set, Tuple
 
 logger = logging.getLogger(__name__)
 
+# Performance and readability tokens, matched case-insensitively in one pass
+_TOKEN_RE = re.compile(
+    r"\b(?:select\s*\*|order\s+by|(?:select|from|where|join|on|as|limit|index)\b)",
+    re.IGNORECASE
+)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+# Performance anti-pattern definitions, shared read-only by all validator instances
+_PERFORMANCE_PATTERNS = MappingProxyType({
+    "select_star": "SELECT * usage without specific columns",
+    "missing_where": "No WHERE clause on large table queries",
+    "multiple_selects": "Multiple SELECT statements instead of JOINs",
+    "missing_indexes": "JOINs without proper index considerations",
+    "no_limit": "ORDER BY without LIMIT clause"
+})
+
+# Issue and suggestion templates for the performance and readability checks;
+# read-only, each result gets its own copy
+_SELECT_STAR_ISSUE = MappingProxyType({
+    "type": "performance",
+    "severity": "warning",
+    "message": "SELECT * usage detected - consider specifying only needed columns"
+})
+_MISSING_WHERE_ISSUE = MappingProxyType({
+    "type": "performance",
+    "severity": "warning",
+    "message": "No WHERE clause detected - consider adding filters for large tables"
+})
+_MULTIPLE_SELECTS_ISSUE = MappingProxyType({
+    "type": "performance",
+    "severity": "info",
+    "message": "Multiple SELECT statements detected - consider using JOINs or subqueries"
+})
+_MISSING_INDEX_HINT_ISSUE = MappingProxyType({
+    "type": "performance",
+    "severity": "info",
+    "message": "JOIN detected without index hints - verify proper indexing"
+})
+_TABLE_ALIAS_SUGGESTION = MappingProxyType({
+    "type": "readability",
+    "message": "Consider using table aliases for better readability"
+})
+_COLUMN_ALIAS_SUGGESTION = MappingProxyType({
+    "type": "readability",
+    "message": "Consider aliasing calculated columns for clarity"
+})
+_FORMATTING_SUGGESTION = MappingProxyType({
+    "type": "readability",
+    "message": "Consider proper query formatting and indentation"
+})
+_ORDER_BY_WITHOUT_LIMIT_SUGGESTION = MappingProxyType({
+    "type": "performance",
+    "message": "Consider adding LIMIT clause when using ORDER BY"
+})
+_JOIN_WITHOUT_ON_SUGGESTION = MappingProxyType({
+    "type": "syntax",
+    "message": "JOIN detected without ON clause - verify join conditions"
+})
+
+# Security tokens in reporting order
+_FORBIDDEN_KEYWORDS = ('DROP', 'DELETE', 'UPDATE', 'INSERT', 'TRUNCATE', 'ALTER')
+_INJECTION_PATTERNS = ("exec(", "execute(", "sp_", "xp_", "openrowset", "opendatasource")
+_DYNAMIC_SQL_KEYWORDS = ("exec", "execute")
+_SYSTEM_TABLES = ("sys.", "information_schema.", "master.", "tempdb.")
+
+def _compile_security_pattern(forbidden_keywords: Iterable[str]) -> "re.Pattern[str]":
+    """Compile every security token into one case-insensitive alternation.
+
+    Longer tokens come first so "execute(" wins over "exec", and tokens ending
+    in a word character must end on a word boundary.
+    """
+    tokens = {keyword.lower() for keyword in forbidden_keywords}
+    tokens.update(_INJECTION_PATTERNS, _DYNAMIC_SQL_KEYWORDS, _SYSTEM_TABLES)
+    alternatives = [
+        re.escape(token) + (r"\b" if token[-1].isalnum() else "")
+        for token in sorted(tokens, key=lambda token: (-len(token), token))
+    ]
+    return re.compile(r"\b(?:" + "|".join(alternatives) + ")", re.IGNORECASE)
+
+# Token presence bits set by _scan_tokens
+(_TOKEN_SELECT, _TOKEN_SELECT_STAR, _TOKEN_FROM, _TOKEN_WHERE, _TOKEN_JOIN,
+ _TOKEN_ON, _TOKEN_AS, _TOKEN_ORDER_BY, _TOKEN_LIMIT, _TOKEN_INDEX) = (1 << bit for bit in range(10))
+
+_TOKEN_BITS = {
+    "select": _TOKEN_SELECT,
+    "from": _TOKEN_FROM,
+    "where": _TOKEN_WHERE,
+    "join": _TOKEN_JOIN,
+    "on": _TOKEN_ON,
+    "as": _TOKEN_AS,
+    "order by": _TOKEN_ORDER_BY,
+    "limit": _TOKEN_LIMIT,
+    "index": _TOKEN_INDEX
+}
+
+@lru_cache(maxsize=512)
+def _scan_tokens(query: str) -> Tuple[int, int]:
+    """Collect a bitmask of the validator's tokens and the SELECT count in one regex pass."""
+    mask = select_count = 0
+    for match in _TOKEN_RE.finditer(query):
+        token = _WHITESPACE_RE.sub(" ", match.group(0).lower())
+        if token.startswith("select"):
+            select_count += 1
+            if token.endswith("*"):
+                mask |= _TOKEN_SELECT_STAR
+            token = "select"
+        mask |= _TOKEN_BITS[token]
+    return mask, select_count
+
+# Tokens the statement scanner stops on. Quoted text and comments are matched
+# whole, so parens, semicolons and keywords inside them are skipped.
+_STATEMENT_TOKEN_RE = re.compile(
+    r"'(?:[^']+|'')*'?|\"[^\"]*\"?|\[[^\]]*\]?"
+    r"|--[^\n]*|/\*.*?(?:\*/|\Z)"
+    r"|[();]"
+    r"|\b(?:select|from|where|like|or|and|is\s+null|group\s+by|order\s+by|having|limit|union)\b",
+    re.IGNORECASE | re.DOTALL
+)
+
+# Statement flag bits collected by _scan_statements
+_SELECT, _FROM, _LIKE_LEADING_WILDCARD, _OR, _AND, _IS_NULL = 1, 2, 4, 8, 16, 32
+
+_WHERE_CONDITION_FLAGS = {"or": _OR, "and": _AND, "is null": _IS_NULL}
+
+# Keywords that end a WHERE clause opened at the same paren depth
+_WHERE_END_KEYWORDS = frozenset({"group by", "order by", "having", "limit", "union"})
+
+@dataclass(frozen=True)
+class _StatementScan:
+    """One statement's raw text and the features the syntax checks need."""
+    text: str
+    flags: int
+    open_parens: int
+    close_parens: int
+
+@lru_cache(maxsize=1024)
+def _scan_statements(query: str) -> Tuple[_StatementScan, ...]:
+    """Split a query into statements and collect their features in one regex pass.
+
+    Statements end at semicolons outside quotes and comments, and keep the
+    trailing whitespace after them. Whitespace-only remainders are dropped.
+    """
+    statements = []
+    start = flags = open_parens = close_parens = depth = 0
+    where_depths: List[int] = []
+    previous = ""
+    
+    for match in _STATEMENT_TOKEN_RE.finditer(query):
+        token = match.group(0)
+        first = token[0]
+        
+        if first in "-/":
+            continue
+        
+        if first in "'\"[":
+            if previous == "like" and token.startswith("'%") and where_depths:
+                flags |= _LIKE_LEADING_WILDCARD
+        elif token == "(":
+            depth += 1
+            open_parens += 1
+        elif token == ")":
+            depth -= 1
+            close_parens += 1
+            while where_depths and where_depths[-1] > depth:
+                where_depths.pop()
+        elif token == ";":
+            end = match.end()
+            trailing = _WHITESPACE_RE.match(query, end)
+            if trailing:
+                end = trailing.end()
+            statements.append(_StatementScan(query[start:end], flags, open_parens, close_parens))
+            start = end
+            flags = open_parens = close_parens = depth = 0
+            where_depths = []
+        else:
+            token = _WHITESPACE_RE.sub(" ", token.lower())
+            if token == "select":
+                flags |= _SELECT
+            elif token == "from":
+                flags |= _FROM
+            elif token == "where":
+                where_depths.append(depth)
+            elif where_depths:
+                if token in _WHERE_END_KEYWORDS:
+                    if where_depths[-1] == depth:
+                        where_depths.pop()
+                else:
+                    flags |= _WHERE_CONDITION_FLAGS.get(token, 0)
+        
+        previous = token
+    
+    if query[start:].strip():
+        statements.append(_StatementScan(query[start:], flags, open_parens, close_parens))
+    
+    return tuple(statements)
+
 class TSQLValidator:
     """Validates T-SQL syntax, best practices, and performance considerations."""
     
     def __init__(self):
-        self.forbidden_keywords = ['DROP', 'DELETE', 'UPDATE', 'INSERT', 'TRUNCATE', 'ALTER']
-        self.performance_patterns = self._load_performance_patterns()
+        self.forbidden_keywords = _FORBIDDEN_KEYWORDS
+        self.performance_patterns = _PERFORMANCE_PATTERNS
+        self._security_re = _compile_security_pattern(self.forbidden_keywords)
+
+    def validate(self, query: str) -> Dict[str, Any]:
+        """Run every check on a query, sharing one token scan between them."""
+        try:
+            mask, select_count = _scan_tokens(query)
+            syntax = self.validate_syntax(query)
+            security = self.validate_security(query)
+            
+            return {
+                "valid": syntax["valid"] and security["valid"],
+                "syntax": syntax,
+                "security": security,
+                "performance": list(self._iter_performance_issues(mask, select_count)),
+                "improvements": list(self._iter_improvement_suggestions(query, mask))
+            }
+            
+        except Exception as e:
+            logger.error(f"Error validating query: {e}")
+            return {"valid": False, "error": str(e)}
 
     def validate_syntax(self, query: str) -> Dict[str, Any]:
         """Validate T-SQL syntax and structure."""
@@ -20,16 +240,16 @@ class TSQLValidator:
                 "warnings": []
             }
             
-            # Parse the query
+            # Split and scan the query
             try:
-                parsed_statements = sqlparse.parse(query)
-                if not parsed_statements:
+                statements = _scan_statements(query)
+                if not statements:
                     validation_result["valid"] = False
                     validation_result["errors"].append("Empty query")
                     return validation_result
                 
                 # Check each statement
-                for statement in parsed_statements:
+                for statement in statements:
                     statement_validation = self._validate_statement(statement)
                     if not statement_validation["valid"]:
                         validation_result["valid"] = False
@@ -51,42 +271,8 @@ class TSQLValidator:
     def check_performance_patterns(self, query: str) -> List[Dict[str, str]]:
         """Check for common performance anti-patterns."""
         try:
-            issues = []
-            query_lower = query.lower()
-            
-            # Check for SELECT *
-            if self._check_select_star_usage(query_lower):
-                issues.append({
-                    "type": "performance",
-                    "severity": "warning",
-                    "message": "SELECT * usage detected - consider specifying only needed columns"
-                })
-            
-            # Check for missing WHERE clause in large table queries
-            if "from" in query_lower and "where" not in query_lower:
-                issues.append({
-                    "type": "performance",
-                    "severity": "warning",
-                    "message": "No WHERE clause detected - consider adding filters for large tables"
-                })
-            
-            # Check for potential N+1 query patterns
-            if query_lower.count("select") > 3:
-                issues.append({
-                    "type": "performance",
-                    "severity": "info",
-                    "message": "Multiple SELECT statements detected - consider using JOINs or subqueries"
-                })
-            
-            # Check for missing indexes hints
-            if "join" in query_lower and "index" not in query_lower:
-                issues.append({
-                    "type": "performance",
-                    "severity": "info",
-                    "message": "JOIN detected without index hints - verify proper indexing"
-                })
-            
-            return issues
+            mask, select_count = _scan_tokens(query)
+            return list(self._iter_performance_issues(mask, select_count))
             
         except Exception as e:
             logger.error(f"Error checking performance patterns: {e}")
@@ -101,31 +287,32 @@ class TSQLValidator:
                 "forbidden_operations": []
             }
             
-            query_upper = query.upper()
+            # Collect every security token in one scan; a call like "exec(" also counts as "exec"
+            hits: Set[str] = set()
+            for match in self._security_re.finditer(query):
+                token = match.group(0).lower()
+                hits.add(token)
+                if token.endswith("("):
+                    hits.add(token[:-1])
             
             # Check for forbidden keywords
             for keyword in self.forbidden_keywords:
-                if keyword in query_upper:
+                if keyword.lower() in hits:
                     security_result["valid"] = False
                     security_result["forbidden_operations"].append(keyword)
             
             # Check for potential SQL injection patterns
-            injection_patterns = [
-                "exec(", "execute(", "sp_", "xp_", "openrowset", "opendatasource"
-            ]
-            
-            for pattern in injection_patterns:
-                if pattern in query_upper:
+            for pattern in _INJECTION_PATTERNS:
+                if pattern in hits:
                     security_result["risks"].append(f"Potential SQL injection risk: {pattern}")
             
             # Check for dynamic SQL patterns
-            if "exec" in query_upper or "execute" in query_upper:
+            if hits.intersection(_DYNAMIC_SQL_KEYWORDS):
                 security_result["risks"].append("Dynamic SQL execution detected")
             
             # Check for system table access
-            system_tables = ["sys.", "information_schema.", "master.", "tempdb."]
-            for table in system_tables:
-                if table in query_upper:
+            for table in _SYSTEM_TABLES:
+                if table in hits:
                     security_result["risks"].append(f"System table access: {table}")
             
             return security_result
@@ -137,118 +324,82 @@ class TSQLValidator:
     def suggest_improvements(self, query: str) -> List[Dict[str, str]]:
         """Suggest query improvements for readability and performance."""
         try:
-            suggestions = []
-            query_lower = query.lower()
-            
-            # Check for proper aliasing
-            if "from" in query_lower and "as" not in query_lower:
-                suggestions.append({
-                    "type": "readability",
-                    "message": "Consider using table aliases for better readability"
-                })
-            
-            # Check for proper column aliasing
-            if "select" in query_lower and "as" not in query_lower:
-                suggestions.append({
-                    "type": "readability",
-                    "message": "Consider aliasing calculated columns for clarity"
-                })
-            
-            # Check for proper indentation
-            if query.count('\n') < 3:
-                suggestions.append({
-                    "type": "readability",
-                    "message": "Consider proper query formatting and indentation"
-                })
-            
-            # Check for ORDER BY without LIMIT
-            if "order by" in query_lower and "limit" not in query_lower:
-                suggestions.append({
-                    "type": "performance",
-                    "message": "Consider adding LIMIT clause when using ORDER BY"
-                })
-            
-            # Check for proper JOIN syntax
-            if "join" in query_lower and "on" not in query_lower:
-                suggestions.append({
-                    "type": "syntax",
-                    "message": "JOIN detected without ON clause - verify join conditions"
-                })
-            
-            return suggestions
+            mask, _ = _scan_tokens(query)
+            return list(self._iter_improvement_suggestions(query, mask))
             
         except Exception as e:
             logger.error(f"Error suggesting improvements: {e}")
             return [{"type": "error", "message": str(e)}]
 
-    def _load_performance_patterns(self) -> Dict[str, str]:
-        """Load performance anti-pattern definitions."""
-        return {
-            "select_star": "SELECT * usage without specific columns",
-            "missing_where": "No WHERE clause on large table queries",
-            "multiple_selects": "Multiple SELECT statements instead of JOINs",
-            "missing_indexes": "JOINs without proper index considerations",
-            "no_limit": "ORDER BY without LIMIT clause"
-        }
+    def _iter_performance_issues(self, mask: int, select_count: int) -> Iterator[Dict[str, str]]:
+        """Yield performance issues from a query's token scan."""
+        # Check for SELECT *
+        if mask & _TOKEN_SELECT_STAR:
+            yield dict(_SELECT_STAR_ISSUE)
+        
+        # Check for missing WHERE clause in large table queries
+        if mask & _TOKEN_FROM and not mask & _TOKEN_WHERE:
+            yield dict(_MISSING_WHERE_ISSUE)
+        
+        # Check for potential N+1 query patterns
+        if select_count > 3:
+            yield dict(_MULTIPLE_SELECTS_ISSUE)
+        
+        # Check for missing indexes hints
+        if mask & _TOKEN_JOIN and not mask & _TOKEN_INDEX:
+            yield dict(_MISSING_INDEX_HINT_ISSUE)
+
+    def _iter_improvement_suggestions(self, query: str, mask: int) -> Iterator[Dict[str, str]]:
+        """Yield readability and performance suggestions from a query's token scan."""
+        # Check for proper aliasing
+        if mask & _TOKEN_FROM and not mask & _TOKEN_AS:
+            yield dict(_TABLE_ALIAS_SUGGESTION)
+        
+        # Check for proper column aliasing
+        if mask & _TOKEN_SELECT and not mask & _TOKEN_AS:
+            yield dict(_COLUMN_ALIAS_SUGGESTION)
+        
+        # Check for proper indentation
+        if query.count('\n') < 3:
+            yield dict(_FORMATTING_SUGGESTION)
+        
+        # Check for ORDER BY without LIMIT
+        if mask & _TOKEN_ORDER_BY and not mask & _TOKEN_LIMIT:
+            yield dict(_ORDER_BY_WITHOUT_LIMIT_SUGGESTION)
+        
+        # Check for proper JOIN syntax
+        if mask & _TOKEN_JOIN and not mask & _TOKEN_ON:
+            yield dict(_JOIN_WITHOUT_ON_SUGGESTION)
 
-    def _check_select_star_usage(self, query_lower: str) -> bool:
+    def _check_select_star_usage(self, query: str) -> bool:
         """Check for inefficient SELECT * usage."""
-        try:
-            # Look for SELECT * pattern
-            if "select *" in query_lower:
-                # Check if it's in a subquery or main query
-                select_parts = query_lower.split("select")
-                for part in select_parts[1:]:  # Skip first empty part
-                    if part.strip().startswith("*"):
-                        return True
-            
-            return False
-            
-        except Exception as e:
-            logger.error(f"Error checking SELECT * usage: {e}")
-            return False
+        return bool(_scan_tokens(query)[0] & _TOKEN_SELECT_STAR)
 
-    def _analyze_where_clause(self, parsed_query) -> List[str]:
-        """Analyze WHERE clause for optimization opportunities."""
+    def _analyze_where_clause(self, query: str) -> List[str]:
+        """Analyze the WHERE clauses of a query string for optimization opportunities."""
         try:
             issues = []
+            flags = 0
+            for statement in _scan_statements(query):
+                flags |= statement.flags
             
-            def analyze_where_tokens(tokens):
-                for token in tokens:
-                    if token.ttype is sqlparse.tokens.Keyword and token.value.upper() == 'WHERE':
-                        # Analyze the WHERE clause
-                        where_conditions = []
-                        for sibling in token.parent.tokens:
-                            if sibling.ttype is sqlparse.tokens.Whitespace:
-                                continue
-                            if sibling.ttype is sqlparse.tokens.Keyword and sibling.value.upper() == 'WHERE':
-                                continue
-                            where_conditions.append(str(sibling))
-                        
-                        where_text = ' '.join(where_conditions).lower()
-                        
-                        # Check for common issues
-                        if "like '%" in where_text:
-                            issues.append("LIKE with leading wildcard may not use indexes efficiently")
-                        
-                        if "or" in where_text and "and" in where_text:
-                            issues.append("Complex OR/AND conditions may benefit from query restructuring")
-                        
-                        if "is null" in where_text:
-                            issues.append("NULL checks may benefit from proper indexing")
-                    
-                    # Recursively check child tokens
-                    for child in token.tokens:
-                        analyze_where_tokens(child)
+            # Check for common issues
+            if flags & _LIKE_LEADING_WILDCARD:
+                issues.append("LIKE with leading wildcard may not use indexes efficiently")
+            
+            if flags & _OR and flags & _AND:
+                issues.append("Complex OR/AND conditions may benefit from query restructuring")
+            
+            if flags & _IS_NULL:
+                issues.append("NULL checks may benefit from proper indexing")
             
-            analyze_where_tokens(parsed_query)
             return issues
             
         except Exception as e:
             logger.error(f"Error analyzing WHERE clause: {e}")
             return []
 
-    def _validate_statement(self, statement) -> Dict[str, Any]:
+    def _validate_statement(self, statement: _StatementScan) -> Dict[str, Any]:
         """Validate a single SQL statement."""
         try:
             validation_result = {
@@ -258,19 +409,19 @@ class TSQLValidator:
             }
             
             # Check for basic structure
-            statement_text = str(statement).strip()
+            statement_text = statement.text.strip()
             if not statement_text:
                 validation_result["valid"] = False
                 validation_result["errors"].append("Empty statement")
                 return validation_result
             
             # Check for required keywords
-            if not any(keyword in statement_text.upper() for keyword in ["SELECT", "FROM"]):
+            if not statement.flags & (_SELECT | _FROM):
                 validation_result["valid"] = False
                 validation_result["errors"].append("Missing required SELECT and FROM clauses")
             
             # Check for balanced parentheses
-            if statement_text.count('(') != statement_text.count(')'):
+            if statement.open_parens != statement.close_parens:
                 validation_result["valid"] = False
                 validation_result["errors"].append("Unbalanced parentheses")
             
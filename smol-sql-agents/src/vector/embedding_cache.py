@@ -0,0 +1,92 @@
+"""SQLite-backed cache of document embeddings keyed by content hash."""
+
+import hashlib
+import logging
+import sqlite3
+from pathlib import Path
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Keys looked up per SELECT, below SQLite's default 999 parameter limit
+_MAX_QUERY_PARAMS = 500
+
+class EmbeddingCache:
+    """Persistent store of embeddings so unchanged documents are never re-embedded."""
+    
+    def __init__(self, db_path: str):
+        """Initialize the embedding cache.
+        
+        Args:
+            db_path: Path of the SQLite database file
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._init_database()
+    
+    def _init_database(self):
+        """Create the embeddings table."""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    key TEXT PRIMARY KEY,   -- blake2b of model and text
+                    vector BLOB NOT NULL    -- float64 bytes
+                )
+            """)
+    
+    @staticmethod
+    def make_key(model: str, text: str) -> str:
+        """Hash the embedding model and text into a cache key."""
+        return hashlib.blake2b(f"{model}\0{text}".encode(), digest_size=16).hexdigest()
+    
+    def get_many(self, keys: Sequence[str]) -> Dict[str, List[float]]:
+        """Look up cached embeddings.
+        
+        Args:
+            keys: Cache keys from make_key
+        
+        Returns:
+            Dict[str, List[float]]: Embeddings for the keys that are cached
+        """
+        if not keys:
+            return {}
+        
+        try:
+            unique_keys = list(dict.fromkeys(keys))
+            cached = {}
+            with sqlite3.connect(self.db_path) as conn:
+                # Stay under SQLite's bound-parameter limit
+                for start in range(0, len(unique_keys), _MAX_QUERY_PARAMS):
+                    chunk = unique_keys[start:start + _MAX_QUERY_PARAMS]
+                    rows = conn.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})",
+                        chunk
+                    ).fetchall()
+                    for key, vector in rows:
+                        cached[key] = np.frombuffer(vector, dtype=np.float64).tolist()
+            return cached
+        
+        except Exception as e:
+            logger.error(f"Error reading embedding cache: {e}")
+            return {}
+    
+    def put_many(self, embeddings: Dict[str, List[float]]):
+        """Store embeddings under their cache keys.
+        
+        Args:
+            embeddings: Embeddings keyed by make_key
+        """
+        if not embeddings:
+            return
+        
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                    [(key, np.asarray(vector, dtype=np.float64).tobytes()) for key, vector in embeddings.items()]
+                )
+        
+        except Exception as e:
+            logger.error(f"Error writing embedding cache: {e}")
@@ -1,21 +1,36 @@
 """OpenAI embeddings wrapper for SQL documentation."""
 
-from typing import List, Callable, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
 import os
 import re
-import openai
 import tiktoken
 from tenacity import retry, stop_after_attempt, wait_exponential
 
+# Runs of whitespace collapsed to a single space before embedding
+_WHITESPACE_RE = re.compile(r'\s+')
+
+# Token limit per embedded text
+_MAX_INPUT_TOKENS = 8000
+
 class OpenAIEmbeddingsClient:
     """Handles OpenAI embeddings generation with error handling and batching."""
     
     def __init__(self):
+        # Deferred until a client is built, openai is slow to import
+        import openai
         self.client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
         self.model = os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-3-small")
         self.batch_size = int(os.getenv("EMBEDDING_BATCH_SIZE", "100"))
         self.max_retries = int(os.getenv("EMBEDDING_MAX_RETRIES", "3"))
+        self.max_workers = int(os.getenv("OPENAI_MAX_WORKERS", "5"))
+        self.max_tokens_per_request = int(os.getenv("EMBEDDING_MAX_TOKENS_PER_REQUEST", "300000"))
         self._encoder = tiktoken.encoding_for_model(self.model)
+        # Wrap the API call with retries once rather than once per batch
+        self._create_with_retry = retry(
+            stop=stop_after_attempt(self.max_retries),
+            wait=wait_exponential(multiplier=1, min=4, max=10)
+        )(self.client.embeddings.create)
 
     @retry(
         stop=stop_after_attempt(3),
@@ -52,87 +67,104 @@ class OpenAIEmbeddingsClient:
         Raises:
             Exception: If the API call fails after retries
         """
-        prepared_texts = [self._prepare_text_for_embedding(text) for text in texts]
-        embeddings = []
+        prepared_texts, token_counts = self._prepare_texts_for_embedding(texts)
+        batches = self._build_batches(prepared_texts, token_counts)
         
-        # Process in batches
-        for i in range(0, len(prepared_texts), self.batch_size):
-            batch = prepared_texts[i:i + self.batch_size]
-            response = self._retry_with_backoff(
-                self.client.embeddings.create,
-                input=batch,
-                model=self.model
-            )
-            batch_embeddings = [data.embedding for data in response.data]
+        # Send batches concurrently over the client's pooled connections;
+        # map keeps the results in batch order
+        if len(batches) > 1 and self.max_workers > 1:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches))) as executor:
+                batch_results = list(executor.map(self._embed_batch, batches))
+        else:
+            batch_results = [self._embed_batch(batch) for batch in batches]
+        
+        embeddings = []
+        for batch_embeddings in batch_results:
             embeddings.extend(batch_embeddings)
         
         return embeddings
 
-    def _prepare_text_for_embedding(self, text: str) -> str:
-        """Clean and prepare text for embedding generation.
+    def _prepare_texts_for_embedding(self, texts: List[str]) -> Tuple[List[str], List[int]]:
+        """Clean and truncate texts, keeping the token count of each.
         
         Args:
-            text: Raw text to prepare
+            texts: Raw texts to prepare
             
         Returns:
-            str: Cleaned and prepared text
+            Tuple[List[str], List[int]]: Prepared texts and their token counts
         """
-        # Remove extra whitespace
-        text = re.sub(r'\s+', ' ', text.strip())
+        cleaned_texts = [_WHITESPACE_RE.sub(' ', text.strip()) for text in texts]
         
-        # Truncate if needed
-        if self._count_tokens(text) > 8000:
-            text = self._truncate_text(text)
-            
-        return text
+        # Tokenize everything in one native, multithreaded call
+        all_tokens = self._encoder.encode_batch(cleaned_texts, num_threads=os.cpu_count() or 1)
+        
+        prepared_texts = []
+        token_counts = []
+        for text, tokens in zip(cleaned_texts, all_tokens):
+            if len(tokens) > _MAX_INPUT_TOKENS:
+                tokens = tokens[:_MAX_INPUT_TOKENS]
+                text = self._encoder.decode(tokens)
+            prepared_texts.append(text)
+            token_counts.append(len(tokens))
+        
+        return prepared_texts, token_counts
 
-    def _count_tokens(self, text: str) -> int:
-        """Count tokens to ensure we don't exceed OpenAI limits.
+    def _build_batches(self, prepared_texts: List[str], token_counts: List[int]) -> List[List[str]]:
+        """Pack texts greedily into requests bounded by batch size and token budget.
         
         Args:
-            text: Text to count tokens for
+            prepared_texts: Prepared texts in input order
+            token_counts: Token count of each prepared text
             
         Returns:
-            int: Number of tokens
+            List[List[str]]: Batches of texts, one per API request
         """
-        return len(self._encoder.encode(text))
+        batches = []
+        batch: List[str] = []
+        batch_tokens = 0
+        for text, token_count in zip(prepared_texts, token_counts):
+            if batch and (
+                len(batch) >= self.batch_size
+                or batch_tokens + token_count > self.max_tokens_per_request
+            ):
+                batches.append(batch)
+                batch = []
+                batch_tokens = 0
+            batch.append(text)
+            batch_tokens += token_count
+        
+        if batch:
+            batches.append(batch)
+        
+        return batches
 
-    def _truncate_text(self, text: str, max_tokens: int = 8000) -> str:
-        """Truncate text to fit within token limits.
+    def _embed_batch(self, batch: List[str]) -> List[List[float]]:
+        """Generate embeddings for one request's worth of prepared texts.
         
         Args:
-            text: Text to truncate
-            max_tokens: Maximum number of tokens allowed
+            batch: Prepared texts to send in a single API request
             
         Returns:
-            str: Truncated text
+            List[List[float]]: Embedding vectors in input order
         """
-        tokens = self._encoder.encode(text)
-        if len(tokens) <= max_tokens:
-            return text
-            
-        truncated_tokens = tokens[:max_tokens]
-        return self._encoder.decode(truncated_tokens)
+        response = self._create_with_retry(input=batch, model=self.model)
+        return [data.embedding for data in response.data]
 
-    def _retry_with_backoff(self, func: Callable, *args: Any, **kwargs: Any) -> Any:
-        """Retry failed requests with exponential backoff.
+    def _prepare_text_for_embedding(self, text: str) -> str:
+        """Clean and prepare text for embedding generation.
         
         Args:
-            func: Function to retry
-            *args: Positional arguments for the function
-            **kwargs: Keyword arguments for the function
+            text: Raw text to prepare
             
         Returns:
-            Any: Result from the function
-            
-        Raises:
-            Exception: If all retries fail
+            str: Cleaned and prepared text
         """
-        @retry(
-            stop=stop_after_attempt(self.max_retries),
-            wait=wait_exponential(multiplier=1, min=4, max=10)
-        )
-        def _wrapped_func():
-            return func(*args, **kwargs)
+        # Remove extra whitespace
+        text = _WHITESPACE_RE.sub(' ', text.strip())
+        
+        # Encode once and truncate from the same tokens if needed
+        tokens = self._encoder.encode(text)
+        if len(tokens) > _MAX_INPUT_TOKENS:
+            text = self._encoder.decode(tokens[:_MAX_INPUT_TOKENS])
             
-        return _wrapped_func()
+        return text
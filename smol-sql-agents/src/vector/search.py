@@ -1,10 +1,58 @@
 """Enhanced search tools using OpenAI embeddings for semantic similarity."""
 
-from typing import List, Dict
+import concurrent.futures
+import heapq
+import threading
+import time
+from functools import lru_cache
+from itertools import chain
+from operator import itemgetter
+from typing import Any, List, Dict, Optional, Sequence, Tuple
 from ..agents.core import PersistentDocumentationAgent
 from ..agents.indexer import SQLIndexerAgent
 from .store import SQLVectorStore
 
+# Documentation agent shared by the search helpers, created on first use
+_agent: Optional[PersistentDocumentationAgent] = None
+_agent_lock = threading.Lock()
+
+def _get_agent() -> PersistentDocumentationAgent:
+    """Return the shared documentation agent, creating it once across threads."""
+    global _agent
+    if _agent is None:
+        with _agent_lock:
+            if _agent is None:
+                _agent = PersistentDocumentationAgent()
+    return _agent
+
+# Seconds a cached search result stays fresh; writes made through the shared
+# agent's vector store invalidate it sooner, so this only bounds how long
+# writes from other processes go unseen
+_SEARCH_CACHE_TTL_SECONDS = 300
+
+@lru_cache(maxsize=2048)
+def _cached_search(query: str, doc_type: str, limit: int, write_generation: int, ttl_bucket: int) -> Tuple[Dict, ...]:
+    """Run one indexer search per query, doc type and limit between index writes, within a TTL window.
+    
+    The cached results are shared between callers, so they must not be mutated.
+    """
+    return tuple(_get_agent().indexer_agent.search_documentation(query, doc_type=doc_type, limit=limit))
+
+def _search_documentation(query: str, doc_type: str, limit: int) -> Sequence[Dict]:
+    """Search through the result cache; blank queries and non-positive limits bypass it."""
+    indexer_agent = _get_agent().indexer_agent
+    if not query.strip() or limit <= 0:
+        return indexer_agent.search_documentation(query, doc_type=doc_type, limit=limit)
+    return _cached_search(
+        query, doc_type, limit,
+        indexer_agent.vector_store.write_generation,
+        int(time.monotonic() // _SEARCH_CACHE_TTL_SECONDS)
+    )
+
+def _top_ranked(candidates: List[Tuple[float, str, Any]], limit: int) -> List[Tuple[float, str, Any]]:
+    """Return the highest-scoring candidates in descending order, ties in input order."""
+    return heapq.nlargest(limit, candidates, key=itemgetter(0))
+
 def search_table_documentation(query: str, limit: int = 5) -> List[Dict]:
     """Search table documentation using OpenAI embeddings similarity.
     
@@ -15,8 +63,7 @@ def search_table_documentation(query: str, limit: int = 5) -> List[Dict]:
     Returns:
         list[dict]: Relevant table documentation matches with similarity scores
     """
-    agent = PersistentDocumentationAgent()
-    results = agent.indexer_agent.search_documentation(query, doc_type="tables", limit=limit)
+    results = _search_documentation(query, "tables", limit)
     
     # Format results for consistent output
     formatted_results = []
@@ -40,8 +87,7 @@ def search_relationship_documentation(query: str, limit: int = 5) -> List[Dict]:
     Returns:
         list[dict]: Relevant relationship documentation matches with similarity scores
     """
-    agent = PersistentDocumentationAgent()
-    results = agent.indexer_agent.search_documentation(query, doc_type="relationships", limit=limit)
+    results = _search_documentation(query, "relationships", limit)
     
     # Format results for consistent output
     formatted_results = []
@@ -78,37 +124,36 @@ def semantic_search_all_documentation(query: str, limit: int = 10) -> Dict:
     per_category_limit = limit // 2
     remaining_limit = limit % 2
     
-    # Search both categories
-    table_results = search_table_documentation(query, per_category_limit + remaining_limit)
-    relationship_results = search_relationship_documentation(query, per_category_limit)
-    
-    # Combine and sort all results by similarity score
-    all_results = []
-    for result in table_results:
-        all_results.append({
-            "type": "table",
-            "name": result["table_name"],
-            "similarity": result["similarity_score"],
-            "content": result
-        })
-    
-    for result in relationship_results:
-        all_results.append({
-            "type": "relationship",
-            "name": result["relationship_id"],
-            "similarity": result["similarity_score"],
-            "content": result
-        })
+    # Search both categories concurrently
+    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+        table_future = executor.submit(
+            search_table_documentation, query, per_category_limit + remaining_limit
+        )
+        relationship_future = executor.submit(
+            search_relationship_documentation, query, per_category_limit
+        )
+        table_results = table_future.result()
+        relationship_results = relationship_future.result()
     
-    # Sort combined results by similarity score
-    all_results.sort(key=lambda x: x["similarity"], reverse=True)
+    # Keep only the top results across both categories, without sorting the rest.
+    # Selection is stable, so tables still come first on equal scores.
+    all_results = _top_ranked(
+        list(chain(
+            ((result["similarity_score"], "table", result) for result in table_results),
+            ((result["similarity_score"], "relationship", result) for result in relationship_results)
+        )),
+        limit
+    )
     
-    # Take top results up to limit
-    all_results = all_results[:limit]
+    # Split the ranked results back into categories in one pass
+    tables = []
+    relationships = []
+    for _, doc_type, result in all_results:
+        (tables if doc_type == "table" else relationships).append(result)
     
     # Format final response
     return {
-        "tables": [r["content"] for r in all_results if r["type"] == "table"],
-        "relationships": [r["content"] for r in all_results if r["type"] == "relationship"],
+        "tables": tables,
+        "relationships": relationships,
         "total_results": len(all_results)
     }
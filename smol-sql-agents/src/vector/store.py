@@ -1,15 +1,56 @@
 """Vector database wrapper for SQL documentation using ChromaDB."""
 
-from typing import Dict, List, Optional, Protocol, Any
+from collections import OrderedDict
+from typing import Dict, List, Optional, Protocol, Any, Tuple
 import os
 import json
 import logging
-import chromadb
+import threading
+import concurrent.futures
+import functools
+import numpy as np
 from pathlib import Path
 from .embeddings import OpenAIEmbeddingsClient
+from .embedding_cache import EmbeddingCache
+
+# orjson serializes metadata several times faster when installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 logger = logging.getLogger(__name__)
 
+# Documents embedded and inserted per index call by the bulk add methods,
+# within ChromaDB's recommended 50-250 batch range
+DEFAULT_ADD_BATCH_SIZE = 200
+
+def _dumps_json(value: Any) -> str:
+    """Serialize a metadata value to a compact JSON string."""
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(value, separators=(",", ":"))
+
+def _stack_vectors(items: List[Tuple[str, Any, Optional[Dict]]]) -> np.ndarray:
+    """Stack the vectors of (id, vector, metadata) items into one float32 matrix.
+    
+    Vectors may be lists or float32 rows of a shared buffer; the buffer rows
+    are copied with one memcpy each rather than converted float by float.
+    """
+    return np.asarray([vector for _, vector, _ in items], dtype=np.float32)
+
+# Rows the brute-force index grows its vector matrix by
+BRUTE_FORCE_GROWTH_ROWS = 1024
+
+# Above this many vectors an HNSW backend searches faster than a full scan
+BRUTE_FORCE_MAX_VECTORS = 10000
+
+# Vectors from which the brute-force scan runs through the numba kernel
+NUMBA_SCAN_MIN_VECTORS = 50000
+
+# Query embeddings kept per store so repeated searches skip the embeddings API
+QUERY_EMBEDDING_CACHE_SIZE = 1024
+
 class VectorIndex(Protocol):
     """Protocol for vector index implementations."""
     
@@ -17,12 +58,24 @@ class VectorIndex(Protocol):
         """Add vector to index."""
         ...
         
+    def add_many(self, items: List[Tuple[str, List[float], Optional[Dict]]]) -> None:
+        """Add several (id, vector, metadata) entries to index in one call."""
+        ...
+        
     def search(self, vector: List[float], k: int = 5) -> List[Dict]:
-        """Search for similar vectors."""
+        """Search for similar vectors.
+        
+        Returns {"id", "content", "score"} dicts, content being the stored
+        metadata and score a similarity in [0, 1].
+        """
         ...
         
     def save(self) -> None:
-        """Save the index."""
+        """Checkpoint the index to persistent storage.
+        
+        Called at lifecycle points such as the end of a bulk add or
+        SQLVectorStore.flush(), not after every write.
+        """
         ...
 
 class ChromaDBIndex:
@@ -41,6 +94,10 @@ class ChromaDBIndex:
         # Ensure directory exists
         Path(self.persist_directory).mkdir(parents=True, exist_ok=True)
         
+        # Imported here so loading this module doesn't pull in ChromaDB's
+        # dependency graph for stores that never create a ChromaDB index
+        import chromadb
+        
         # Initialize ChromaDB client
         self.client = chromadb.PersistentClient(path=self.persist_directory)
         
@@ -57,25 +114,42 @@ class ChromaDBIndex:
         
     def add(self, id: str, vector: List[float], metadata: Optional[Dict] = None) -> None:
         """Add vector to ChromaDB collection."""
+        self.add_many([(id, vector, metadata)])
+        
+    def add_many(self, items: List[Tuple[str, List[float], Optional[Dict]]]) -> None:
+        """Add several vectors to ChromaDB collection with a single insert."""
+        if not items:
+            return
+        
         try:
-            # Prepare metadata for ChromaDB (convert lists to strings)
-            chroma_metadata = self._prepare_metadata_for_chroma(metadata or {})
+            ids = []
+            metadatas = []
+            
+            for id, vector, metadata in items:
+                # Prepare metadata for ChromaDB (convert lists to strings)
+                chroma_metadata = self._prepare_metadata_for_chroma(metadata)
+                
+                # Add the document ID to metadata for retrieval
+                chroma_metadata["id"] = id
+                
+                ids.append(id)
+                metadatas.append(chroma_metadata)
             
-            # Add the document ID to metadata for retrieval
-            chroma_metadata["id"] = id
+            # Hand Chroma one float32 matrix rather than lists of Python floats
+            embeddings = _stack_vectors(items)
             
-            # Add to collection
+            # Add to collection; search only returns metadata, so no document
+            # text is stored alongside it
             self.collection.add(
-                embeddings=[vector],
-                documents=[self._create_document_text(metadata)],
-                metadatas=[chroma_metadata],
-                ids=[id]
+                embeddings=embeddings,
+                metadatas=metadatas,
+                ids=ids
             )
             
-            logger.debug(f"Added vector to ChromaDB collection: {id}")
+            logger.debug(f"Added {len(ids)} vectors to ChromaDB collection: {self.collection_name}")
             
         except Exception as e:
-            logger.error(f"Failed to add vector to ChromaDB: {e}")
+            logger.error(f"Failed to add vectors to ChromaDB: {e}")
             raise
         
     def search(self, vector: List[float], k: int = 5) -> List[Dict]:
@@ -83,7 +157,7 @@ class ChromaDBIndex:
         try:
             # Search in ChromaDB
             results = self.collection.query(
-                query_embeddings=[vector],
+                query_embeddings=np.asarray([vector], dtype=np.float32),
                 n_results=k,
                 include=["metadatas", "distances"]
             )
@@ -92,24 +166,25 @@ class ChromaDBIndex:
             search_results = []
             
             if results["metadatas"] and results["metadatas"][0]:
-                for i, metadata in enumerate(results["metadatas"][0]):
-                    # Get distance from ChromaDB
-                    distance = results["distances"][0][i] if results["distances"] and results["distances"][0] else 0.0
-                    
-                    # ChromaDB uses cosine distance (0 = identical, 2 = completely opposite)
-                    # Convert to similarity score (1 = identical, 0 = completely opposite)
-                    similarity = 1.0 - (distance / 2.0)
-                    
-                    # Ensure similarity is between 0 and 1
-                    similarity = max(0.0, min(1.0, similarity))
-                    
-                    logger.debug(f"ChromaDB distance: {distance}, calculated similarity: {similarity}")
-                    
-                    search_results.append({
+                metadatas = results["metadatas"][0]
+                distances = results["distances"][0] if results["distances"] and results["distances"][0] else [0.0] * len(metadatas)
+                
+                # ChromaDB uses cosine distance (0 = identical, 2 = completely opposite)
+                # Convert to similarity scores (1 = identical, 0 = completely opposite)
+                # in one vectorized pass, clamped to [0, 1]
+                similarities = np.clip(1.0 - np.asarray(distances, dtype=np.float64) * 0.5, 0.0, 1.0).tolist()
+                
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f"ChromaDB distances: {distances}, calculated similarities: {similarities}")
+                
+                search_results = [
+                    {
                         "id": metadata.get("id", f"result_{i}"),
-                        "metadata": metadata,
+                        "content": metadata,
                         "score": similarity
-                    })
+                    }
+                    for i, (metadata, similarity) in enumerate(zip(metadatas, similarities))
+                ]
             
             return search_results
             
@@ -122,48 +197,345 @@ class ChromaDBIndex:
         # ChromaDB automatically persists data
         pass
     
-    def _create_document_text(self, metadata: Optional[Dict]) -> str:
-        """Create document text for ChromaDB storage."""
-        if not metadata:
-            return ""
-        
-        # Create a text representation of the metadata
-        parts = []
-        
-        if metadata.get("type") == "table":
-            parts.extend([
-                f"Table: {metadata.get('name', '')}",
-                f"Description: {metadata.get('description', '')}",
-                f"Columns: {', '.join(metadata.get('columns', []))}",
-                f"Business Purpose: {metadata.get('business_purpose', '')}"
-            ])
-        else:
-            parts.extend([
-                f"Relationship: {metadata.get('name', '')}",
-                f"Type: {metadata.get('relationship_type', '')}",
-                f"Description: {metadata.get('description', '')}",
-                f"Tables: {', '.join(metadata.get('tables', []))}"
-            ])
+    def _prepare_metadata_for_chroma(self, metadata: Optional[Dict]) -> Dict:
+        """Convert metadata to the primitive values ChromaDB accepts.
         
-        return " | ".join(filter(None, parts))
-
-    def _prepare_metadata_for_chroma(self, metadata: Dict) -> Dict:
-        """Prepare metadata for ChromaDB by converting lists to strings."""
+        Args:
+            metadata: Document metadata
+            
+        Returns:
+            Dict: Metadata with lists/dicts converted to strings
+        """
         chroma_metadata = {}
         
-        for key, value in metadata.items():
+        for key, value in (metadata or {}).items():
             if isinstance(value, list):
                 # Convert lists to comma-separated strings
-                chroma_metadata[key] = ", ".join(str(item) for item in value)
+                chroma_metadata[key] = ", ".join(map(str, value))
             elif isinstance(value, dict):
                 # Convert dictionaries to JSON strings
-                chroma_metadata[key] = json.dumps(value)
+                chroma_metadata[key] = _dumps_json(value)
             else:
                 # Keep primitive types as-is
                 chroma_metadata[key] = value
-                
+        
         return chroma_metadata
 
+class USearchIndex:
+    """In-process usearch HNSW index with a JSON sidecar for ids and metadata."""
+    
+    def __init__(self, collection_name: str, persist_directory: str = None, dtype: str = None):
+        """Initialize usearch index, loading any previously saved state.
+        
+        Args:
+            collection_name: Name of the collection
+            persist_directory: Directory to persist the index and its sidecar
+            dtype: Stored scalar kind ("f32", "f16" or "i8"), defaults to VECTOR_DTYPE or "f32"
+        """
+        try:
+            from usearch.index import Index
+        except ImportError as e:
+            raise ImportError("VECTOR_BACKEND=usearch requires the usearch package: pip install usearch") from e
+        
+        self._index_class = Index
+        self.collection_name = collection_name
+        self.persist_directory = persist_directory or "__bin__/data/vector_indexes"
+        self.dtype = (dtype or os.getenv("VECTOR_DTYPE", "f32")).lower()
+        self.index_path = os.path.join(self.persist_directory, f"{collection_name}.usearch")
+        self.sidecar_path = os.path.join(self.persist_directory, f"{collection_name}.json")
+        
+        # Ensure directory exists
+        Path(self.persist_directory).mkdir(parents=True, exist_ok=True)
+        
+        # usearch keys are integers, so string ids map to a monotonic counter
+        self.index = None
+        self._keys: Dict[str, int] = {}
+        self._ids: Dict[int, str] = {}
+        self._metadata: Dict[str, Dict] = {}
+        self._next_key = 0
+        
+        if os.path.exists(self.sidecar_path):
+            with open(self.sidecar_path, "r") as f:
+                state = json.load(f)
+            self._keys = state["keys"]
+            self._ids = {key: id for id, key in self._keys.items()}
+            self._metadata = state["metadata"]
+            self._next_key = state["next_key"]
+            # Vectors already stored keep the scalar kind they were saved with
+            self.dtype = state.get("dtype", self.dtype)
+            if state["ndim"]:
+                self.index = self._create_index(state["ndim"])
+                self.index.load(self.index_path)
+            logger.info(f"Loaded existing usearch index: {collection_name}")
+        else:
+            logger.info(f"Created new usearch index: {collection_name}")
+    
+    def _create_index(self, ndim: int):
+        """Create an empty cosine HNSW index for vectors of the given dimension.
+        
+        usearch quantizes float32 input to the configured scalar kind on insert,
+        so f16 halves and i8 quarters the stored vector size.
+        """
+        return self._index_class(
+            ndim=ndim,
+            metric="cos",
+            dtype=self.dtype,
+            connectivity=16,
+            expansion_add=64,
+            expansion_search=100
+        )
+        
+    def add(self, id: str, vector: List[float], metadata: Optional[Dict] = None) -> None:
+        """Add vector to usearch index."""
+        self.add_many([(id, vector, metadata)])
+        
+    def add_many(self, items: List[Tuple[str, List[float], Optional[Dict]]]) -> None:
+        """Add several vectors to usearch index in one call, replacing existing ids."""
+        if not items:
+            return
+        
+        try:
+            vectors = _stack_vectors(items)
+            if self.index is None:
+                self.index = self._create_index(vectors.shape[1])
+            
+            keys = []
+            for id, _, metadata in items:
+                if id in self._keys:
+                    old_key = self._keys.pop(id)
+                    del self._ids[old_key]
+                    self.index.remove(old_key)
+                
+                key = self._next_key
+                self._next_key += 1
+                self._keys[id] = key
+                self._ids[key] = id
+                self._metadata[id] = dict(metadata or {}, id=id)
+                keys.append(key)
+            
+            self.index.add(np.asarray(keys, dtype=np.uint64), vectors)
+            
+            logger.debug(f"Added {len(keys)} vectors to usearch index: {self.collection_name}")
+            
+        except Exception as e:
+            logger.error(f"Failed to add vectors to usearch: {e}")
+            raise
+        
+    def search(self, vector: List[float], k: int = 5) -> List[Dict]:
+        """Search for similar vectors using usearch."""
+        try:
+            if self.index is None or not self._keys:
+                return []
+            
+            matches = self.index.search(np.asarray(vector, dtype=np.float32), min(k, len(self._keys)))
+            
+            # Cosine distance (0 = identical, 2 = opposite) to similarity in [0, 1]
+            similarities = np.clip(1.0 - np.asarray(matches.distances, dtype=np.float64) * 0.5, 0.0, 1.0).tolist()
+            
+            search_results = []
+            for key, similarity in zip(matches.keys.tolist(), similarities):
+                id = self._ids.get(key)
+                if id is not None:
+                    search_results.append({
+                        "id": id,
+                        "content": dict(self._metadata[id]),
+                        "score": similarity
+                    })
+            
+            return search_results
+            
+        except Exception as e:
+            logger.error(f"Failed to search usearch index: {e}")
+            return []
+        
+    def save(self) -> None:
+        """Save the index and its id/metadata sidecar to disk."""
+        if self.index is not None:
+            self.index.save(self.index_path)
+        
+        with open(self.sidecar_path, "w") as f:
+            json.dump({
+                "ndim": self.index.ndim if self.index is not None else None,
+                "dtype": self.dtype,
+                "next_key": self._next_key,
+                "keys": self._keys,
+                "metadata": self._metadata
+            }, f)
+
+@functools.lru_cache(maxsize=None)
+def _numba_cosines():
+    """Return the numba kernel for the brute-force scan, or None without numba.
+    
+    numba is imported on first use because it takes a few hundred ms to load.
+    The kernel writes the dot product of each matrix row with the query into
+    out, rows in parallel.
+    """
+    try:
+        import numba
+    except ImportError:
+        return None
+    
+    @numba.njit(parallel=True, fastmath=True, cache=True)
+    def cosines(matrix, query, out):
+        for row in numba.prange(matrix.shape[0]):
+            total = np.float32(0.0)
+            for col in range(matrix.shape[1]):
+                total += matrix[row, col] * query[col]
+            out[row] = total
+    
+    return cosines
+
+class BruteForceIndex:
+    """Exact in-memory cosine index that scans every vector with one matrix product.
+    
+    Faster than HNSW for the tens to thousands of vectors a schema produces,
+    with full recall and no graph to build. Vectors are saved as .npy beside a
+    JSON sidecar for ids and metadata.
+    """
+    
+    def __init__(self, collection_name: str, persist_directory: str = None):
+        """Initialize brute-force index, loading any previously saved state.
+        
+        Args:
+            collection_name: Name of the collection
+            persist_directory: Directory to persist the vectors and their sidecar
+        """
+        self.collection_name = collection_name
+        self.persist_directory = persist_directory or "__bin__/data/vector_indexes"
+        self.matrix_path = os.path.join(self.persist_directory, f"{collection_name}.vectors.npy")
+        self.sidecar_path = os.path.join(self.persist_directory, f"{collection_name}.vectors.json")
+        
+        # Ensure directory exists
+        Path(self.persist_directory).mkdir(parents=True, exist_ok=True)
+        
+        # L2-normalized rows, so a dot product is the cosine similarity;
+        # only the first len(self._ids) rows are in use
+        self._matrix: Optional[np.ndarray] = None
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._metadata: List[Dict] = []
+        
+        if os.path.exists(self.sidecar_path):
+            with open(self.sidecar_path, "r") as f:
+                state = json.load(f)
+            self._ids = state["ids"]
+            self._rows = {id: row for row, id in enumerate(self._ids)}
+            self._metadata = state["metadata"]
+            if self._ids:
+                self._matrix = np.load(self.matrix_path)
+            logger.info(f"Loaded existing brute-force index: {collection_name}")
+        else:
+            logger.info(f"Created new brute-force index: {collection_name}")
+        
+        # Only an index large enough to use the numba scan warms it up; compiling
+        # (or loading the cached build) now keeps that cost off the first search
+        kernel = _numba_cosines() if self.count() >= NUMBA_SCAN_MIN_VECTORS else None
+        if kernel is not None:
+            kernel(np.zeros((1, 1), dtype=np.float32), np.zeros(1, dtype=np.float32), np.empty(1, dtype=np.float32))
+        
+        if len(self._ids) > BRUTE_FORCE_MAX_VECTORS:
+            logger.warning(
+                f"Brute-force index {collection_name} holds {len(self._ids)} vectors; "
+                f"an HNSW backend is faster above {BRUTE_FORCE_MAX_VECTORS}"
+            )
+    
+    def count(self) -> int:
+        """Return the number of vectors in the index."""
+        return len(self._ids)
+        
+    def add(self, id: str, vector: List[float], metadata: Optional[Dict] = None) -> None:
+        """Add vector to brute-force index."""
+        self.add_many([(id, vector, metadata)])
+        
+    def add_many(self, items: List[Tuple[str, List[float], Optional[Dict]]]) -> None:
+        """Add several vectors to brute-force index in one call, replacing existing ids."""
+        if not items:
+            return
+        
+        try:
+            vectors = _stack_vectors(items)
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors /= np.where(norms == 0, 1, norms)
+            
+            count = len(self._ids)
+            new_rows = sum(1 for id, _, _ in items if id not in self._rows)
+            self._reserve(count + new_rows, vectors.shape[1])
+            
+            for (id, _, metadata), vector in zip(items, vectors):
+                row = self._rows.get(id)
+                if row is None:
+                    row = len(self._ids)
+                    self._rows[id] = row
+                    self._ids.append(id)
+                    self._metadata.append(dict(metadata or {}, id=id))
+                else:
+                    self._metadata[row] = dict(metadata or {}, id=id)
+                self._matrix[row] = vector
+            
+            logger.debug(f"Added {len(items)} vectors to brute-force index: {self.collection_name}")
+            
+        except Exception as e:
+            logger.error(f"Failed to add vectors to brute-force index: {e}")
+            raise
+        
+    def search(self, vector: List[float], k: int = 5) -> List[Dict]:
+        """Search for similar vectors with an exact cosine scan."""
+        try:
+            count = len(self._ids)
+            if not count or k <= 0:
+                return []
+            
+            query = np.asarray(vector, dtype=np.float32)
+            norm = np.linalg.norm(query)
+            if norm:
+                query = query / norm
+            
+            kernel = _numba_cosines() if count >= NUMBA_SCAN_MIN_VECTORS else None
+            if kernel is not None:
+                cosines = np.empty(count, dtype=np.float32)
+                kernel(self._matrix[:count], query, cosines)
+            else:
+                cosines = self._matrix[:count] @ query
+            k = min(k, count)
+            top = np.argpartition(-cosines, k - 1)[:k] if k < count else np.arange(count)
+            top = top[np.argsort(-cosines[top], kind="stable")]
+            
+            # Same [0, 1] scale as the other backends' 1 - cosine_distance / 2
+            similarities = np.clip((1.0 + cosines[top].astype(np.float64)) * 0.5, 0.0, 1.0).tolist()
+            
+            return [
+                {
+                    "id": self._ids[row],
+                    "content": dict(self._metadata[row]),
+                    "score": similarity
+                }
+                for row, similarity in zip(top.tolist(), similarities)
+            ]
+            
+        except Exception as e:
+            logger.error(f"Failed to search brute-force index: {e}")
+            return []
+        
+    def save(self) -> None:
+        """Save the vectors and their id/metadata sidecar to disk."""
+        if self._matrix is not None:
+            np.save(self.matrix_path, self._matrix[:len(self._ids)])
+        
+        with open(self.sidecar_path, "w") as f:
+            json.dump({"ids": self._ids, "metadata": self._metadata}, f)
+    
+    def _reserve(self, rows: int, ndim: int) -> None:
+        """Grow the vector matrix in whole blocks so appends are amortized."""
+        if self._matrix is not None and self._matrix.shape[0] >= rows:
+            return
+        
+        capacity = -(-rows // BRUTE_FORCE_GROWTH_ROWS) * BRUTE_FORCE_GROWTH_ROWS
+        matrix = np.empty((capacity, ndim), dtype=np.float32)
+        if self._matrix is not None:
+            count = len(self._ids)
+            matrix[:count] = self._matrix[:count]
+        self._matrix = matrix
+
 class SQLVectorStore:
     """Manages vector indexes using OpenAI embeddings with ChromaDB persistence."""
     
@@ -179,12 +551,21 @@ class SQLVectorStore:
         self.vector_index_factory = vector_index_factory or self._default_index_factory
         self.table_index = None     # vector index instance for tables
         self.relationship_index = None  # vector index instance for relationships
+        self._query_cache: "OrderedDict[str, List[float]]" = OrderedDict()  # LRU of query embeddings
+        self._query_cache_lock = threading.Lock()
+        self.embedding_cache = EmbeddingCache(os.path.join(base_path, "embed_cache.db"))  # document embeddings by content hash
+        self.write_generation = 0  # bumped on every index write so result caches can tell they are stale
         self._ensure_directories()
         
     def _default_index_factory(self, path: str) -> VectorIndex:
-        """Create default vector index implementation using ChromaDB."""
+        """Create default vector index implementation, ChromaDB unless VECTOR_BACKEND selects usearch or bruteforce."""
         # Extract collection name from path
         collection_name = os.path.basename(path).replace('.db', '')
+        backend = os.getenv("VECTOR_BACKEND", "chroma").lower()
+        if backend == "usearch":
+            return USearchIndex(collection_name=collection_name, persist_directory=self.base_path)
+        if backend == "bruteforce":
+            return BruteForceIndex(collection_name=collection_name, persist_directory=self.base_path)
         return ChromaDBIndex(collection_name=collection_name, persist_directory=self.base_path)
         
     def create_table_index(self, index_name: str = "tables"):
@@ -228,7 +609,7 @@ class SQLVectorStore:
             raise ValueError("Table index not initialized. Call create_table_index first.")
             
         doc_text = self._prepare_document_text(content, "table")
-        embedding = self.embeddings_client.generate_embedding(doc_text)
+        embedding = self._embed_documents([doc_text], batch=False)[0]
         metadata = self._create_document_metadata(content, "table")
         metadata["id"] = table_name  # Add ID for search results
         
@@ -237,7 +618,7 @@ class SQLVectorStore:
             vector=embedding,
             metadata=metadata
         )
-        self.table_index.save()
+        self.write_generation += 1
         
     def add_relationship_document(self, relationship_id: str, content: Dict):
         """Add relationship documentation with OpenAI-generated embedding.
@@ -256,7 +637,7 @@ class SQLVectorStore:
             raise ValueError("Relationship index not initialized. Call create_relationship_index first.")
             
         doc_text = self._prepare_document_text(content, "relationship")
-        embedding = self.embeddings_client.generate_embedding(doc_text)
+        embedding = self._embed_documents([doc_text], batch=False)[0]
         metadata = self._create_document_metadata(content, "relationship")
         metadata["id"] = relationship_id  # Add ID for search results
         
@@ -265,7 +646,43 @@ class SQLVectorStore:
             vector=embedding,
             metadata=metadata
         )
-        self.relationship_index.save()
+        self.write_generation += 1
+        
+    def add_table_documents(self, documents: List[Tuple[str, Dict]], batch_size: int = DEFAULT_ADD_BATCH_SIZE):
+        """Add several table documents, inserting them into the index in batches.
+        
+        Args:
+            documents: (table_name, content) pairs to index
+            batch_size: Number of documents per index insert
+            
+        Returns:
+            None
+            
+        Raises:
+            ValueError: If table index hasn't been created
+        """
+        if not self.table_index:
+            raise ValueError("Table index not initialized. Call create_table_index first.")
+            
+        self._add_documents(self.table_index, documents, "table", batch_size)
+        
+    def add_relationship_documents(self, documents: List[Tuple[str, Dict]], batch_size: int = DEFAULT_ADD_BATCH_SIZE):
+        """Add several relationship documents, inserting them into the index in batches.
+        
+        Args:
+            documents: (relationship_id, content) pairs to index
+            batch_size: Number of documents per index insert
+            
+        Returns:
+            None
+            
+        Raises:
+            ValueError: If relationship index hasn't been created
+        """
+        if not self.relationship_index:
+            raise ValueError("Relationship index not initialized. Call create_relationship_index first.")
+            
+        self._add_documents(self.relationship_index, documents, "relationship", batch_size)
         
     def search_tables(self, query: str, limit: int = 5) -> List[Dict]:
         """Search table documentation using OpenAI query embedding.
@@ -280,22 +697,13 @@ class SQLVectorStore:
         if not self.table_index:
             raise ValueError("Table index not initialized. Call create_table_index first.")
             
-        query_embedding = self.embeddings_client.generate_embedding(query)
-        results = self.table_index.search(
+        query_embedding = self._embed_query(query)
+        # Indexes already return results in the store's {id, content, score} shape
+        return self.table_index.search(
             vector=query_embedding,
             k=limit
         )
         
-        # Process results based on the VectorIndex protocol
-        return [
-            {
-                "id": result["id"],
-                "content": result["metadata"],  # metadata is already the dictionary
-                "score": result.get("score", 1.0)  # default score if not provided
-            }
-            for result in results
-        ]
-        
     def search_relationships(self, query: str, limit: int = 5) -> List[Dict]:
         """Search relationship documentation using OpenAI query embedding.
         
@@ -309,21 +717,129 @@ class SQLVectorStore:
         if not self.relationship_index:
             raise ValueError("Relationship index not initialized. Call create_relationship_index first.")
             
-        query_embedding = self.embeddings_client.generate_embedding(query)
-        results = self.relationship_index.search(
+        query_embedding = self._embed_query(query)
+        # Indexes already return results in the store's {id, content, score} shape
+        return self.relationship_index.search(
             vector=query_embedding,
             k=limit
         )
         
-        # Process results based on the VectorIndex protocol
-        return [
-            {
-                "id": result["id"],
-                "content": result["metadata"],  # metadata is already the dictionary
-                "score": result.get("score", 1.0)  # default score if not provided
-            }
-            for result in results
-        ]
+    def flush(self):
+        """Checkpoint the created indexes to persistent storage.
+        
+        Single-document adds don't save on every write; call this (or use the
+        store as a context manager) once a run of adds is complete. ChromaDB
+        persists writes itself, but the usearch and brute-force backends only
+        reach disk here or at the end of a bulk add, so unflushed single adds
+        are lost when the process exits.
+        
+        Returns:
+            None
+        """
+        for index in (self.table_index, self.relationship_index):
+            if index:
+                index.save()
+        
+    def __enter__(self):
+        return self
+        
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.flush()
+        
+    def _embed_query(self, query: str) -> List[float]:
+        """Return the query embedding, reusing it for exact repeats of recent queries.
+        
+        Args:
+            query: Search query
+            
+        Returns:
+            List[float]: Query embedding
+        """
+        with self._query_cache_lock:
+            embedding = self._query_cache.get(query)
+            if embedding is not None:
+                self._query_cache.move_to_end(query)
+                return embedding
+        
+        # Embed outside the lock so concurrent misses don't serialize on the API call
+        embedding = self.embeddings_client.generate_embedding(query)
+        
+        with self._query_cache_lock:
+            self._query_cache[query] = embedding
+            self._query_cache.move_to_end(query)
+            if len(self._query_cache) > QUERY_EMBEDDING_CACHE_SIZE:
+                self._query_cache.popitem(last=False)
+        
+        return embedding
+        
+    def _embed_documents(self, doc_texts: List[str], batch: bool = True) -> List[List[float]]:
+        """Return document embeddings, only calling the API for text not already cached.
+        
+        Args:
+            doc_texts: Prepared document texts
+            batch: Embed misses with one batch request rather than a single-text request
+            
+        Returns:
+            List[List[float]]: Embeddings in the order of doc_texts
+        """
+        model = getattr(self.embeddings_client, "model", "")
+        keys = [EmbeddingCache.make_key(model, text) for text in doc_texts]
+        embeddings = self.embedding_cache.get_many(keys)
+        
+        # Embed each uncached text once, even if it repeats within the request
+        missing = {key: text for key, text in zip(keys, doc_texts) if key not in embeddings}
+        if missing:
+            if batch:
+                new_embeddings = self.embeddings_client.generate_embeddings_batch(list(missing.values()))
+            else:
+                new_embeddings = [self.embeddings_client.generate_embedding(text) for text in missing.values()]
+            new_embeddings = dict(zip(missing, new_embeddings))
+            self.embedding_cache.put_many(new_embeddings)
+            embeddings.update(new_embeddings)
+        
+        return [embeddings[key] for key in keys]
+        
+    def _add_documents(self, index: VectorIndex, documents: List[Tuple[str, Dict]], doc_type: str, batch_size: int):
+        """Embed documents and add them to an index one batch per insert.
+        
+        The next batch's embedding request runs on a background thread while
+        the current batch is inserted, so API latency and index writes overlap.
+        
+        Args:
+            index: Vector index to add to
+            documents: (id, content) pairs to index
+            doc_type: Type of document ('table' or 'relationship')
+            batch_size: Number of documents per index insert
+        """
+        chunks = [documents[start:start + batch_size] for start in range(0, len(documents), batch_size)]
+        
+        def embed_chunk(chunk: List[Tuple[str, Dict]]) -> List[List[float]]:
+            # Embed the whole batch with one request instead of one per document
+            doc_texts = [self._prepare_document_text(content, doc_type) for _, content in chunk]
+            return self._embed_documents(doc_texts)
+        
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+            pending = executor.submit(embed_chunk, chunks[0]) if chunks else None
+            
+            for i, chunk in enumerate(chunks):
+                embeddings = pending.result()
+                if i + 1 < len(chunks):
+                    pending = executor.submit(embed_chunk, chunks[i + 1])
+                
+                # One float32 matrix per batch; its rows are handed to the index,
+                # so it must not be reused by the next batch
+                vectors = np.asarray(embeddings, dtype=np.float32)
+                
+                items = []
+                for (doc_id, content), vector in zip(chunk, vectors):
+                    metadata = self._create_document_metadata(content, doc_type)
+                    metadata["id"] = doc_id  # Add ID for search results
+                    items.append((doc_id, vector, metadata))
+                
+                index.add_many(items)
+                self.write_generation += 1
+        
+        index.save()
         
     def _prepare_document_text(self, content: Dict, doc_type: str) -> str:
         """Prepare document content for embedding generation.
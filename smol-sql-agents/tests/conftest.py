@@ -0,0 +1,51 @@
+"""Shared pytest configuration for the test suite.
+
+Tests only use mocks, temporary directories and module-level state, so they
+are process-safe and can run under pytest-xdist (``pytest -n auto --dist
+loadfile``). ``loadfile`` keeps each module on one worker, so module-scoped
+fixtures such as ``patched_core`` are still built once per module.
+"""
+
+import os
+import sys
+from contextlib import ExitStack
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import DEFAULT, patch
+
+import pytest
+
+# Make the project root importable (``from src...``) once for the session
+_PROJECT_ROOT = str(Path(__file__).resolve().parent.parent)
+if _PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, _PROJECT_ROOT)
+
+@pytest.fixture(scope="module")
+def patched_core():
+    """Patch PersistentDocumentationAgent's collaborators for one test module.
+    
+    The core module's database, store and vector classes and BaseAgent's
+    OpenAIModel and CodeAgent are replaced, and every environment variable
+    reads as a dummy API key. Yields the class mocks by role; the patches
+    stay active until the module's tests have finished.
+    """
+    from src.agents import base, core
+    
+    with ExitStack() as stack:
+        core_mocks = stack.enter_context(patch.multiple(
+            core,
+            SQLVectorStore=DEFAULT,
+            SQLIndexerAgent=DEFAULT,
+            DatabaseInspector=DEFAULT,
+            DocumentationStore=DEFAULT
+        ))
+        base_mocks = stack.enter_context(patch.multiple(base, OpenAIModel=DEFAULT, CodeAgent=DEFAULT))
+        stack.enter_context(patch.object(os, 'getenv', return_value='dummy-api-key'))
+        yield SimpleNamespace(
+            vector_store=core_mocks['SQLVectorStore'],
+            indexer_agent=core_mocks['SQLIndexerAgent'],
+            db_inspector=core_mocks['DatabaseInspector'],
+            doc_store=core_mocks['DocumentationStore'],
+            llm_model=base_mocks['OpenAIModel'],
+            code_agent=base_mocks['CodeAgent']
+        )
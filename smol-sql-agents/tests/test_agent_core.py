@@ -1,25 +1,80 @@
 """Tests for the PersistentDocumentationAgent with vector indexing."""
 
 import json
+import os
 import pytest
-from unittest.mock import Mock, patch, ANY
+from types import MappingProxyType, SimpleNamespace
+from unittest.mock import DEFAULT, Mock, patch, ANY
 
-from src.agents.core import PersistentDocumentationAgent
-from src.database.inspector import DatabaseInspector
-from src.database.persistence import DocumentationStore
-from src.agents.indexer import SQLIndexerAgent
-from src.vector.store import SQLVectorStore
+# LLM documentation responses, serialized once at import for run.return_value
+_TABLE_RESP = {
+    "business_purpose": "Stores user account information",
+    "schema_data": {
+        "table_name": "users",
+        "columns": [
+            {"name": "id", "type": "integer"},
+            {"name": "username", "type": "varchar"}
+        ]
+    }
+}
+_TABLE_RESP_JSON = json.dumps(_TABLE_RESP)
+_SINGLE_COLUMN_TABLE_RESP_JSON = json.dumps({
+    "business_purpose": "Stores user account information",
+    "schema_data": {
+        "table_name": "users",
+        "columns": [{"name": "id", "type": "integer"}]
+    }
+})
+_REL_RESP = {
+    "relationship_type": "one-to-many",
+    "documentation": "Each user can have multiple orders"
+}
+_REL_RESP_JSON = json.dumps(_REL_RESP)
+
+# Environment seen by the agent; os.getenv is patched with _ENV.get
+_ENV = {
+    "OPENAI_API_KEY": "dummy-api-key",
+    "OPENAI_EMBEDDING_MODEL": "text-embedding-3-small",
+    "EMBEDDING_BATCH_SIZE": "100"
+}
+
+@pytest.fixture(scope="session")
+def agent_core_module():
+    """Import the agent core module on first use.
+    
+    Its import chain pulls in the OpenAI client, the SQLAlchemy inspector and
+    the vector store, so collecting other test files should not pay for it.
+    """
+    from src.agents import core
+    return core
+
+@pytest.fixture(scope="session")
+def sample_relationship():
+    """Create the read-only foreign key the relationship tests document."""
+    return MappingProxyType({
+        "id": "users_orders_fk",
+        "constrained_table": "orders",
+        "constrained_columns": ["user_id"],
+        "referred_table": "users",
+        "referred_columns": ["id"]
+    })
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def mock_llm_model():
-    """Create a mock LLM model."""
-    model = Mock()
-    return model
+    """Create a stand-in LLM model.
+    
+    The agent only hands it to the patched CodeAgent, so a plain namespace
+    is enough; nothing is called or asserted on it.
+    """
+    return SimpleNamespace()
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def mock_db_inspector():
-    """Create a mock database inspector."""
-    inspector = Mock(spec=DatabaseInspector)
+    """Create a mock database inspector.
+    
+    Unspec'd: tests only check the agent holds it, never which methods exist.
+    """
+    inspector = Mock()
     inspector.get_all_table_names.return_value = ["users", "orders"]
     inspector.get_table_schema.return_value = {
         "name": "users",
@@ -40,92 +95,113 @@ def mock_db_inspector():
     ]
     return inspector
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def mock_doc_store():
     """Create a mock documentation store."""
+    from src.database.persistence import DocumentationStore
     store = Mock(spec=DocumentationStore)
     return store
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def mock_indexer_agent():
     """Create a mock indexer agent."""
+    from src.agents.indexer import SQLIndexerAgent
     agent = Mock(spec=SQLIndexerAgent)
+    _configure_indexer_agent(agent)
+    return agent
+
+def _configure_indexer_agent(agent):
+    """Make every indexing call on the mock indexer succeed."""
     agent.index_table_documentation.return_value = True
     agent.index_relationship_documentation.return_value = True
-    return agent
 
-@pytest.fixture
+def _first_call_arg(mock_method):
+    """Return the first positional argument of the mock's latest call."""
+    return mock_method.call_args.args[0]
+
+def _patch_base_agent(llm_model, code_agent):
+    """Patch the OpenAIModel and CodeAgent that BaseAgent builds the agent from."""
+    from src.agents import base
+    return patch.multiple(
+        base,
+        OpenAIModel=Mock(return_value=llm_model),
+        CodeAgent=Mock(return_value=code_agent)
+    )
+
+@pytest.fixture(scope="module")
 def mock_code_agent():
     """Create a mock code agent."""
     agent = Mock()
     return agent
 
-@pytest.fixture
-def doc_agent(mock_llm_model, mock_db_inspector, mock_doc_store, mock_code_agent):
-    """Create a documentation agent with mocked dependencies."""
-    def mock_getenv(key, default=None):
-        if key == "OPENAI_API_KEY":
-            return "dummy-api-key"
-        elif key == "OPENAI_EMBEDDING_MODEL":
-            return "text-embedding-3-small"
-        elif key == "EMBEDDING_BATCH_SIZE":
-            return "100"
-        else:
-            return default
-    
-    # Mock the vector store and indexer agent
-    mock_vector_store = Mock(spec=SQLVectorStore)
-    mock_indexer_agent = Mock(spec=SQLIndexerAgent)
+@pytest.fixture(scope="module")
+def doc_agent(agent_core_module, mock_llm_model, mock_db_inspector, mock_doc_store, mock_code_agent, mock_indexer_agent):
+    """Create a documentation agent with mocked dependencies and vector indexing."""
+    # Pass-through vector store, never asserted on; the indexer is the shared mock_indexer_agent
+    mock_vector_store = Mock()
     
-    with patch('src.agents.core.OpenAIModel', return_value=mock_llm_model), \
-         patch('src.agents.core.DatabaseInspector', return_value=mock_db_inspector), \
-         patch('src.agents.core.DocumentationStore', return_value=mock_doc_store), \
-         patch('src.agents.core.CodeAgent', return_value=mock_code_agent), \
-         patch('src.agents.core.SQLVectorStore', return_value=mock_vector_store), \
-         patch('src.agents.core.SQLIndexerAgent', return_value=mock_indexer_agent), \
-         patch('src.agents.core.os.getenv', side_effect=mock_getenv), \
-         patch('src.vector.embeddings.os.getenv', side_effect=mock_getenv), \
-         patch('src.vector.store.os.getenv', side_effect=mock_getenv):
-        agent = PersistentDocumentationAgent()
+    # The core, embeddings and store modules all read the same os.getenv,
+    # so one patch covers every environment lookup
+    with patch.multiple(
+        agent_core_module,
+        DatabaseInspector=Mock(return_value=mock_db_inspector),
+        DocumentationStore=Mock(return_value=mock_doc_store),
+        SQLVectorStore=Mock(return_value=mock_vector_store),
+        SQLIndexerAgent=Mock(return_value=mock_indexer_agent)
+    ), _patch_base_agent(mock_llm_model, mock_code_agent), \
+         patch.object(os, 'getenv', side_effect=_ENV.get):
+        agent = agent_core_module.PersistentDocumentationAgent()
         return agent
 
-@pytest.fixture
-def doc_agent_with_indexing(mock_llm_model, mock_db_inspector, mock_doc_store, mock_code_agent, mock_indexer_agent):
-    """Create a documentation agent with vector indexing capabilities."""
-    def mock_getenv(key, default=None):
-        if key == "OPENAI_API_KEY":
-            return "dummy-api-key"
-        elif key == "OPENAI_EMBEDDING_MODEL":
-            return "text-embedding-3-small"
-        elif key == "EMBEDDING_BATCH_SIZE":
-            return "100"
-        else:
-            return default
+@pytest.fixture(scope="module")
+def doc_agent_with_indexing(doc_agent):
+    """Create a documentation agent with vector indexing capabilities.
     
-    with patch('agent.agent_core.OpenAIModel', return_value=mock_llm_model), \
-         patch('agent.agent_core.DatabaseInspector', return_value=mock_db_inspector), \
-         patch('agent.agent_core.DocumentationStore', return_value=mock_doc_store), \
-         patch('agent.agent_core.CodeAgent', return_value=mock_code_agent), \
-         patch('agent.agent_core.SQLIndexerAgent', return_value=mock_indexer_agent), \
-         patch('agent.agent_core.SQLVectorStore'), \
-         patch('agent.agent_core.os.getenv', side_effect=mock_getenv), \
-         patch('agent.embeddings_client.os.getenv', side_effect=mock_getenv), \
-         patch('agent.vector_store.os.getenv', side_effect=mock_getenv):
-        agent = PersistentDocumentationAgent()
-        return agent
+    doc_agent already indexes through mock_indexer_agent, so the same agent
+    serves both fixtures.
+    """
+    return doc_agent
 
-@pytest.fixture
+@pytest.fixture(autouse=True)
+def reset_mocks(mock_doc_store, mock_indexer_agent, mock_code_agent):
+    """Clear calls and per-test configuration from the module-scoped mocks."""
+    yield
+    mock_doc_store.reset_mock(return_value=True, side_effect=True)
+    mock_code_agent.reset_mock(return_value=True, side_effect=True)
+    mock_indexer_agent.reset_mock(return_value=True, side_effect=True)
+    _configure_indexer_agent(mock_indexer_agent)
+
+@pytest.fixture(scope="module")
 def mock_vector_store():
     """Create a mock vector store."""
+    from src.vector.store import SQLVectorStore
     store = Mock(spec=SQLVectorStore)
     return store
 
-@pytest.fixture
-def doc_agent_with_vector(doc_agent, mock_indexer_agent, mock_vector_store):
+@pytest.fixture(scope="module")
+def _bare_doc_agent(agent_core_module, mock_llm_model, mock_db_inspector, mock_doc_store, mock_code_agent):
+    """Create a documentation agent whose vector collaborators are plain mocks.
+    
+    For fixtures that replace the vector store and indexer themselves, so
+    no spec'd mocks are built for them.
+    """
+    with patch.multiple(
+        agent_core_module,
+        DatabaseInspector=Mock(return_value=mock_db_inspector),
+        DocumentationStore=Mock(return_value=mock_doc_store),
+        SQLVectorStore=Mock(),
+        SQLIndexerAgent=Mock()
+    ), _patch_base_agent(mock_llm_model, mock_code_agent), \
+         patch.object(os, 'getenv', side_effect=_ENV.get):
+        agent = agent_core_module.PersistentDocumentationAgent()
+        return agent
+
+@pytest.fixture(scope="module")
+def doc_agent_with_vector(_bare_doc_agent, mock_indexer_agent, mock_vector_store):
     """Create a documentation agent with vector indexing capabilities."""
-    doc_agent.indexing_agent = mock_indexer_agent
-    doc_agent.vector_store = mock_vector_store
-    return doc_agent
+    _bare_doc_agent.indexing_agent = mock_indexer_agent
+    _bare_doc_agent.vector_store = mock_vector_store
+    return _bare_doc_agent
 
 # ============================================================================
 # Basic Agent Functionality Tests
@@ -136,11 +212,19 @@ def test_agent_initialization_success(doc_agent, mock_db_inspector, mock_doc_sto
     assert doc_agent.db_inspector == mock_db_inspector
     assert doc_agent.store == mock_doc_store
 
-def test_agent_initialization_missing_api_key():
+def test_agent_initialization_missing_api_key(agent_core_module):
     """Test agent initialization with missing API key."""
-    with patch('agent.agent_core.os.getenv', return_value=None), \
+    # Patch the database collaborators so the OpenAI key check is what fails
+    with patch.multiple(
+        agent_core_module,
+        DatabaseInspector=DEFAULT,
+        DocumentationStore=DEFAULT,
+        DatabaseToolsFactory=DEFAULT,
+        SQLVectorStore=DEFAULT,
+        SQLIndexerAgent=DEFAULT
+    ), patch.object(os, 'getenv', return_value=None), \
          pytest.raises(ValueError) as exc_info:
-        PersistentDocumentationAgent()
+        agent_core_module.PersistentDocumentationAgent()
     assert "OPENAI_API_KEY environment variable is not set" in str(exc_info.value)
 
 # ============================================================================
@@ -150,17 +234,7 @@ def test_agent_initialization_missing_api_key():
 def test_process_table_documentation_success(doc_agent, mock_code_agent):
     """Test successful processing of table documentation."""
     # Mock LLM response
-    mock_response = {
-        "business_purpose": "Stores user account information",
-        "schema_data": {
-            "table_name": "users",
-            "columns": [
-                {"name": "id", "type": "integer"},
-                {"name": "username", "type": "varchar"}
-            ]
-        }
-    }
-    mock_code_agent.run.return_value = json.dumps(mock_response)
+    mock_code_agent.run.return_value = _TABLE_RESP_JSON
     
     # Process table
     doc_agent.process_table_documentation("users")
@@ -169,105 +243,58 @@ def test_process_table_documentation_success(doc_agent, mock_code_agent):
     mock_code_agent.run.assert_called_once()
     doc_agent.store.save_table_documentation.assert_called_once_with(
         "users",
-        mock_response["schema_data"],
-        mock_response["business_purpose"],
+        _TABLE_RESP["schema_data"],
+        _TABLE_RESP["business_purpose"],
         ANY  # We don't need to verify the exact markdown format
     )
 
-def test_process_table_documentation_invalid_json(doc_agent, mock_code_agent):
-    """Test handling of invalid JSON response for table documentation."""
-    mock_code_agent.run.return_value = "Invalid JSON"
+@pytest.mark.parametrize("response, msg", [
+    ("Invalid JSON", "Invalid JSON response for table users"),
+    # Missing schema_data
+    (json.dumps({"business_purpose": "Stores user account information"}), "Missing required fields")
+], ids=["invalid_json", "missing_fields"])
+def test_process_table_documentation_errors(doc_agent, mock_code_agent, response, msg):
+    """Test handling of invalid JSON and missing fields in table documentation responses."""
+    mock_code_agent.run.return_value = response
     
-    with pytest.raises(json.JSONDecodeError):
+    with pytest.raises(ValueError, match=msg):
         doc_agent.process_table_documentation("users")
 
-def test_process_table_documentation_missing_fields(doc_agent, mock_code_agent):
-    """Test handling of missing fields in table documentation response."""
-    mock_response = {
-        "business_purpose": "Stores user account information"
-        # Missing schema_data
-    }
-    mock_code_agent.run.return_value = json.dumps(mock_response)
-    
-    with pytest.raises(ValueError) as exc_info:
-        doc_agent.process_table_documentation("users")
-    assert "Missing required fields" in str(exc_info.value)
-
 # ============================================================================
 # Relationship Documentation Tests
 # ============================================================================
 
-def test_process_relationship_documentation_success(doc_agent, mock_code_agent):
+def test_process_relationship_documentation_success(doc_agent, mock_code_agent, sample_relationship):
     """Test successful processing of relationship documentation."""
-    relationship = {
-        "id": "users_orders_fk",
-        "constrained_table": "orders",
-        "constrained_columns": ["user_id"],
-        "referred_table": "users",
-        "referred_columns": ["id"]
-    }
-    
-    mock_response = {
-        "relationship_type": "one-to-many",
-        "documentation": "Each user can have multiple orders"
-    }
-    mock_code_agent.run.return_value = json.dumps(mock_response)
+    mock_code_agent.run.return_value = _REL_RESP_JSON
     
-    doc_agent.process_relationship_documentation(relationship)
+    doc_agent.process_relationship_documentation(sample_relationship)
     
     mock_code_agent.run.assert_called_once()
     doc_agent.store.save_relationship_documentation.assert_called_once_with(
         "users_orders_fk",
-        mock_response["relationship_type"],
-        mock_response["documentation"]
+        _REL_RESP["relationship_type"],
+        _REL_RESP["documentation"]
     )
 
-def test_process_relationship_documentation_invalid_json(doc_agent, mock_code_agent):
-    """Test handling of invalid JSON response for relationship documentation."""
-    relationship = {
-        "id": "users_orders_fk",
-        "constrained_table": "orders",
-        "constrained_columns": ["user_id"],
-        "referred_table": "users",
-        "referred_columns": ["id"]
-    }
-    mock_code_agent.run.return_value = "Invalid JSON"
-    
-    with pytest.raises(json.JSONDecodeError):
-        doc_agent.process_relationship_documentation(relationship)
-
-def test_process_relationship_documentation_missing_fields(doc_agent, mock_code_agent):
-    """Test handling of missing fields in relationship documentation response."""
-    relationship = {
-        "id": "users_orders_fk",
-        "constrained_table": "orders",
-        "constrained_columns": ["user_id"],
-        "referred_table": "users",
-        "referred_columns": ["id"]
-    }
-    mock_response = {
-        "relationship_type": "one-to-many"
-        # Missing documentation
-    }
-    mock_code_agent.run.return_value = json.dumps(mock_response)
+@pytest.mark.parametrize("response, msg", [
+    ("Invalid JSON", "Invalid JSON response for relationship users_orders_fk"),
+    # Missing documentation
+    (json.dumps({"relationship_type": "one-to-many"}), "Missing required fields")
+], ids=["invalid_json", "missing_fields"])
+def test_process_relationship_documentation_errors(doc_agent, mock_code_agent, sample_relationship, response, msg):
+    """Test handling of invalid JSON and missing fields in relationship documentation responses."""
+    mock_code_agent.run.return_value = response
     
-    with pytest.raises(ValueError) as exc_info:
-        doc_agent.process_relationship_documentation(relationship)
-    assert "Missing required fields" in str(exc_info.value)
+    with pytest.raises(ValueError, match=msg):
+        doc_agent.process_relationship_documentation(sample_relationship)
 
-def test_process_relationship_documentation_agent_error(doc_agent, mock_code_agent):
+def test_process_relationship_documentation_agent_error(doc_agent, mock_code_agent, sample_relationship):
     """Test handling of agent errors during relationship documentation."""
-    relationship = {
-        "id": "users_orders_fk",
-        "constrained_table": "orders",
-        "constrained_columns": ["user_id"],
-        "referred_table": "users",
-        "referred_columns": ["id"]
-    }
     mock_code_agent.run.side_effect = Exception("Agent error")
     
     with pytest.raises(Exception) as exc_info:
-        doc_agent.process_relationship_documentation(relationship)
+        doc_agent.process_relationship_documentation(sample_relationship)
     assert "Agent error" in str(exc_info.value)
 
 # ============================================================================
@@ -277,17 +304,7 @@ def test_process_relationship_documentation_agent_error(doc_agent, mock_code_age
 def test_process_table_documentation_with_indexing(doc_agent_with_indexing, mock_code_agent, mock_indexer_agent):
     """Test table documentation processing with vector indexing."""
     # Mock LLM response
-    table_response = {
-        "business_purpose": "Stores user account information",
-        "schema_data": {
-            "table_name": "users",
-            "columns": [
-                {"name": "id", "type": "integer"},
-                {"name": "username", "type": "varchar"}
-            ]
-        }
-    }
-    mock_code_agent.run.return_value = json.dumps(table_response)
+    mock_code_agent.run.return_value = _TABLE_RESP_JSON
     
     # Process table
     doc_agent_with_indexing.process_table_documentation("users")
@@ -295,72 +312,53 @@ def test_process_table_documentation_with_indexing(doc_agent_with_indexing, mock
     # Verify regular documentation was saved
     doc_agent_with_indexing.store.save_table_documentation.assert_called_once_with(
         "users",
-        table_response["schema_data"],
-        table_response["business_purpose"],
+        _TABLE_RESP["schema_data"],
+        _TABLE_RESP["business_purpose"],
         ANY
     )
     
     # Verify vector indexing was performed
     mock_indexer_agent.index_table_documentation.assert_called_once()
-    table_data = mock_indexer_agent.index_table_documentation.call_args[0][0]
+    table_data = _first_call_arg(mock_indexer_agent.index_table_documentation)
     assert table_data["name"] == "users"
-    assert table_data["business_purpose"] == table_response["business_purpose"]
-    assert table_data["schema"] == table_response["schema_data"]
+    assert table_data["business_purpose"] == _TABLE_RESP["business_purpose"]
+    assert table_data["schema"] == _TABLE_RESP["schema_data"]
 
-def test_process_relationship_documentation_with_indexing(doc_agent_with_indexing, mock_code_agent, mock_indexer_agent):
+def test_process_relationship_documentation_with_indexing(doc_agent_with_indexing, mock_code_agent, mock_indexer_agent, sample_relationship):
     """Test relationship documentation processing with vector indexing."""
-    relationship = {
-        "id": "users_orders_fk",
-        "constrained_table": "orders",
-        "constrained_columns": ["user_id"],
-        "referred_table": "users",
-        "referred_columns": ["id"]
-    }
-    
     # Mock LLM response
-    rel_response = {
-        "relationship_type": "one-to-many",
-        "documentation": "Each user can have multiple orders"
-    }
-    mock_code_agent.run.return_value = json.dumps(rel_response)
+    mock_code_agent.run.return_value = _REL_RESP_JSON
     
     # Process relationship
-    doc_agent_with_indexing.process_relationship_documentation(relationship)
+    doc_agent_with_indexing.process_relationship_documentation(sample_relationship)
     
     # Verify regular documentation was saved
     doc_agent_with_indexing.store.save_relationship_documentation.assert_called_once_with(
         "users_orders_fk",
-        rel_response["relationship_type"],
-        rel_response["documentation"]
+        _REL_RESP["relationship_type"],
+        _REL_RESP["documentation"]
     )
     
     # Verify vector indexing was performed
     mock_indexer_agent.index_relationship_documentation.assert_called_once()
-    rel_data = mock_indexer_agent.index_relationship_documentation.call_args[0][0]
-    assert rel_data["name"] == "users_orders_fk"
-    assert rel_data["type"] == rel_response["relationship_type"]
-    assert rel_data["documentation"] == rel_response["documentation"]
+    rel_data = _first_call_arg(mock_indexer_agent.index_relationship_documentation)
+    assert rel_data["name"] == "orders_users_rel"
+    assert rel_data["type"] == _REL_RESP["relationship_type"]
+    assert rel_data["documentation"] == _REL_RESP["documentation"]
     assert rel_data["tables"] == ["orders", "users"]
 
-def test_indexing_error_handling(doc_agent_with_indexing, mock_code_agent, mock_indexer_agent):
+def test_indexing_error_handling(agent_core_module, doc_agent_with_indexing, mock_code_agent, mock_indexer_agent):
     """Test handling of indexing errors."""
     # Mock LLM response
-    table_response = {
-        "business_purpose": "Stores user account information",
-        "schema_data": {
-            "table_name": "users",
-            "columns": [{"name": "id", "type": "integer"}]
-        }
-    }
-    mock_code_agent.run.return_value = json.dumps(table_response)
+    mock_code_agent.run.return_value = _SINGLE_COLUMN_TABLE_RESP_JSON
     
     # Simulate indexing failure
     mock_indexer_agent.index_table_documentation.return_value = False
     
     # Process should complete but log the error
-    with pytest.raises(ValueError) as exc_info:
+    with patch.object(agent_core_module.logger, "error") as log_error:
         doc_agent_with_indexing.process_table_documentation("users")
-    assert "Failed to index table documentation" in str(exc_info.value)
+    assert "Failed to index table documentation" in str(log_error.call_args.args[0])
     
     # Regular documentation should still be saved
     doc_agent_with_indexing.store.save_table_documentation.assert_called_once()
@@ -6,6 +6,9 @@ from src.agents.batch_manager import BatchIndexingManager
 from src.agents.indexer import SQLIndexerAgent
 from src.database.persistence import DocumentationStore
 
+# Environment seen by the batch manager; os.getenv is patched with _ENV.get
+_ENV = {"EMBEDDING_BATCH_SIZE": "100", "EMBEDDING_MAX_RETRIES": "3"}
+
 @pytest.fixture
 def mock_indexer_agent():
     """Create a mock indexer agent."""
@@ -39,15 +42,7 @@ def mock_doc_store():
 @pytest.fixture
 def batch_manager(mock_indexer_agent):
     """Create a batch manager with mocked dependencies."""
-    def mock_getenv(key, default=None):
-        if key == "EMBEDDING_BATCH_SIZE":
-            return "100"
-        elif key == "EMBEDDING_MAX_RETRIES":
-            return "3"
-        else:
-            return default
-    
-    with patch('src.agents.batch_manager.os.getenv', side_effect=mock_getenv):
+    with patch('src.agents.batch_manager.os.getenv', side_effect=_ENV.get):
         manager = BatchIndexingManager(mock_indexer_agent)
         return manager
 
@@ -107,51 +102,38 @@ def test_get_processing_stats(batch_manager, mock_doc_store):
     assert stats["batch_size"] == 100
     assert stats["estimated_batches"] == 1  # 5 items / 100 batch size = 1 batch
 
-def test_batch_process_pending_tables(batch_manager, mock_doc_store):
-    """Test batch processing of pending tables."""
-    results = batch_manager.batch_process_pending_tables(mock_doc_store)
-    
-    # Verify the indexer was called
-    mock_doc_store.get_pending_tables.assert_called_once()
-    batch_manager.indexer.batch_index_tables.assert_called_once()
-    
-    # Verify results
-    assert "table1" in results
-    assert "table2" in results
-    assert results["table1"] is True
-    assert results["table2"] is False
-
-def test_batch_process_pending_tables_empty(batch_manager, mock_doc_store):
-    """Test batch processing when no pending tables."""
-    mock_doc_store.get_pending_tables.return_value = []
-    
-    results = batch_manager.batch_process_pending_tables(mock_doc_store)
-    
-    assert results == {}
-    batch_manager.indexer.batch_index_tables.assert_not_called()
-
-def test_batch_process_pending_relationships(batch_manager, mock_doc_store):
-    """Test batch processing of pending relationships."""
-    results = batch_manager.batch_process_pending_relationships(mock_doc_store)
-    
-    # Verify the indexer was called
-    mock_doc_store.get_pending_relationships.assert_called_once()
-    batch_manager.indexer.batch_index_relationships.assert_called_once()
-    
-    # Verify results
-    assert "rel1" in results
-    assert "rel2" in results
-    assert results["rel1"] is True
-    assert results["rel2"] is True
+# Pending-item getter, indexer method and expected results per batch method
+_PENDING_KINDS = {
+    "tables": ("get_pending_tables", "batch_index_tables", {"table1": True, "table2": False}),
+    "relationships": ("get_pending_relationships", "batch_index_relationships", {"rel1": True, "rel2": True})
+}
 
-def test_batch_process_pending_relationships_empty(batch_manager, mock_doc_store):
-    """Test batch processing when no pending relationships."""
-    mock_doc_store.get_pending_relationships.return_value = []
+@pytest.mark.parametrize("kind, empty", [
+    ("tables", False),
+    ("tables", True),
+    ("relationships", False),
+    ("relationships", True)
+])
+def test_batch_process_pending(batch_manager, mock_doc_store, kind, empty):
+    """Test batch processing of pending tables and relationships, with and without pending items."""
+    get_pending, batch_index, expected = _PENDING_KINDS[kind]
+    if empty:
+        getattr(mock_doc_store, get_pending).return_value = []
     
-    results = batch_manager.batch_process_pending_relationships(mock_doc_store)
+    results = getattr(batch_manager, f"batch_process_pending_{kind}")(mock_doc_store)
     
-    assert results == {}
-    batch_manager.indexer.batch_index_relationships.assert_not_called()
+    indexer_method = getattr(batch_manager.indexer, batch_index)
+    if empty:
+        assert results == {}
+        indexer_method.assert_not_called()
+    else:
+        # Verify the indexer was called
+        getattr(mock_doc_store, get_pending).assert_called_once()
+        indexer_method.assert_called_once()
+        
+        # Verify results
+        for key, value in expected.items():
+            assert results[key] is value
 
 def test_batch_process_with_exception(batch_manager, mock_doc_store):
     """Test batch processing when exceptions occur."""
@@ -0,0 +1,175 @@
+"""Tests for the BusinessValidator."""
+
+import pytest
+import sqlparse
+from src.agents.concepts.loader import BusinessConcept
+from src.validation.business_validator import BusinessValidator
+
+@pytest.fixture
+def validator():
+    """Create a business validator."""
+    return BusinessValidator()
+
+def test_extract_joins_from_query(validator):
+    """Test extracting multiple JOIN conditions."""
+    query = (
+        "SELECT c.name, SUM(a.balance) FROM customers c "
+        "JOIN accounts a ON customers.customer_id = accounts.customer_id "
+        "LEFT JOIN loans l ON customers.customer_id = loans.customer_id AND l.active = 1 "
+        "WHERE a.balance > 0 GROUP BY c.name"
+    )
+
+    joins = validator._extract_joins_from_query(sqlparse.parse(query)[0])
+
+    assert joins == [
+        "customers.customer_id = accounts.customer_id",
+        "customers.customer_id = loans.customer_id AND l.active = 1"
+    ]
+
+def test_extract_joins_from_query_without_joins(validator):
+    """Test extracting joins from a query that has none."""
+    joins = validator._extract_joins_from_query(sqlparse.parse("SELECT id FROM customers")[0])
+
+    assert joins == []
+
+def test_check_required_joins(validator):
+    """Test required join detection."""
+    query = "SELECT * FROM customers JOIN accounts ON customers.customer_id = accounts.customer_id"
+
+    result = validator.check_required_joins(query, [
+        "customers.customer_id = accounts.customer_id",
+        "customers.customer_id = loans.customer_id"
+    ])
+
+    assert result["valid"] is False
+    assert result["missing_joins"] == ["customers.customer_id = loans.customer_id"]
+    assert result["found_joins"] == ["customers.customer_id = accounts.customer_id"]
+
+def test_validate_against_concepts_missing_joins(validator):
+    """Test concept validation reports missing required joins."""
+    concept = BusinessConcept(
+        name="customer_analysis",
+        description="Customer analysis",
+        target=["customers", "accounts"],
+        instructions="",
+        required_joins=["customers.customer_id = accounts.customer_id", "Customers.Customer_ID = Loans.Customer_ID"],
+        examples=[]
+    )
+    query = "SELECT * FROM customers JOIN accounts ON customers.customer_id=accounts.customer_id"
+
+    result = validator.validate_against_concepts(query, [concept])
+
+    assert result["valid"] is False
+    assert result["issues"] == ["Missing required joins: ['Customers.Customer_ID = Loans.Customer_ID']"]
+
+@pytest.mark.parametrize("query, instructions, expected_issues", [
+    ("SELECT SUM(balance) FROM accounts GROUP BY branch", ["Calculate totals by group"], []),
+    ("SELECT balance FROM accounts", ["Calculate the total"], ["Aggregation required but no aggregation functions found"]),
+    ("SELECT COUNT(*) FROM accounts", ["Group by date"], ["Time-based analysis required but no date/time filtering found"]),
+    ("SELECT COUNT(*) FROM accounts WHERE open_date > '2024-01-01'", ["Group by date"], ["Grouping required but no GROUP BY clause found"]),
+])
+def test_validate_business_logic(validator, query, instructions, expected_issues):
+    """Test business instruction compliance checks."""
+    result = validator.validate_business_logic(query, instructions)
+
+    assert result["valid"] is (not expected_issues)
+    assert result["issues"] == expected_issues
+
+def test_validate_against_concepts_forbidden_operation(validator):
+    """Test concept validation rejects write statements up front."""
+    concept = BusinessConcept(
+        name="customer_analysis",
+        description="Customer analysis",
+        target=["customers"],
+        instructions="Calculate totals",
+        required_joins=[],
+        examples=[]
+    )
+
+    result = validator.validate_against_concepts("DELETE FROM customers WHERE last_update < '2020-01-01'", [concept])
+
+    assert result["valid"] is False
+    assert result["issues"] == ["Forbidden operation in query: DELETE"]
+    assert result["concept_compliance"] == {}
+
+def test_check_data_privacy_compliance(validator):
+    """Test sensitive column detection is case-insensitive."""
+    result = validator.check_data_privacy_compliance("SELECT * FROM customers WHERE Email IS NOT NULL")
+
+    assert result["compliant"] is False
+    assert result["issues"] == [
+        "Query may expose sensitive data: email",
+        "SELECT * may expose unnecessary sensitive data"
+    ]
+
+def test_check_data_privacy_compliance_multiple_patterns(validator):
+    """Test sensitive patterns are reported once each, in a stable order."""
+    result = validator.check_data_privacy_compliance(
+        "SELECT email_address, phone, SSN, phone FROM customers WHERE password IS NULL"
+    )
+
+    assert result["issues"] == [
+        "Query may expose sensitive data: password",
+        "Query may expose sensitive data: ssn",
+        "Query may expose sensitive data: phone",
+        "Query may expose sensitive data: email",
+        "Query may expose sensitive data: address"
+    ]
+
+@pytest.mark.parametrize("concept_count", [2, 10])
+def test_validate_against_concepts_preserves_concept_order(validator, concept_count):
+    """Test serial and thread-pool concept validation report results in concept order."""
+    concepts = [
+        BusinessConcept(
+            name=f"concept_{i}",
+            description="Concept",
+            target=["customers"],
+            instructions="Group by customer" if i % 2 else "",
+            required_joins=[f"customers.id = t{i}.customer_id"],
+            examples=[]
+        )
+        for i in range(concept_count)
+    ]
+
+    result = validator.validate_against_concepts("SELECT id FROM customers", concepts)
+
+    assert list(result["concept_compliance"]) == [concept.name for concept in concepts]
+    assert result["issues"][:2] == [
+        "Missing required joins: ['customers.id = t0.customer_id']",
+        "Missing required joins: ['customers.id = t1.customer_id']"
+    ]
+    assert result["issues"][2] == "Grouping required but no GROUP BY clause found"
+
+@pytest.mark.parametrize("concept_count", [2, 10])
+def test_validate_against_concepts_isolates_concept_errors(validator, monkeypatch, concept_count):
+    """Test a concept whose check raises is reported invalid without dropping the others."""
+    concepts = [
+        BusinessConcept(
+            name=f"concept_{i}",
+            description="Concept",
+            target=["customers"],
+            instructions="",
+            required_joins=[f"customers.id = t{i}.customer_id"],
+            examples=[]
+        )
+        for i in range(concept_count)
+    ]
+    find_missing_joins = validator._find_missing_joins
+
+    def failing_find_missing_joins(required_joins, query_joins_normalized):
+        if required_joins == concepts[0].required_joins:
+            raise ValueError("bad join")
+        return find_missing_joins(required_joins, query_joins_normalized)
+
+    monkeypatch.setattr(validator, "_find_missing_joins", failing_find_missing_joins)
+
+    result = validator.validate_against_concepts("SELECT id FROM customers", concepts)
+
+    assert "error" not in result
+    assert result["valid"] is False
+    assert list(result["concept_compliance"]) == [concept.name for concept in concepts]
+    assert result["concept_compliance"]["concept_0"]["valid"] is False
+    assert result["concept_compliance"]["concept_0"]["error"] == "bad join"
+    assert result["concept_compliance"]["concept_1"]["issues"] == [
+        "Missing required joins: ['customers.id = t1.customer_id']"
+    ]
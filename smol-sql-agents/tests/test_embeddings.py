@@ -0,0 +1,79 @@
+"""Tests for the OpenAI embeddings client batching."""
+
+import time
+import pytest
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+from src.vector import embeddings
+from src.vector.embeddings import OpenAIEmbeddingsClient
+
+class FakeEncoder:
+    """Tokenizer stand-in that treats every word as one token."""
+
+    def encode(self, text):
+        return text.split()
+
+    def encode_batch(self, texts, num_threads=1):
+        return [self.encode(text) for text in texts]
+
+    def decode(self, tokens):
+        return " ".join(tokens)
+
+def fake_create(input, model):
+    """Embed "t<i>" as [i]; earlier batches answer last to exercise reordering."""
+    indexes = [int(text.split()[0][1:]) for text in input]
+    time.sleep(0.05 / (1 + indexes[0]))
+    return SimpleNamespace(data=[SimpleNamespace(embedding=[float(i)]) for i in indexes])
+
+@pytest.fixture
+def openai_client():
+    """Create a fake OpenAI client."""
+    return SimpleNamespace(embeddings=SimpleNamespace(create=Mock(side_effect=fake_create)))
+
+@pytest.fixture
+def client(openai_client, monkeypatch):
+    """Create an embeddings client over the fake OpenAI client and tokenizer."""
+    monkeypatch.setenv("EMBEDDING_BATCH_SIZE", "3")
+    monkeypatch.setenv("EMBEDDING_MAX_TOKENS_PER_REQUEST", "10")
+    monkeypatch.setenv("OPENAI_MAX_WORKERS", "4")
+    with patch("openai.OpenAI", return_value=openai_client), \
+         patch.object(embeddings.tiktoken, "encoding_for_model", return_value=FakeEncoder()):
+        yield OpenAIEmbeddingsClient()
+
+def test_build_batches_splits_by_batch_size(client):
+    """Test batches hold at most batch_size texts."""
+    texts = [f"t{i}" for i in range(7)]
+
+    batches = client._build_batches(texts, [1] * len(texts))
+
+    assert batches == [["t0", "t1", "t2"], ["t3", "t4", "t5"], ["t6"]]
+
+def test_build_batches_splits_by_token_budget(client):
+    """Test a batch is closed before it would exceed max_tokens_per_request."""
+    batches = client._build_batches(["a", "b", "c", "d"], [4, 5, 2, 9])
+
+    assert batches == [["a", "b"], ["c"], ["d"]]
+
+def test_build_batches_text_over_budget_gets_own_batch(client):
+    """Test a single text larger than the token budget is still sent, alone."""
+    batches = client._build_batches(["a", "big", "b"], [1, 50, 1])
+
+    assert batches == [["a"], ["big"], ["b"]]
+
+def test_generate_embeddings_batch_preserves_order(client, openai_client):
+    """Test embeddings come back in input order when batches finish out of order."""
+    texts = [f"t{i}" for i in range(8)]
+
+    result = client.generate_embeddings_batch(texts)
+
+    assert result == [[float(i)] for i in range(8)]
+    assert openai_client.embeddings.create.call_count == 3
+
+def test_prepare_texts_truncates_long_texts(client, monkeypatch):
+    """Test texts over _MAX_INPUT_TOKENS are cut to the limit and cleaned up."""
+    monkeypatch.setattr(embeddings, "_MAX_INPUT_TOKENS", 3)
+
+    prepared, token_counts = client._prepare_texts_for_embedding(["  t0   a\nb c d ", "t1 a"])
+
+    assert prepared == ["t0 a b", "t1 a"]
+    assert token_counts == [3, 2]
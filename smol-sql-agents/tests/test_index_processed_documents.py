@@ -1,111 +1,102 @@
 """Tests for indexing already processed documents."""
 
 import pytest
-from unittest.mock import Mock, patch
+from unittest.mock import Mock
 from src.agents.core import PersistentDocumentationAgent
 
-def test_index_processed_documents_with_vector_indexing():
+@pytest.fixture(scope="module")
+def patched_agent_ctx(patched_core):
+    """Create one agent for the module with its collaborators patched.
+    
+    Returns the agent and the patched_core mocks; the patches stay active
+    until the module's tests have finished.
+    """
+    # Mock the documentation store methods
+    mock_doc_store = patched_core.doc_store
+    mock_doc_store.return_value.get_all_tables.return_value = ["table1", "table2"]
+    mock_doc_store.return_value.get_all_relationships.return_value = [
+        {"id": "rel1", "constrained_table": "table1", "referred_table": "table2"}
+    ]
+    mock_doc_store.return_value.get_table_info.return_value = {
+        "table_name": "table1",
+        "business_purpose": "Test table",
+        "schema_data": {"columns": []},
+        "documentation": "Test documentation"
+    }
+    mock_doc_store.return_value.get_relationship_info.return_value = {
+        "id": "rel1",
+        "relationship_type": "one-to-many",
+        "documentation": "Test relationship"
+    }
+    
+    agent = PersistentDocumentationAgent()
+    return agent, patched_core
+
+@pytest.fixture(autouse=True)
+def reset_doc_store(patched_agent_ctx):
+    """Clear calls recorded on the shared documentation store between tests."""
+    yield
+    _, mocks = patched_agent_ctx
+    mocks.doc_store.return_value.reset_mock()
+
+def test_index_processed_documents_with_vector_indexing(patched_agent_ctx):
     """Test indexing processed documents when vector indexing is available."""
-    with patch('src.agents.core.SQLVectorStore') as mock_vector_store, \
-         patch('src.agents.core.DatabaseInspector') as mock_db_inspector, \
-         patch('src.agents.core.OpenAIModel') as mock_llm_model, \
-         patch('src.agents.core.DocumentationStore') as mock_doc_store, \
-         patch('src.agents.core.CodeAgent') as mock_code_agent, \
-         patch('src.agents.core.os.getenv', return_value='dummy-api-key'):
-        
-        # Mock the documentation store methods
-        mock_doc_store.return_value.get_all_tables.return_value = ["table1", "table2"]
-        mock_doc_store.return_value.get_all_relationships.return_value = [
-            {"id": "rel1", "constrained_table": "table1", "referred_table": "table2"}
-        ]
-        mock_doc_store.return_value.get_table_info.return_value = {
-            "table_name": "table1",
-            "business_purpose": "Test table",
-            "schema_data": {"columns": []},
-            "documentation": "Test documentation"
-        }
-        mock_doc_store.return_value.get_relationship_info.return_value = {
-            "id": "rel1",
-            "relationship_type": "one-to-many",
-            "documentation": "Test relationship"
-        }
-        
-        # Mock the indexer agent
-        mock_indexer = Mock()
-        mock_indexer.index_table_documentation.return_value = True
-        mock_indexer.index_relationship_documentation.return_value = True
-        
-        # Create agent with mocked indexer
-        agent = PersistentDocumentationAgent()
-        agent.indexer_agent = mock_indexer
-        agent.vector_indexing_available = True
-        
-        # Call the method
-        agent.index_processed_documents()
-        
-        # Verify that the indexer was called for both tables and relationships
-        assert mock_indexer.index_table_documentation.call_count == 2
-        assert mock_indexer.index_relationship_documentation.call_count == 1
+    agent, mocks = patched_agent_ctx
+    
+    # Mock the indexer agent
+    mock_indexer = Mock()
+    mock_indexer.batch_index_tables.return_value = {"table1": True, "table2": True}
+    mock_indexer.batch_index_relationships.return_value = {"rel1": True}
+    
+    # Use the mocked indexer
+    agent.indexer_agent = mock_indexer
+    agent.vector_indexing_available = True
+    
+    # Call the method
+    agent.index_processed_documents()
+    
+    # Verify that both tables and the relationship were indexed in one bulk call each
+    mock_indexer.batch_index_tables.assert_called_once()
+    assert [table["name"] for table in mock_indexer.batch_index_tables.call_args.args[0]] == ["table1", "table2"]
+    mock_indexer.batch_index_relationships.assert_called_once()
+    assert [rel["id"] for rel in mock_indexer.batch_index_relationships.call_args.args[0]] == ["rel1"]
+    mock_indexer.index_table_documentation.assert_not_called()
+    mock_indexer.vector_store.flush.assert_called_once()
 
-def test_index_processed_documents_without_vector_indexing():
+def test_index_processed_documents_without_vector_indexing(patched_agent_ctx):
     """Test indexing processed documents when vector indexing is not available."""
-    with patch('src.agents.core.SQLVectorStore') as mock_vector_store, \
-         patch('src.agents.core.DatabaseInspector') as mock_db_inspector, \
-         patch('src.agents.core.OpenAIModel') as mock_llm_model, \
-         patch('src.agents.core.DocumentationStore') as mock_doc_store, \
-         patch('src.agents.core.CodeAgent') as mock_code_agent, \
-         patch('src.agents.core.os.getenv', return_value='dummy-api-key'):
-        
-        # Create agent without vector indexing
-        agent = PersistentDocumentationAgent()
-        agent.indexer_agent = None
-        agent.vector_indexing_available = False
-        
-        # Call the method - should not raise an exception
-        agent.index_processed_documents()
-        
-        # Verify that no indexing was attempted
-        # (The method should just log a warning and return)
+    agent, mocks = patched_agent_ctx
+    
+    # Disable vector indexing
+    agent.indexer_agent = None
+    agent.vector_indexing_available = False
+    
+    # Call the method - should not raise an exception
+    agent.index_processed_documents()
+    
+    # Verify that no indexing was attempted
+    # (The method should just log a warning and return)
 
-def test_index_processed_documents_with_indexing_failures():
+def test_index_processed_documents_with_indexing_failures(patched_agent_ctx):
     """Test indexing processed documents when some indexing operations fail."""
-    with patch('src.agents.core.SQLVectorStore') as mock_vector_store, \
-         patch('src.agents.core.DatabaseInspector') as mock_db_inspector, \
-         patch('src.agents.core.OpenAIModel') as mock_llm_model, \
-         patch('src.agents.core.DocumentationStore') as mock_doc_store, \
-         patch('src.agents.core.CodeAgent') as mock_code_agent, \
-         patch('src.agents.core.os.getenv', return_value='dummy-api-key'):
-        
-        # Mock the documentation store methods
-        mock_doc_store.return_value.get_all_tables.return_value = ["table1", "table2"]
-        mock_doc_store.return_value.get_all_relationships.return_value = [
-            {"id": "rel1", "constrained_table": "table1", "referred_table": "table2"}
-        ]
-        mock_doc_store.return_value.get_table_info.return_value = {
-            "table_name": "table1",
-            "business_purpose": "Test table",
-            "schema_data": {"columns": []},
-            "documentation": "Test documentation"
-        }
-        mock_doc_store.return_value.get_relationship_info.return_value = {
-            "id": "rel1",
-            "relationship_type": "one-to-many",
-            "documentation": "Test relationship"
-        }
-        
-        # Mock the indexer agent with some failures
-        mock_indexer = Mock()
-        mock_indexer.index_table_documentation.side_effect = [True, False]  # Second table fails
-        mock_indexer.index_relationship_documentation.return_value = True
-        
-        # Create agent with mocked indexer
-        agent = PersistentDocumentationAgent()
-        agent.indexer_agent = mock_indexer
-        agent.vector_indexing_available = True
-        
-        # Call the method - should handle failures gracefully
-        agent.index_processed_documents()
-        
-        # Verify that the indexer was called for both tables and relationships
-        assert mock_indexer.index_table_documentation.call_count == 2
-        assert mock_indexer.index_relationship_documentation.call_count == 1 
\ No newline at end of file
+    agent, mocks = patched_agent_ctx
+    
+    # Mock the indexer agent with some failures
+    mock_indexer = Mock()
+    mock_indexer.batch_index_tables.return_value = {"table1": True, "table2": False}  # Second table fails
+    mock_indexer.batch_index_relationships.return_value = {"rel1": True}
+    
+    # Use the mocked indexer
+    agent.indexer_agent = mock_indexer
+    agent.vector_indexing_available = True
+    
+    # Call the method - should handle failures gracefully
+    agent.index_processed_documents()
+    
+    # Verify that both tables and the relationship were indexed in one bulk call each
+    mock_indexer.batch_index_tables.assert_called_once()
+    assert [table["name"] for table in mock_indexer.batch_index_tables.call_args.args[0]] == ["table1", "table2"]
+    mock_indexer.batch_index_relationships.assert_called_once()
+    assert [rel["id"] for rel in mock_indexer.batch_index_relationships.call_args.args[0]] == ["rel1"]
+    mock_indexer.index_table_documentation.assert_not_called()
+    mock_indexer.vector_store.flush.assert_called_once()
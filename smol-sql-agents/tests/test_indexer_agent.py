@@ -1,44 +1,54 @@
 """Tests for the SQL Indexer Agent and related components."""
 
-import sys
-import os
+import numpy as np
 import pytest
+from collections import OrderedDict
+from itertools import islice
+from pathlib import Path
 from unittest.mock import Mock, patch
 
-# Add the parent directory to the Python path
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
 from src.agents.indexer import SQLIndexerAgent
 from src.vector.store import SQLVectorStore
 from src.vector.embeddings import OpenAIEmbeddingsClient
 
-@pytest.fixture
+# One read-only float32 embedding shared by every mocked embeddings call;
+# OpenAI embeddings are 3072-dimensional
+_VEC = np.full(3072, 0.1, dtype=np.float32)
+_VEC.setflags(write=False)
+
+@pytest.fixture(scope="session")
 def mock_embedding():
     """Mock embedding vector."""
-    return [0.1] * 3072  # OpenAI embeddings are 3072-dimensional
+    return _VEC
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def mock_embeddings_client():
     """Create a mock OpenAI embeddings client."""
     client = Mock(spec=OpenAIEmbeddingsClient)
-    client.generate_embedding.return_value = [0.1] * 3072
-    client.generate_embeddings_batch.return_value = [[0.1] * 3072]
+    client.generate_embedding.return_value = _VEC
+    # One embedding per input text, as the real batch call returns
+    client.generate_embeddings_batch.side_effect = lambda texts: [_VEC] * len(texts)
     return client
 
-@pytest.fixture
-def mock_vector_index():
-    """Create a mock vector index."""
+def _build_index():
+    """Build a mock vector index that keeps added documents in index.docs by id."""
     index = Mock()
-    index.docs = []
+    index.docs = OrderedDict()
+    # Search results per (version, k); add and delete bump the version
+    index.version = 0
+    index.search_cache = {}
     
     def mock_add(id, vector, metadata):
-        index.docs.append({"id": id, "metadata": metadata})
+        index.docs[id] = {"id": id, "metadata": metadata}
+        index.version += 1
     index.add = Mock(side_effect=mock_add)
     
     def mock_delete(ids):
-        if not any(doc["id"] in ids for doc in index.docs):
+        if not any(id in index.docs for id in ids):
             raise ValueError("Document not found")
-        index.docs = [doc for doc in index.docs if doc["id"] not in ids]
+        for id in ids:
+            index.docs.pop(id, None)
+        index.version += 1
         return True
     index.delete = Mock(side_effect=mock_delete)
     
@@ -47,36 +57,64 @@ def mock_vector_index():
     index.save = Mock(side_effect=mock_save)
     
     def mock_search(vector, k=5):
-        if not index.docs:
-            return []
-        return [
-            {
-                "id": doc["id"],
-                "metadata": doc["metadata"],
-                "score": 0.95
-            }
-            for doc in index.docs[:k]
-        ]
+        key = (index.version, k)
+        if key not in index.search_cache:
+            index.search_cache[key] = [
+                {
+                    "id": doc["id"],
+                    "content": doc["metadata"],
+                    "score": 0.95
+                }
+                for doc in islice(index.docs.values(), k)
+            ]
+        return index.search_cache[key]
     index.search = Mock(side_effect=mock_search)
     return index
 
-@pytest.fixture
-def mock_vector_index_factory(mock_vector_index):
-    """Create a mock vector index factory."""
+def _reset_index(index):
+    """Empty an index and clear its search cache and call history."""
+    index.docs.clear()
+    index.search_cache.clear()
+    for method in (index.add, index.delete, index.save, index.search):
+        method.reset_mock()
+
+@pytest.fixture(scope="session")
+def mock_vector_index_factory():
+    """Create a mock vector index factory.
+    
+    Each index path gets its own index, built once for the session and keyed
+    by its last two path parts.
+    """
+    indexes = {}
+    
     def factory(path):
-        return mock_vector_index
+        key = Path(path).parts[-2:]
+        if key not in indexes:
+            indexes[key] = _build_index()
+        return indexes[key]
     return factory
 
+@pytest.fixture(scope="session")
+def vector_store_dir(tmp_path_factory):
+    """Create one base directory shared by every test's vector store.
+    
+    The indexes are mocks, so the store only keeps its embedding cache
+    there; every mocked embedding is identical, so sharing it is safe.
+    """
+    return str(tmp_path_factory.mktemp("vecstore"))
+
 @pytest.fixture
-def mock_vector_store(mock_embeddings_client, mock_vector_index_factory, tmp_path):
+def mock_vector_store(mock_embeddings_client, mock_vector_index_factory, vector_store_dir):
     """Create a mock vector store with test indexes."""
     store = SQLVectorStore(
-        base_path=str(tmp_path),
+        base_path=vector_store_dir,
         vector_index_factory=mock_vector_index_factory
     )
     store.embeddings_client = mock_embeddings_client
     store.create_table_index()
     store.create_relationship_index()
+    _reset_index(store.table_index)
+    _reset_index(store.relationship_index)
     return store
 
 @pytest.fixture
@@ -94,37 +132,25 @@ def test_vector_store_init_failure(mock_embeddings_client):
         SQLIndexerAgent(failing_store)
     assert "Failed to create index" in str(exc_info.value)
 
-def test_index_table_documentation(indexer_agent):
-    """Test indexing a single table document."""
-    table_data = {
+@pytest.mark.parametrize("method_name, data, ok", [
+    ("index_table_documentation", {
         "name": "users",
         "columns": ["id", "username", "email"],
         "description": "User account information"
-    }
-    
-    result = indexer_agent.index_table_documentation(table_data)
-    assert result == True
-
-def test_index_table_documentation_invalid_data(indexer_agent):
-    """Test indexing with invalid table data."""
-    invalid_table_data = {
-        "description": "Missing required fields"
-    }
-    
-    result = indexer_agent.index_table_documentation(invalid_table_data)
-    assert result == False
-
-def test_index_relationship_documentation(indexer_agent):
-    """Test indexing a single relationship document."""
-    relationship_data = {
+    }, True),
+    # Missing required fields
+    ("index_table_documentation", {"description": "Missing required fields"}, False),
+    ("index_relationship_documentation", {
         "name": "user_orders",
         "type": "one_to_many",
         "tables": ["users", "orders"],
         "description": "User's order history"
-    }
-    
-    result = indexer_agent.index_relationship_documentation(relationship_data)
-    assert result == True
+    }, True)
+], ids=["table", "table_invalid_data", "relationship"])
+def test_index_documentation(indexer_agent, method_name, data, ok):
+    """Test indexing a single table or relationship document."""
+    result = getattr(indexer_agent, method_name)(data)
+    assert result is ok
 
 def test_search_documentation_all(indexer_agent, mock_embedding):
     """Test searching across all documentation types."""
@@ -150,25 +176,97 @@ def test_search_documentation_all(indexer_agent, mock_embedding):
     assert "total_results" in results
     assert results["total_results"] > 0
 
-def test_batch_index_tables(indexer_agent):
-    """Test batch indexing of multiple tables."""
-    tables_data = [
+@pytest.mark.parametrize("method_name, items", [
+    ("batch_index_tables", [
         {
             "name": "customers",
-            "columns": ["id", "name", "email"],
-            "description": "Customer information"
+            "business_purpose": "Customer information",
+            "schema": {"columns": ["id", "name", "email"]},
+            "type": "table"
         },
         {
             "name": "orders",
-            "columns": ["id", "customer_id", "total"],
-            "description": "Order details"
+            "business_purpose": "Order details",
+            "schema": {"columns": ["id", "customer_id", "total"]},
+            "type": "table"
         }
-    ]
-    
-    results = indexer_agent.batch_index_tables(tables_data)
+    ]),
+    ("batch_index_relationships", [
+        {
+            "name": "user_addresses",
+            "type": "one_to_many",
+            "documentation": "User's addresses",
+            "tables": ["users", "addresses"]
+        },
+        {
+            "name": "order_items",
+            "type": "one_to_many",
+            "documentation": "Items in an order",
+            "tables": ["orders", "items"]
+        }
+    ])
+], ids=["tables", "relationships"])
+def test_batch_index(indexer_agent, method_name, items):
+    """Test batch indexing of multiple tables or relationships."""
+    results = getattr(indexer_agent, method_name)(items)
     assert len(results) == 2
     assert all(results.values())
 
+@pytest.mark.parametrize("method_name, store_method, valid, key, invalid_key", [
+    ("batch_index_tables", "add_table_documents", {
+        "name": "users",
+        "business_purpose": "User accounts",
+        "schema": {"columns": ["id"]},
+        "type": "table"
+    }, "users", "broken"),
+    ("batch_index_relationships", "add_relationship_documents", {
+        "name": "user_orders",
+        "type": "one_to_many",
+        "documentation": "User's orders",
+        "tables": ["users", "orders"]
+    }, "user_orders_rel", "broken_rel")
+], ids=["tables", "relationships"])
+def test_batch_index_uses_bulk_store_api(method_name, store_method, valid, key, invalid_key):
+    """Test batch indexing sends valid documents to the store in one bulk call."""
+    vector_store = Mock()
+    agent = SQLIndexerAgent(vector_store, shared_llm_model=Mock())
+    
+    results = getattr(agent, method_name)([valid, {"name": "broken"}])
+    
+    assert results == {key: True, invalid_key: False}
+    getattr(vector_store, store_method).assert_called_once_with([(key, valid)])
+
+def test_batch_index_marks_documents_failed_when_bulk_add_fails():
+    """Test a failing bulk add reports every submitted document as failed."""
+    vector_store = Mock()
+    vector_store.add_table_documents.side_effect = RuntimeError("index unavailable")
+    agent = SQLIndexerAgent(vector_store, shared_llm_model=Mock())
+    tables = [
+        {"name": name, "business_purpose": "", "schema": {}, "type": "table"}
+        for name in ("users", "orders")
+    ]
+    
+    assert agent.batch_index_tables(tables) == {"users": False, "orders": False}
+
+@pytest.mark.parametrize("tool_name, store_method, data", [
+    ("index_table_documentation", "add_table_document", {
+        "name": "users", "business_purpose": "User accounts", "schema": {}, "type": "table"
+    }),
+    ("index_relationship_documentation", "add_relationship_document", {
+        "id": "user_orders_rel", "name": "user_orders", "type": "one_to_many",
+        "documentation": "User's orders", "tables": ["users", "orders"]
+    })
+], ids=["table", "relationship"])
+def test_index_tools_flush_their_write(tool_name, store_method, data):
+    """Test the LLM indexing tools persist each single-document write."""
+    vector_store = Mock()
+    agent = SQLIndexerAgent(vector_store, shared_llm_model=Mock())
+    index_tool = next(t for t in agent.tools if t.name == tool_name)
+    
+    assert index_tool(data)["success"] is True
+    getattr(vector_store, store_method).assert_called_once()
+    vector_store.flush.assert_called_once_with()
+
 def test_update_table_index(indexer_agent):
     """Test updating an existing table document."""
     original_data = {
@@ -227,27 +325,6 @@ def test_search_specific_type(indexer_agent):
     assert len(table_results["relationships"]) == 0
     assert len(table_results["tables"]) > 0
 
-def test_batch_index_relationships(indexer_agent):
-    """Test batch indexing of multiple relationships."""
-    relationships_data = [
-        {
-            "name": "user_addresses",
-            "type": "one_to_many",
-            "tables": ["users", "addresses"],
-            "description": "User's addresses"
-        },
-        {
-            "name": "order_items",
-            "type": "one_to_many",
-            "tables": ["orders", "items"],
-            "description": "Items in an order"
-        }
-    ]
-    
-    results = indexer_agent.batch_index_relationships(relationships_data)
-    assert len(results) == 2
-    assert all(results.values())
-
 def test_invalid_search_type(indexer_agent):
     """Test search with invalid doc_type."""
     results = indexer_agent.search_documentation("test", doc_type="invalid_type")
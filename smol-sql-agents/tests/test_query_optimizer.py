@@ -0,0 +1,165 @@
+"""Tests for the QueryOptimizer."""
+
+import pytest
+import src.agents  # noqa: F401 - imported first to avoid the agents/validation import cycle
+from src.validation.query_optimizer import QueryOptimizer
+from src.validation.query_features import fingerprint
+
+JOIN_QUERY = (
+    "SELECT c.name, SUM(a.balance) FROM customers c "
+    "JOIN accounts a ON c.id = a.customer_id "
+    "LEFT JOIN loans l ON l.customer_id = c.id "
+    "INNER JOIN branches b ON b.id = a.branch_id "
+    "WHERE a.balance > 0 GROUP BY c.name ORDER BY 2"
+)
+
+@pytest.fixture
+def optimizer():
+    """Create a query optimizer."""
+    return QueryOptimizer()
+
+def test_analyze_performance_select_star(optimizer):
+    """Test performance analysis of an unfiltered SELECT *."""
+    result = optimizer.analyze_performance("SELECT * FROM customers")
+
+    assert result["complexity_score"] == 2
+    assert [s["message"] for s in result["optimization_suggestions"]] == [
+        "Replace SELECT * with specific column names",
+        "Consider adding WHERE clause for large tables"
+    ]
+    assert result["performance_issues"][0]["type"] == "anti_pattern"
+    assert result["estimated_impact"] == "high"
+
+def test_analyze_performance_joins(optimizer):
+    """Test performance analysis of a multi-join query."""
+    result = optimizer.analyze_performance(JOIN_QUERY)
+
+    # 3 joins, 1 select, 1 where, 1 group by, 1 order by
+    assert result["complexity_score"] == 3 * 5 + 2 + 3 + 4 + 3
+    messages = [s["message"] for s in result["optimization_suggestions"]]
+    assert "Multiple JOINs detected - consider optimizing join order" in messages
+    assert result["performance_issues"] == [{
+        "type": "performance",
+        "severity": "info",
+        "description": "ORDER BY without LIMIT may process large result sets"
+    }]
+
+def test_optimize_joins(optimizer):
+    """Test JOIN optimization suggestions."""
+    result = optimizer.optimize_joins("SELECT a FROM x CROSS JOIN y JOIN (SELECT 1 AS q) s ON 1 = 1")
+
+    assert [s["type"] for s in result["suggestions"]] == ["join_type", "join_style"]
+    assert result["estimated_improvement"] == "medium"
+
+def test_suggest_index_usage(optimizer):
+    """Test index suggestions based on table statistics."""
+    table_stats = {
+        "customers": {"exists": True, "row_count": 20000},
+        "loans": {"exists": True, "row_count": 100}
+    }
+
+    suggestions = optimizer.suggest_index_usage(JOIN_QUERY, table_stats)
+
+    # Only the large table gets WHERE, JOIN and ORDER BY index suggestions
+    assert [s["table"] for s in suggestions] == ["customers"] * 3
+
+def test_extract_table_names(optimizer):
+    """Test table name extraction."""
+    tables = optimizer._extract_table_names(JOIN_QUERY)
+
+    assert sorted(tables) == ["accounts", "branches", "customers", "loans"]
+
+@pytest.mark.parametrize("query, expected_tables", [
+    ("SELECT * FROM [dbo].[Users] u JOIN #tmp t ON u.id = t.id", ["#tmp", "[dbo].[users]"]),
+    ('SELECT * FROM "Sales"."Order Items" oi', ['"sales"."order items"']),
+    ("SELECT * FROM db.dbo.orders o JOIN (SELECT id FROM dbo.users) u ON o.user_id = u.id", ["db.dbo.orders", "dbo.users"]),
+])
+def test_extract_table_names_delimited_identifiers(optimizer, query, expected_tables):
+    """Test extraction of bracketed, quoted, temp and multi-part table names."""
+    tables = optimizer._extract_table_names(query)
+
+    assert sorted(tables) == expected_tables
+
+def test_optimize_joins_orders_by_row_count(optimizer):
+    """Test join order suggestions use table statistics when available."""
+    table_stats = {
+        "customers": {"exists": True, "row_count": 20000},
+        "accounts": {"exists": True, "row_count": 6000},
+        "loans": {"exists": True, "row_count": 100}
+    }
+
+    result = optimizer.optimize_joins(JOIN_QUERY, table_stats)
+
+    assert result["join_order"] == ["loans", "accounts", "customers", "branches"]
+
+def test_fingerprint_counts_parens_once():
+    """Test paren counts are collected with the feature scan and memoized per query."""
+    query = "SELECT id FROM t WHERE x IN (SELECT y FROM u WHERE z IN (1, 2)"
+    fingerprint.cache_clear()
+
+    features = fingerprint(query)
+
+    assert (features.open_parens, features.close_parens) == (2, 1)
+    assert fingerprint(query) is features
+    assert fingerprint.cache_info().hits == 1
+
+def test_complexity_score_counts_unbalanced_parens(optimizer):
+    """Test unclosed parens add nesting complexity."""
+    query = "SELECT id FROM t WHERE x IN (SELECT y FROM u WHERE z IN (1, 2)"
+
+    result = optimizer.analyze_performance(query)
+
+    # 2 selects, 2 wheres, 1 subquery, 1 unclosed paren
+    assert result["complexity_score"] == 2 * 2 + 2 * 3 + 5 + 1 * 2
+
+def test_fingerprint_ignores_literals_and_comments():
+    """Test keywords inside identifiers, strings and comments are not counted."""
+    query = (
+        "SELECT joined_at, 'order by' AS label FROM t -- join where\n"
+        "LEFT OUTER JOIN u ON u.id = t.id"
+    )
+
+    features = fingerprint(query)
+
+    assert features.counts.get("join", 0) == 1
+    assert features.counts.get("order by", 0) == 0
+    assert features.counts.get("where", 0) == 0
+    assert features.join_types == ("LEFT",)
+
+@pytest.mark.parametrize("query, expected_impact", [
+    ("SELECT * FROM customers WHERE id = 1", "high"),
+    ("SELECT id FROM customers", "high"),
+    ("SELECT id FROM customers WHERE id = 1", "low"),
+])
+def test_estimated_impact_from_suggestion_priority(optimizer, query, expected_impact):
+    """Test the impact estimate follows the suggestions' priority and impact."""
+    result = optimizer.analyze_performance(query)
+
+    assert result["estimated_impact"] == expected_impact
+
+def test_analyze_performance_results_are_independent(optimizer):
+    """Test mutating one analysis result does not leak into the next."""
+    first = optimizer.analyze_performance("SELECT * FROM customers")
+    first["optimization_suggestions"][0]["message"] = "changed"
+    first["performance_issues"][0]["severity"] = "changed"
+
+    second = optimizer.analyze_performance("SELECT * FROM customers")
+
+    assert second["optimization_suggestions"][0]["message"] == "Replace SELECT * with specific column names"
+    assert second["performance_issues"][0]["severity"] == "warning"
+
+def test_optimization_suggestions_keys(optimizer):
+    """Test suggestions only expose their public fields."""
+    result = optimizer.analyze_performance("SELECT * FROM customers")
+
+    for suggestion in result["optimization_suggestions"]:
+        assert set(suggestion) == {"type", "priority", "message", "impact"}
+
+def test_fingerprint_features_are_read_only():
+    """Test shared query features can be hashed but their counts not modified."""
+    features = fingerprint("SELECT id FROM customers WHERE id = 1")
+
+    hash(features)
+    with pytest.raises(TypeError):
+        features.counts["where"] += 1
+    assert fingerprint("SELECT id FROM customers WHERE id = 1").counts.get("where", 0) == 1
@@ -1,106 +1,128 @@
 """Tests for the Entity Recognition Agent."""
 
+import copy
+import json
 import pytest
-from unittest.mock import Mock, patch
+from unittest.mock import Mock
+from src.agents import base as agents_base
 from src.agents.entity_recognition import EntityRecognitionAgent
 from src.agents.indexer import SQLIndexerAgent
 
+@pytest.fixture(autouse=True, scope="module")
+def _patched_llm():
+    """Replace the LLM model and code agent and set a dummy API key once per module.
+    
+    BaseAgent builds both collaborators, so the patches target src.agents.base.
+    """
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(agents_base, "OpenAIModel", Mock())
+        mp.setattr(agents_base, "CodeAgent", Mock())
+        mp.setenv("OPENAI_API_KEY", "dummy-api-key")
+        yield
+
+# Search results for different scenarios, built once at import
+_USER_RESULT = {
+    "tables": [
+        {
+            "id": "users",
+            "content": {
+                "name": "users",
+                "business_purpose": "Stores user account information and profile data",
+                "schema_data": {"columns": ["id", "username", "email", "created_at"]},
+                "type": "table"
+            },
+            "score": 0.92
+        },
+        {
+            "id": "user_profiles",
+            "content": {
+                "name": "user_profiles",
+                "business_purpose": "Extended user profile information",
+                "schema_data": {"columns": ["user_id", "first_name", "last_name", "phone"]},
+                "type": "table"
+            },
+            "score": 0.85
+        }
+    ],
+    "relationships": [],
+    "total_results": 2
+}
+_ORDER_RESULT = {
+    "tables": [
+        {
+            "id": "orders",
+            "content": {
+                "name": "orders",
+                "business_purpose": "Customer order information and transaction data",
+                "schema_data": {"columns": ["id", "user_id", "total_amount", "order_date"]},
+                "type": "table"
+            },
+            "score": 0.88
+        }
+    ],
+    "relationships": [],
+    "total_results": 1
+}
+_EMPTY_RESULT = {
+    "tables": [],
+    "relationships": [],
+    "total_results": 0
+}
+
+# Agent reply for the JSON string response test, serialized once at import
+_JSON_RESPONSE = json.dumps({
+    "success": True,
+    "applicable_entities": [
+        {
+            "table_name": "orders",
+            "relevance_score": 0.88
+        }
+    ],
+    "recommendations": []
+})
+
+def _mock_search_documentation(query, doc_type):
+    """Return a deep copy of the canned result for the query.
+    
+    The agent modifies the results it gets back, so each caller needs its
+    own copy.
+    """
+    query_lc = query.lower()
+    if "user" in query_lc:
+        return copy.deepcopy(_USER_RESULT)
+    elif "order" in query_lc:
+        return copy.deepcopy(_ORDER_RESULT)
+    return copy.deepcopy(_EMPTY_RESULT)
+
 @pytest.fixture
 def mock_indexer_agent():
     """Create a mock indexer agent."""
     agent = Mock(spec=SQLIndexerAgent)
-    
-    # Mock search results for different scenarios
-    def mock_search_documentation(query, doc_type):
-        if "user" in query.lower():
-            return {
-                "tables": [
-                    {
-                        "id": "users",
-                        "content": {
-                            "name": "users",
-                            "business_purpose": "Stores user account information and profile data",
-                            "schema_data": {"columns": ["id", "username", "email", "created_at"]},
-                            "type": "table"
-                        },
-                        "score": 0.92
-                    },
-                    {
-                        "id": "user_profiles",
-                        "content": {
-                            "name": "user_profiles",
-                            "business_purpose": "Extended user profile information",
-                            "schema_data": {"columns": ["user_id", "first_name", "last_name", "phone"]},
-                            "type": "table"
-                        },
-                        "score": 0.85
-                    }
-                ],
-                "relationships": [],
-                "total_results": 2
-            }
-        elif "order" in query.lower():
-            return {
-                "tables": [
-                    {
-                        "id": "orders",
-                        "content": {
-                            "name": "orders",
-                            "business_purpose": "Customer order information and transaction data",
-                            "schema_data": {"columns": ["id", "user_id", "total_amount", "order_date"]},
-                            "type": "table"
-                        },
-                        "score": 0.88
-                    }
-                ],
-                "relationships": [],
-                "total_results": 1
-            }
-        else:
-            return {
-                "tables": [],
-                "relationships": [],
-                "total_results": 0
-            }
-    
-    agent.search_documentation.side_effect = mock_search_documentation
+    agent.search_documentation.side_effect = _mock_search_documentation
     return agent
 
 @pytest.fixture
 def entity_agent(mock_indexer_agent):
-    """Create an entity recognition agent with mocked dependencies."""
-    def mock_getenv(key, default=None):
-        if key == "OPENAI_API_KEY":
-            return "dummy-api-key"
-        else:
-            return default
-    
-    with patch('src.agents.entity_recognition.OpenAIModel') as mock_model, \
-         patch('src.agents.entity_recognition.CodeAgent') as mock_code_agent, \
-         patch('src.agents.entity_recognition.os.getenv', side_effect=mock_getenv):
-        agent = EntityRecognitionAgent(mock_indexer_agent)
-        return agent
+    """Create an entity recognition agent with mocked dependencies.
+    
+    The patched CodeAgent hands every agent the same instance, so run's
+    configuration is cleared after each test.
+    """
+    agent = EntityRecognitionAgent(mock_indexer_agent)
+    yield agent
+    agent.agent.run.reset_mock(return_value=True, side_effect=True)
 
 def test_entity_agent_initialization(mock_indexer_agent):
     """Test successful initialization of entity recognition agent."""
-    def mock_getenv(key, default=None):
-        if key == "OPENAI_API_KEY":
-            return "dummy-api-key"
-        else:
-            return default
-    
-    with patch('src.agents.entity_recognition.OpenAIModel') as mock_model, \
-         patch('src.agents.entity_recognition.CodeAgent') as mock_code_agent, \
-         patch('src.agents.entity_recognition.os.getenv', side_effect=mock_getenv):
-        agent = EntityRecognitionAgent(mock_indexer_agent)
-        assert agent.indexer_agent == mock_indexer_agent
-        assert agent.llm_model is not None
-        assert agent.agent is not None
+    agent = EntityRecognitionAgent(mock_indexer_agent)
+    assert agent.indexer_agent == mock_indexer_agent
+    assert agent.llm_model is not None
+    assert agent.agent is not None
 
-def test_entity_agent_initialization_missing_api_key(mock_indexer_agent):
+def test_entity_agent_initialization_missing_api_key(mock_indexer_agent, monkeypatch):
     """Test agent initialization with missing API key."""
-    with patch('src.agents.entity_recognition.os.getenv', return_value=None), \
-         pytest.raises(ValueError) as exc_info:
+    monkeypatch.delenv("OPENAI_API_KEY")
+    with pytest.raises(ValueError) as exc_info:
         EntityRecognitionAgent(mock_indexer_agent)
     assert "OPENAI_API_KEY environment variable is not set" in str(exc_info.value)
 
@@ -241,20 +263,7 @@ def test_recognize_entities_success(entity_agent):
 
 def test_recognize_entities_json_response(entity_agent):
     """Test entity recognition with JSON string response."""
-    import json
-    
-    mock_response = {
-        "success": True,
-        "applicable_entities": [
-            {
-                "table_name": "orders",
-                "relevance_score": 0.88
-            }
-        ],
-        "recommendations": []
-    }
-    
-    entity_agent.agent.run.return_value = json.dumps(mock_response)
+    entity_agent.agent.run.return_value = _JSON_RESPONSE
     
     result = entity_agent.recognize_entities("order data")
     
@@ -318,34 +327,21 @@ def test_recognize_entities_with_intent(entity_agent):
     assert "show me data" in call_args
     assert "I want to analyze user demographics" in call_args
 
-def test_private_methods(entity_agent):
+@pytest.mark.parametrize("helper, args, check", [
+    ("_calculate_purpose_match", ("Stores user account information", "user account data"),
+     lambda score: 0.0 < score <= 1.0),
+    ("_calculate_name_relevance", ("users", "user data"), lambda score: score > 0.0),
+    ("_get_relevance_recommendation", (0.9,), lambda rec: "Highly relevant" in rec),
+    ("_get_relevance_recommendation", (0.1,), lambda rec: "Not relevant" in rec),
+    ("_generate_analysis_summary", ([{"table_name": "users", "relevance_score": 0.9}], "user data"),
+     lambda summary: "Found 1 applicable entities" in summary),
+    ("_generate_analysis_summary", ([], "nonexistent"),
+     lambda summary: "No highly relevant entities found" in summary)
+], ids=["purpose_match", "name_relevance", "high_recommendation", "low_recommendation",
+        "summary", "empty_summary"])
+def test_private_methods(entity_agent, helper, args, check):
     """Test private helper methods."""
-    # Test _calculate_purpose_match
-    match_score = entity_agent._calculate_purpose_match(
-        "Stores user account information",
-        "user account data"
-    )
-    assert match_score > 0.0
-    assert match_score <= 1.0
-    
-    # Test _calculate_name_relevance
-    name_relevance = entity_agent._calculate_name_relevance("users", "user data")
-    assert name_relevance > 0.0
-    
-    # Test _get_relevance_recommendation
-    high_rec = entity_agent._get_relevance_recommendation(0.9)
-    assert "Highly relevant" in high_rec
-    
-    low_rec = entity_agent._get_relevance_recommendation(0.1)
-    assert "Not relevant" in low_rec
-    
-    # Test _generate_analysis_summary
-    entities = [{"table_name": "users", "relevance_score": 0.9}]
-    summary = entity_agent._generate_analysis_summary(entities, "user data")
-    assert "Found 1 applicable entities" in summary
-    
-    empty_summary = entity_agent._generate_analysis_summary([], "nonexistent")
-    assert "No highly relevant entities found" in empty_summary
+    assert check(getattr(entity_agent, helper)(*args))
 
 if __name__ == "__main__":
     pytest.main([__file__])
\ No newline at end of file
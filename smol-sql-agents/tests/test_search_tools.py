@@ -1,8 +1,13 @@
 """Tests for the enhanced search tools using OpenAI embeddings."""
 
 import pytest
+from types import SimpleNamespace
 from unittest.mock import Mock, patch
+from src.vector import search
 from src.vector.search import (
+    _cached_search,
+    _get_agent,
+    _top_ranked,
     search_table_documentation,
     search_relationship_documentation,
     semantic_search_all_documentation
@@ -11,9 +16,17 @@ from src.vector.search import (
 @pytest.fixture
 def mock_agent():
     """Create a mock PersistentDocumentationAgent."""
-    with patch('src.vector.search.PersistentDocumentationAgent') as mock:
-        agent_instance = Mock()
-        mock.return_value = agent_instance
+    # Only the search callable records calls; the agent and its indexer are
+    # plain namespaces
+    agent_instance = SimpleNamespace(
+        indexer_agent=SimpleNamespace(
+            search_documentation=Mock(),
+            vector_store=SimpleNamespace(write_generation=0)
+        )
+    )
+    with patch('src.vector.search.PersistentDocumentationAgent', return_value=agent_instance), \
+         patch('src.vector.search._agent', None):
+        _cached_search.cache_clear()
         yield agent_instance
 
 @pytest.fixture
@@ -139,3 +152,81 @@ def test_search_with_invalid_limit(mock_agent, mock_search_results):
     # Execute with negative limit
     results = semantic_search_all_documentation("test", limit=-1)
     assert results["total_results"] == 0
+
+def test_semantic_search_keeps_top_results(mock_agent, mock_search_results):
+    """Test combined results are cut to the highest similarity scores."""
+    # Setup
+    def make_table(name, similarity):
+        return {"metadata": dict(mock_search_results["table"]["metadata"], table_name=name), "similarity": similarity}
+    
+    def mock_search_side_effect(query, doc_type, limit):
+        if doc_type == "tables":
+            return [make_table("low", 0.2), make_table("high", 0.9), make_table("tied", 0.85)]
+        else:
+            return [mock_search_results["relationship"]]
+    
+    mock_agent.indexer_agent.search_documentation.side_effect = mock_search_side_effect
+    
+    # Execute
+    results = semantic_search_all_documentation("user data", limit=3)
+    
+    # Verify
+    assert results["total_results"] == 3
+    assert [r["table_name"] for r in results["tables"]] == ["high", "tied"]
+    assert results["relationships"][0]["relationship_id"] == "users_orders_fk"
+
+def test_search_reuses_documentation_agent(mock_agent, mock_search_results):
+    """Test the documentation agent is created once and shared across searches."""
+    # Setup
+    mock_agent.indexer_agent.search_documentation.return_value = [mock_search_results["table"]]
+    
+    # Execute
+    search_table_documentation("users")
+    search_table_documentation("accounts")
+    
+    # Verify
+    assert _get_agent() is mock_agent
+    assert search.PersistentDocumentationAgent.call_count == 1
+
+def test_search_caches_repeated_queries(mock_agent, mock_search_results):
+    """Test repeated searches are served from the result cache."""
+    # Setup
+    mock_agent.indexer_agent.search_documentation.return_value = [mock_search_results["table"]]
+    
+    # Execute
+    first = search_table_documentation("user tables", limit=5)
+    second = search_table_documentation("user tables", limit=5)
+    search_table_documentation("user tables", limit=3)
+    search_table_documentation("  ", limit=5)
+    search_table_documentation("  ", limit=5)
+    
+    # Verify
+    assert first == second
+    assert first is not second
+    # One call per distinct cached search, plus both uncached blank queries
+    assert mock_agent.indexer_agent.search_documentation.call_count == 4
+
+def test_search_cache_invalidated_by_index_writes(mock_agent, mock_search_results):
+    """Test a write to the vector store makes the next search hit the index again."""
+    # Setup
+    mock_agent.indexer_agent.search_documentation.return_value = [mock_search_results["table"]]
+    
+    # Execute
+    search_table_documentation("user tables")
+    mock_agent.indexer_agent.vector_store.write_generation += 1
+    search_table_documentation("user tables")
+    search_table_documentation("user tables")
+    
+    # Verify
+    assert mock_agent.indexer_agent.search_documentation.call_count == 2
+
+def test_top_ranked_matches_stable_sort():
+    """Test top-k selection matches a stable descending sort."""
+    # Setup
+    candidates = [(round((i * 37 % 101) / 100, 2), "table", i) for i in range(10)]
+    
+    # Execute
+    ranked = _top_ranked(candidates, 7)
+    
+    # Verify
+    assert ranked == sorted(candidates, key=lambda c: c[0], reverse=True)[:7]
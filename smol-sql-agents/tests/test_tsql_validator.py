@@ -0,0 +1,128 @@
+"""Tests for the TSQLValidator."""
+
+import pytest
+import src.agents  # noqa: F401 - imported first to avoid the agents/validation import cycle
+from src.validation.tsql_validator import TSQLValidator
+
+@pytest.fixture
+def validator():
+    """Create a T-SQL validator."""
+    return TSQLValidator()
+
+def test_check_performance_patterns(validator):
+    """Test performance anti-pattern detection."""
+    issues = validator.check_performance_patterns("SELECT * FROM customers c JOIN accounts a ON c.id = a.customer_id")
+
+    assert [issue["message"] for issue in issues] == [
+        "SELECT * usage detected - consider specifying only needed columns",
+        "No WHERE clause detected - consider adding filters for large tables",
+        "JOIN detected without index hints - verify proper indexing"
+    ]
+
+def test_validate_security_is_case_insensitive(validator):
+    """Test injection patterns and system tables are detected regardless of case."""
+    result = validator.validate_security("EXEC sp_who; SELECT name FROM SYS.tables")
+
+    assert result["valid"] is True
+    assert result["risks"] == [
+        "Potential SQL injection risk: sp_",
+        "Dynamic SQL execution detected",
+        "System table access: sys."
+    ]
+
+def test_validate_security_matches_whole_keywords(validator):
+    """Test forbidden keywords are not matched inside identifiers."""
+    assert validator.validate_security("SELECT updated_at FROM orders")["forbidden_operations"] == []
+    assert validator.validate_security("DELETE FROM orders")["forbidden_operations"] == ["DELETE"]
+
+def test_suggest_improvements(validator):
+    """Test readability and performance suggestions."""
+    suggestions = validator.suggest_improvements("SELECT id FROM transactions ORDER BY id")
+
+    assert [s["message"] for s in suggestions] == [
+        "Consider using table aliases for better readability",
+        "Consider aliasing calculated columns for clarity",
+        "Consider proper query formatting and indentation",
+        "Consider adding LIMIT clause when using ORDER BY"
+    ]
+
+@pytest.mark.parametrize("query, expected", [
+    ("SELECT * FROM t", True),
+    ("select id FROM (SELECT* FROM t) s", True),
+    ("SELECT COUNT(*) FROM t", False),
+])
+def test_check_select_star_usage(validator, query, expected):
+    """Test SELECT * detection in main queries and subqueries."""
+    assert validator._check_select_star_usage(query) is expected
+
+def test_validate_syntax_splits_statements(validator):
+    """Test statements are split on semicolons outside string literals."""
+    result = validator.validate_syntax("SELECT ';(' AS x FROM t; UPDATE t SET a = 1;")
+
+    assert result["valid"] is False
+    assert result["errors"] == ["Missing required SELECT and FROM clauses"]
+    assert result["warnings"] == ["Semicolon at end of statement"] * 2
+
+@pytest.mark.parametrize("query, expected_errors", [
+    ("SELECT ((1) FROM t", ["Unbalanced parentheses"]),
+    ("SELECT ')' FROM t -- (", []),
+    ("   ", ["Empty query"]),
+])
+def test_validate_syntax_errors(validator, query, expected_errors):
+    """Test syntax errors ignore parens inside literals and comments."""
+    result = validator.validate_syntax(query)
+
+    assert result["errors"] == expected_errors
+
+def test_analyze_where_clause(validator):
+    """Test WHERE analysis only looks at conditions inside WHERE clauses."""
+    query = (
+        "SELECT name FROM customers WHERE email LIKE '%@bank.com' AND closed_at IS NULL "
+        "ORDER BY name OR id"
+    )
+
+    assert validator._analyze_where_clause(query) == [
+        "LIKE with leading wildcard may not use indexes efficiently",
+        "NULL checks may benefit from proper indexing"
+    ]
+
+def test_validate_security_single_scan_categories(validator):
+    """Test one scan reports call, prefix and dynamic SQL risks in a stable order."""
+    result = validator.validate_security("exec xp_cmdshell 'dir'; EXECUTE(@sql)")
+
+    assert result["risks"] == [
+        "Potential SQL injection risk: execute(",
+        "Potential SQL injection risk: xp_",
+        "Dynamic SQL execution detected"
+    ]
+
+def test_validate_runs_all_checks(validator):
+    """Test the combined entry point matches the individual checks."""
+    query = "SELECT * FROM customers c JOIN accounts a ON c.id = a.customer_id ORDER BY c.id"
+
+    result = validator.validate(query)
+
+    assert result["valid"] is True
+    assert result["syntax"] == validator.validate_syntax(query)
+    assert result["security"] == validator.validate_security(query)
+    assert result["performance"] == validator.check_performance_patterns(query)
+    assert result["improvements"] == validator.suggest_improvements(query)
+
+def test_analyze_where_clause_deeply_nested(validator):
+    """Test WHERE analysis handles nesting deeper than the recursion limit."""
+    depth = 2000
+    query = "SELECT id FROM t WHERE id IN " + "(SELECT id FROM t WHERE id IN " * depth + "(1)" + ")" * depth + " OR x IS NULL AND y = 1"
+
+    assert validator._analyze_where_clause(query) == [
+        "Complex OR/AND conditions may benefit from query restructuring",
+        "NULL checks may benefit from proper indexing"
+    ]
+
+def test_check_results_are_independent(validator):
+    """Test mutating returned issues and suggestions does not leak into later calls."""
+    query = "SELECT * FROM users"
+    validator.check_performance_patterns(query)[0]["message"] = "changed"
+    validator.suggest_improvements(query)[0]["message"] = "changed"
+
+    assert validator.check_performance_patterns(query)[0]["message"] != "changed"
+    assert validator.suggest_improvements(query)[0]["message"] != "changed"
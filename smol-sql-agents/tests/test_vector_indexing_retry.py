@@ -1,103 +1,95 @@
 """Tests for vector indexing retry functionality."""
 
+import os
 import pytest
-from unittest.mock import Mock, patch
+from unittest.mock import DEFAULT, NonCallableMock, patch
+from src.agents import base as agents_base
+from src.agents import core as agent_core_module
 from src.agents.core import PersistentDocumentationAgent
 
-def test_retry_vector_indexing_success():
-    """Test successful retry of vector indexing initialization."""
-    with patch('src.agents.core.SQLVectorStore') as mock_vector_store, \
-         patch('src.agents.core.DatabaseInspector') as mock_db_inspector, \
-         patch('src.agents.core.OpenAIModel') as mock_llm_model, \
-         patch('src.agents.core.DocumentationStore') as mock_doc_store, \
-         patch('src.agents.core.CodeAgent') as mock_code_agent, \
-         patch('src.agents.core.os.getenv', return_value='dummy-api-key'):
-        
-        # First, make the initial initialization fail
-        mock_vector_store.side_effect = RuntimeError("Initial failure")
-        
-        # Create agent - should have vector indexing disabled
-        agent = PersistentDocumentationAgent()
-        assert agent.vector_indexing_available is False
-        assert agent.indexer_agent is None
-        
-        # Now make the retry succeed
-        mock_vector_store.side_effect = None
-        mock_indexer = Mock()
-        with patch('src.agents.core.SQLIndexerAgent', return_value=mock_indexer):
-            success = agent.retry_vector_indexing_initialization()
-            
-            assert success is True
-            assert agent.vector_indexing_available is True
-            assert agent.indexer_agent is not None
+# Indexer the retry receives; only checked for identity, never called
+_MOCK_INDEXER = NonCallableMock()
 
-def test_retry_vector_indexing_already_available():
-    """Test retry when vector indexing is already available."""
-    with patch('src.agents.core.SQLVectorStore') as mock_vector_store, \
-         patch('src.agents.core.DatabaseInspector') as mock_db_inspector, \
-         patch('src.agents.core.OpenAIModel') as mock_llm_model, \
-         patch('src.agents.core.DocumentationStore') as mock_doc_store, \
-         patch('src.agents.core.CodeAgent') as mock_code_agent, \
-         patch('src.agents.core.os.getenv', return_value='dummy-api-key'):
-        
-        # Create agent with vector indexing available
-        agent = PersistentDocumentationAgent()
-        agent.vector_indexing_available = True
-        agent.indexer_agent = Mock()
-        
-        # Retry should return True without re-initializing
+def core_patches(test):
+    """Patch PersistentDocumentationAgent's collaborators around one test.
+    
+    The test receives the os.getenv mock positionally and the class mocks as
+    keyword arguments named after the patched classes.
+    """
+    test = patch.object(os, 'getenv', return_value='dummy-api-key')(test)
+    test = patch.multiple(agents_base, OpenAIModel=DEFAULT, CodeAgent=DEFAULT)(test)
+    return patch.multiple(
+        agent_core_module,
+        SQLVectorStore=DEFAULT,
+        DatabaseInspector=DEFAULT,
+        DocumentationStore=DEFAULT
+    )(test)
+
+def _blank_agent(available, indexer):
+    """Create an agent without running __init__, holding only the indexing state.
+    
+    For tests that only read or short-circuit on the two indexing attributes.
+    """
+    agent = object.__new__(PersistentDocumentationAgent)
+    agent.vector_indexing_available = available
+    agent.indexer_agent = indexer
+    return agent
+
+@core_patches
+def test_retry_vector_indexing_success(getenv, **mocks):
+    """Test successful retry of vector indexing initialization."""
+    # Fail the initial initialization, then let the retry succeed
+    mocks["SQLVectorStore"].side_effect = iter([RuntimeError("Initial failure"), DEFAULT])
+    
+    # Create agent - should have vector indexing disabled
+    agent = PersistentDocumentationAgent()
+    assert agent.vector_indexing_available is False
+    assert agent.indexer_agent is None
+    
+    with patch.object(agent_core_module, 'SQLIndexerAgent', return_value=_MOCK_INDEXER):
         success = agent.retry_vector_indexing_initialization()
         
         assert success is True
         assert agent.vector_indexing_available is True
+        assert agent.indexer_agent is not None
+
+def test_retry_vector_indexing_already_available():
+    """Test retry when vector indexing is already available."""
+    # Create agent with vector indexing available
+    agent = _blank_agent(True, NonCallableMock())
+    
+    # Retry should return True without re-initializing
+    success = agent.retry_vector_indexing_initialization()
+    
+    assert success is True
+    assert agent.vector_indexing_available is True
 
-def test_retry_vector_indexing_failure():
+@core_patches
+def test_retry_vector_indexing_failure(getenv, **mocks):
     """Test retry when vector indexing initialization fails."""
-    with patch('src.agents.core.SQLVectorStore') as mock_vector_store, \
-         patch('src.agents.core.DatabaseInspector') as mock_db_inspector, \
-         patch('src.agents.core.OpenAIModel') as mock_llm_model, \
-         patch('src.agents.core.DocumentationStore') as mock_doc_store, \
-         patch('src.agents.core.CodeAgent') as mock_code_agent, \
-         patch('src.agents.core.os.getenv', return_value='dummy-api-key'):
-        
-        # Make the initial initialization fail
-        mock_vector_store.side_effect = RuntimeError("Initial failure")
-        
-        # Create agent - should have vector indexing disabled
-        agent = PersistentDocumentationAgent()
-        assert agent.vector_indexing_available is False
-        assert agent.indexer_agent is None
-        
-        # Make the retry also fail
-        mock_vector_store.side_effect = RuntimeError("Retry failure")
-        success = agent.retry_vector_indexing_initialization()
-        
-        assert success is False
-        assert agent.vector_indexing_available is False
-        assert agent.indexer_agent is None
+    # Fail both the initial initialization and the retry
+    mocks["SQLVectorStore"].side_effect = iter([
+        RuntimeError("Initial failure"),
+        RuntimeError("Retry failure")
+    ])
+    
+    # Create agent - should have vector indexing disabled
+    agent = PersistentDocumentationAgent()
+    assert agent.vector_indexing_available is False
+    assert agent.indexer_agent is None
+    
+    success = agent.retry_vector_indexing_initialization()
+    
+    assert success is False
+    assert agent.vector_indexing_available is False
+    assert agent.indexer_agent is None
 
-def test_vector_indexing_status_check():
+@pytest.mark.parametrize("available, indexer", [(True, NonCallableMock()), (False, None)],
+                         ids=["available", "unavailable"])
+def test_vector_indexing_status_check(available, indexer):
     """Test checking vector indexing status."""
-    with patch('src.agents.core.SQLVectorStore') as mock_vector_store, \
-         patch('src.agents.core.DatabaseInspector') as mock_db_inspector, \
-         patch('src.agents.core.OpenAIModel') as mock_llm_model, \
-         patch('src.agents.core.DocumentationStore') as mock_doc_store, \
-         patch('src.agents.core.CodeAgent') as mock_code_agent, \
-         patch('src.agents.core.os.getenv', return_value='dummy-api-key'):
-        
-        # Test with vector indexing available
-        agent = PersistentDocumentationAgent()
-        agent.vector_indexing_available = True
-        agent.indexer_agent = Mock()
-        
-        # Status should be available
-        assert agent.vector_indexing_available is True
-        assert agent.indexer_agent is not None
-        
-        # Test with vector indexing unavailable
-        agent.vector_indexing_available = False
-        agent.indexer_agent = None
-        
-        # Status should be unavailable
-        assert agent.vector_indexing_available is False
-        assert agent.indexer_agent is None 
\ No newline at end of file
+    agent = _blank_agent(available, indexer)
+    
+    # Status should match the flag, with an indexer only when available
+    assert agent.vector_indexing_available is available
+    assert (agent.indexer_agent is not None) is available
\ No newline at end of file
@@ -0,0 +1,315 @@
+"""Tests for the SQL vector store and its ChromaDB index."""
+
+import importlib.util
+import json
+import subprocess
+import sys
+import threading
+from pathlib import Path
+import pytest
+from unittest.mock import Mock, patch
+from src.vector import store
+from src.vector.store import BruteForceIndex, ChromaDBIndex, SQLVectorStore, USearchIndex
+
+def fake_embedding(text):
+    """Build a small deterministic embedding from the text."""
+    return [float(len(text) % 7 + 1), float(text.count("a") + 1), 1.0, 0.5]
+
+@pytest.fixture
+def embeddings_client():
+    """Create a mock embeddings client."""
+    client = Mock()
+    client.generate_embedding.side_effect = fake_embedding
+    client.generate_embeddings_batch.side_effect = lambda texts: [fake_embedding(text) for text in texts]
+    return client
+
+@pytest.fixture
+def vector_store(embeddings_client, tmp_path):
+    """Create a vector store backed by ChromaDB in a temporary directory."""
+    with patch('src.vector.store.OpenAIEmbeddingsClient', return_value=embeddings_client):
+        store = SQLVectorStore(base_path=str(tmp_path))
+    store.create_table_index()
+    store.create_relationship_index()
+    return store
+
+def table_content(name):
+    """Build table documentation content."""
+    return {
+        "name": name,
+        "description": f"The {name} table",
+        "columns": ["id", f"{name}_name"],
+        "business_purpose": f"Tracks {name}",
+        "schema_data": {"primary_key": "id"}
+    }
+
+def test_add_table_documents_batches_inserts(vector_store):
+    """Test bulk table adds issue one index insert per batch."""
+    documents = [(f"table_{i}", table_content(f"table_{i}")) for i in range(5)]
+
+    with patch.object(ChromaDBIndex, "add_many", autospec=True, side_effect=ChromaDBIndex.add_many) as add_many:
+        vector_store.add_table_documents(documents, batch_size=2)
+
+    assert [len(call.args[1]) for call in add_many.call_args_list] == [2, 2, 1]
+    assert vector_store.table_index.collection.count() == 5
+
+def test_add_table_documents_embeds_per_batch(vector_store, embeddings_client):
+    """Test bulk table adds request embeddings once per batch."""
+    documents = [(f"table_{i}", table_content(f"table_{i}")) for i in range(5)]
+
+    vector_store.add_table_documents(documents, batch_size=2)
+
+    assert [len(call.args[0]) for call in embeddings_client.generate_embeddings_batch.call_args_list] == [2, 2, 1]
+    embeddings_client.generate_embedding.assert_not_called()
+
+def test_search_tables_returns_added_documents(vector_store):
+    """Test single and bulk adds are both searchable with their metadata."""
+    vector_store.add_table_document("accounts", table_content("accounts"))
+    vector_store.add_table_documents([("loans", table_content("loans"))])
+
+    results = vector_store.search_tables("accounts", limit=2)
+
+    assert sorted(result["id"] for result in results) == ["accounts", "loans"]
+    content = next(result["content"] for result in results if result["id"] == "accounts")
+    assert content["columns"] == "id, accounts_name"
+    assert json.loads(content["schema_data"]) == {"primary_key": "id"}
+    assert all(0.0 <= result["score"] <= 1.0 for result in results)
+
+def test_add_relationship_documents(vector_store):
+    """Test bulk relationship adds."""
+    vector_store.add_relationship_documents([
+        ("accounts_loans", {"name": "accounts_loans", "type": "foreign_key", "tables": ["accounts", "loans"]})
+    ])
+
+    results = vector_store.search_relationships("accounts", limit=1)
+
+    assert results[0]["id"] == "accounts_loans"
+    assert results[0]["content"]["tables"] == "accounts, loans"
+
+def test_add_documents_requires_index(embeddings_client, tmp_path):
+    """Test bulk adds fail before the index is created."""
+    with patch('src.vector.store.OpenAIEmbeddingsClient', return_value=embeddings_client):
+        store = SQLVectorStore(base_path=str(tmp_path))
+
+    with pytest.raises(ValueError):
+        store.add_table_documents([("accounts", table_content("accounts"))])
+
+def test_search_reuses_query_embeddings(vector_store, embeddings_client):
+    """Test repeated queries are embedded once across table and relationship searches."""
+    vector_store.add_table_document("accounts", table_content("accounts"))
+    embeddings_client.generate_embedding.reset_mock()
+
+    first = vector_store.search_tables("accounts")
+    vector_store.search_relationships("accounts")
+    second = vector_store.search_tables("accounts")
+    vector_store.search_tables("loans")
+
+    assert [call.args[0] for call in embeddings_client.generate_embedding.call_args_list] == ["accounts", "loans"]
+    assert second == first
+
+def test_query_embedding_cache_evicts_least_recent(vector_store, embeddings_client):
+    """Test the query embedding cache is bounded and evicts the least recently used query."""
+    with patch('src.vector.store.QUERY_EMBEDDING_CACHE_SIZE', 2):
+        vector_store._embed_query("a")
+        vector_store._embed_query("b")
+        vector_store._embed_query("a")
+        vector_store._embed_query("c")
+
+    assert list(vector_store._query_cache) == ["a", "c"]
+
+def test_single_adds_defer_save_to_flush(vector_store):
+    """Test single-document adds leave saving to flush()."""
+    with patch.object(ChromaDBIndex, "save", autospec=True) as save:
+        vector_store.add_table_document("accounts", table_content("accounts"))
+        vector_store.add_relationship_document("accounts_loans", {"name": "accounts_loans", "tables": ["accounts", "loans"]})
+        save.assert_not_called()
+
+        with vector_store:
+            pass
+
+    assert save.call_count == 2
+
+def test_chroma_add_stores_no_document_text(vector_store):
+    """Test ChromaDB stores only embeddings and metadata, not a document string."""
+    vector_store.add_table_document("accounts", table_content("accounts"))
+
+    stored = vector_store.table_index.collection.get(ids=["accounts"], include=["documents", "metadatas"])
+
+    assert stored["documents"] == [None]
+    assert stored["metadatas"][0]["columns"] == "id, accounts_name"
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_dumps_json_is_compact(use_orjson):
+    """Test metadata dicts serialize to the same compact JSON with and without orjson."""
+    with patch("src.vector.store.orjson", store.orjson if use_orjson else None):
+        assert store._dumps_json({"primary_key": "id", "columns": ["id", "name"]}) == '{"primary_key":"id","columns":["id","name"]}'
+
+def test_add_documents_overlaps_embedding_with_inserts(vector_store, embeddings_client):
+    """Test the next batch is embedded while the current batch is being inserted."""
+    documents = [(f"table_{i}", table_content(f"table_{i}")) for i in range(4)]
+    second_embed_started = threading.Event()
+    first_insert_started = threading.Event()
+    original_add_many = ChromaDBIndex.add_many
+
+    def embed(texts):
+        if embeddings_client.generate_embeddings_batch.call_count == 2:
+            second_embed_started.set()
+            # Only returns promptly if the first insert is running concurrently
+            assert first_insert_started.wait(timeout=5)
+        return [fake_embedding(text) for text in texts]
+
+    def add_many(index, items):
+        first_insert_started.set()
+        assert second_embed_started.wait(timeout=5)
+        original_add_many(index, items)
+
+    embeddings_client.generate_embeddings_batch.side_effect = embed
+    with patch.object(ChromaDBIndex, "add_many", autospec=True, side_effect=add_many):
+        vector_store.add_table_documents(documents, batch_size=2)
+
+    assert vector_store.table_index.collection.count() == 4
+
+def test_reingest_reuses_cached_document_embeddings(vector_store, embeddings_client):
+    """Test unchanged documents are not re-embedded when indexed again."""
+    documents = [(f"table_{i}", table_content(f"table_{i}")) for i in range(3)]
+    vector_store.add_table_documents(documents)
+    vector_store.add_table_document("accounts", table_content("accounts"))
+    embeddings_client.generate_embeddings_batch.reset_mock()
+    embeddings_client.generate_embedding.reset_mock()
+
+    vector_store.add_table_documents(documents + [("loans", table_content("loans"))])
+    vector_store.add_table_document("accounts", table_content("accounts"))
+
+    assert [call.args[0] for call in embeddings_client.generate_embeddings_batch.call_args_list] == [
+        [vector_store._prepare_document_text(table_content("loans"), "table")]
+    ]
+    embeddings_client.generate_embedding.assert_not_called()
+    assert vector_store.table_index.collection.count() == 5
+
+def test_brute_force_index_ranks_exact_cosine(tmp_path):
+    """Test the brute-force index returns the exact top-k, replacing re-added ids."""
+    index = BruteForceIndex("tables", persist_directory=str(tmp_path))
+    index.add_many([
+        ("x", [1.0, 0.0], {"name": "x"}),
+        ("y", [0.0, 2.0], {"name": "y"}),
+        ("xy", [1.0, 1.0], {"name": "xy"})
+    ])
+    index.add("y", [0.0, -1.0], {"name": "y2"})
+
+    results = index.search([3.0, 0.0], k=2)
+
+    assert index.count() == 3
+    assert [result["id"] for result in results] == ["x", "xy"]
+    assert results[0]["score"] == pytest.approx(1.0)
+    assert results[1]["score"] == pytest.approx((1 + 0.5 ** 0.5) / 2)
+    assert index.search([0.0, 1.0], k=5)[-1]["content"] == {"name": "y2", "id": "y"}
+
+def test_brute_force_index_grows_and_persists(tmp_path):
+    """Test the vector matrix grows past one block and reloads after save."""
+    with patch("src.vector.store.BRUTE_FORCE_GROWTH_ROWS", 4):
+        index = BruteForceIndex("tables", persist_directory=str(tmp_path))
+        index.add_many([(f"t{i}", [float(i + 1), 1.0], None) for i in range(6)])
+        index.save()
+
+    assert index._matrix.shape == (8, 2)
+    reloaded = BruteForceIndex("tables", persist_directory=str(tmp_path))
+    assert reloaded.count() == 6
+    assert reloaded.search([1.0, 0.0], k=1)[0]["id"] == "t5"
+
+def test_default_index_factory_selects_brute_force(embeddings_client, tmp_path, monkeypatch):
+    """Test VECTOR_BACKEND=bruteforce builds brute-force indexes."""
+    monkeypatch.setenv("VECTOR_BACKEND", "bruteforce")
+    with patch('src.vector.store.OpenAIEmbeddingsClient', return_value=embeddings_client):
+        store = SQLVectorStore(base_path=str(tmp_path))
+    store.create_table_index()
+    store.add_table_document("accounts", table_content("accounts"))
+
+    assert isinstance(store.table_index, BruteForceIndex)
+    assert store.search_tables("accounts")[0]["id"] == "accounts"
+
+@pytest.mark.parametrize("index_class", [
+    BruteForceIndex,
+    pytest.param(USearchIndex, marks=pytest.mark.skipif(
+        importlib.util.find_spec("usearch") is None, reason="usearch not installed"
+    ))
+])
+def test_search_results_do_not_alias_index_metadata(tmp_path, index_class):
+    """Test mutating a search result leaves the index's stored metadata intact."""
+    index = index_class("tables", persist_directory=str(tmp_path))
+    index.add_many([("t1", [1.0, 0.0], {"id": "t1", "name": "accounts"})])
+
+    index.search([1.0, 0.0], k=1)[0]["content"]["name"] = "changed"
+
+    assert index.search([1.0, 0.0], k=1)[0]["content"]["name"] == "accounts"
+
+@pytest.mark.skipif(store._numba_cosines() is None, reason="numba not installed")
+def test_brute_force_numba_scan_matches_numpy(tmp_path):
+    """Test the numba scan ranks and scores like the numpy matrix product."""
+    index = BruteForceIndex("tables", persist_directory=str(tmp_path))
+    index.add_many([(f"t{i}", [float(i % 5), float(i % 3) + 1.0, 0.5], {"n": i}) for i in range(40)])
+    query = [1.0, 2.0, 0.5]
+
+    expected = index.search(query, k=5)
+    with patch("src.vector.store.NUMBA_SCAN_MIN_VECTORS", 0):
+        results = index.search(query, k=5)
+
+    assert [result["score"] for result in results] == pytest.approx([result["score"] for result in expected], abs=1e-6)
+    assert {result["id"] for result in results} == {result["id"] for result in expected}
+
+def test_brute_force_warms_numba_only_for_large_indexes(tmp_path):
+    """Test opening an index warms the numba scan only when searches will use it."""
+    index = BruteForceIndex("tables", persist_directory=str(tmp_path))
+    index.add_many([("t1", [1.0, 0.0], {})])
+    index.save()
+
+    with patch("src.vector.store._numba_cosines") as numba_cosines:
+        BruteForceIndex("tables", persist_directory=str(tmp_path))
+        numba_cosines.assert_not_called()
+
+        with patch("src.vector.store.NUMBA_SCAN_MIN_VECTORS", 1):
+            BruteForceIndex("tables", persist_directory=str(tmp_path))
+        numba_cosines.return_value.assert_called_once()
+
+def test_index_writes_bump_write_generation(vector_store):
+    """Test single and bulk adds each advance the store's write generation."""
+    start = vector_store.write_generation
+
+    vector_store.add_table_document("accounts", table_content("accounts"))
+    vector_store.add_table_documents([("loans", table_content("loans"))])
+
+    assert vector_store.write_generation == start + 2
+
+def test_add_documents_keeps_earlier_batch_vectors(tmp_path):
+    """Test vectors an index keeps from one batch are not overwritten by later batches."""
+    # Embed "table_<i>" as [i, 1] so every document gets a distinct vector
+    def embed(text):
+        return [float(text.split("table_")[1][0]), 1.0]
+
+    client = Mock()
+    client.generate_embeddings_batch.side_effect = lambda texts: [embed(text) for text in texts]
+    stored = {}
+    index = Mock()
+    index.add_many.side_effect = lambda items: stored.update((doc_id, vector) for doc_id, vector, _ in items)
+    with patch('src.vector.store.OpenAIEmbeddingsClient', return_value=client):
+        vector_store = SQLVectorStore(base_path=str(tmp_path), vector_index_factory=lambda path: index)
+    vector_store.create_table_index()
+    documents = [(f"table_{i}", table_content(f"table_{i}")) for i in range(5)]
+
+    vector_store.add_table_documents(documents, batch_size=2)
+
+    assert all(vector.dtype == "float32" for vector in stored.values())
+    assert {doc_id: vector.tolist() for doc_id, vector in stored.items()} == {
+        f"table_{i}": [float(i), 1.0] for i in range(5)
+    }
+
+def test_importing_store_defers_heavy_imports():
+    """Test importing the store module loads neither chromadb, openai nor numba."""
+    code = "import sys, src.vector.store; print(sorted({'chromadb', 'openai', 'numba'} & set(sys.modules)))"
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=Path(__file__).resolve().parent.parent,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+
+    assert result.stdout.strip() == "[]"